@@ -0,0 +1,95 @@
+"""Benchmark ticket bot message classification
+
+Run from the project root: python -m benchmarks.bench_classifier [recorded messages file]
+
+The "recorded" corpus is the text of real ticket channel messages: ticket_messages.json by default
+(moderator messages recorded by the bot), or any JSON file in that format or JSONL of message objects,
+e.g. an export of Sahara bot messages. Sahara's own lifecycle messages are not recorded by the bot,
+so the "mixed" corpus adds them from templates in the shape Sahara posts them.
+"""
+import os
+import sys
+import json
+import random
+import re
+import time
+from functools import partial
+from constants import MESSAGES_FILE
+from utils.classifier import DEFAULT_MESSAGE_RULES, MessageClassifier
+
+CORPUS_SIZE = 100_000
+REPEATS = 5
+BOT_ID = 1275351977286570056
+MODERATOR_ID = 847392052430110760
+
+# Lifecycle messages in the shape the Sahara bot posts them, by weight
+TEMPLATES = [
+    (10, "<@{mod}> closed the ticket."),
+    (6, "<@{mod}> deleted the ticket."),
+    (8, "Ticket claimed by <@{mod}> - <@{mod}> claimed the ticket"),
+    (4, "<@{mod}> reopened the ticket."),
+    (7, "Transcript saved to #ticket-logs by <@{mod}>"),
+]
+
+def lifecycle_messages(size: int) -> list:
+    """Lifecycle message contents drawn from the templates by weight"""
+    rng = random.Random(42)
+    weights = [weight for weight, template in TEMPLATES]
+    templates = [template for weight, template in TEMPLATES]
+    return [rng.choices(templates, weights)[0].format(mod=MODERATOR_ID) for _ in range(size)]
+
+def load_recorded(path: str) -> list:
+    """Message contents from a ticket_messages.json-style file or a JSONL export"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".jsonl"):
+            messages = [json.loads(line) for line in f if line.strip()]
+        else:
+            messages = [message for channel in json.load(f).values() for message in channel]
+    return [message["content"] for message in messages if message.get("content")]
+
+def repeat_to(contents: list, size: int) -> list:
+    """Shuffled copies of the contents, size messages in total"""
+    rng = random.Random(42)
+    corpus = [contents[i % len(contents)] for i in range(size)]
+    rng.shuffle(corpus)
+    return corpus
+
+def legacy_classify(content: str):
+    """The original substring checks from process_sahara_message, kept for comparison"""
+    if "closed the ticket" in content.lower():
+        user_match = re.search(r"<@!?(\d+)>", content)
+        return "closed", user_match
+    elif "deleted the ticket" in content.lower():
+        user_match = re.search(r"<@!?(\d+)>", content)
+        return "deleted", user_match
+    return None
+
+def bench(name: str, corpus_name: str, classify, corpus: list) -> None:
+    """Best of REPEATS passes over the corpus"""
+    elapsed = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        matched = sum(1 for content in corpus if classify(content) is not None)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    print(f"{name:<36}{corpus_name:<12}{len(corpus) / elapsed:>14,.0f}{elapsed / len(corpus) * 1e6:>10.2f}{matched:>10}")
+
+if __name__ == "__main__":
+    classifier = MessageClassifier(DEFAULT_MESSAGE_RULES)
+    
+    path = sys.argv[1] if len(sys.argv) > 1 else MESSAGES_FILE
+    if not os.path.exists(path):
+        print(f"Error: {path} not found. Pass a file of recorded messages.")
+        exit(1)
+    recorded = load_recorded(path)
+    print(f"{len(recorded)} recorded message(s) from {path}")
+    
+    # Recorded messages as they are, and mixed with a third of lifecycle events in Sahara's format
+    corpora = [
+        ("recorded", repeat_to(recorded, CORPUS_SIZE)),
+        ("mixed", repeat_to(recorded + lifecycle_messages(len(recorded) // 2), CORPUS_SIZE)),
+    ]
+    
+    print(f"{'implementation':<36}{'corpus':<12}{'messages/s':>14}{'µs/msg':>10}{'matched':>10}")
+    for corpus_name, corpus in corpora:
+        bench("legacy substring checks (2 rules)", corpus_name, legacy_classify, corpus)
+        bench(f"MessageClassifier ({len(classifier.rules)} rules)", corpus_name, partial(classifier.classify, BOT_ID), corpus)
@@ -0,0 +1,92 @@
+"""Benchmark activity recording and report counting
+
+Run from the project root: python -m benchmarks.bench_record_activity [--legacy]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from storage.activity_log import ActivityLog
+
+CHANNEL_COUNTS = [10_000, 100_000]
+USER_ID = 847392052430110760
+FIRST_CHANNEL_ID = 1371499090717970445
+
+def legacy_record(user_activity: dict, user_id: int, channel_id: int, action_type: str) -> None:
+    """The original list-based record_activity, kept for comparison"""
+    for period in ["daily", "weekly", "monthly"]:
+        if user_id not in user_activity[period]:
+            user_activity[period][user_id] = {"addressed": [], "closed": [], "deleted": []}
+        if channel_id not in user_activity[period][user_id].get(action_type, []):
+            user_activity[period][user_id][action_type].append(channel_id)
+
+def channel_ids(count: int, shuffled: bool) -> list:
+    """Snowflake-like channel IDs, in creation order or shuffled"""
+    ids = [FIRST_CHANNEL_ID + i * 4096 for i in range(count)]
+    if shuffled:
+        random.Random(42).shuffle(ids)
+    return ids
+
+def bench_activity_log(count: int, shuffled: bool) -> tuple:
+    """Return (record µs/op, duplicate µs/op, report µs) for one user with count channels"""
+    log = ActivityLog()
+    now = datetime.now(timezone.utc)
+    ts = int(now.timestamp())
+    ids = channel_ids(count, shuffled)
+    
+    started = time.perf_counter()
+    for channel_id in ids:
+        log.add(USER_ID, channel_id, "addressed", ts)
+    record_us = (time.perf_counter() - started) / count * 1e6
+    
+    # Repeated messages in tickets that are already counted
+    started = time.perf_counter()
+    for channel_id in ids:
+        log.add(USER_ID, channel_id, "addressed", ts)
+    duplicate_us = (time.perf_counter() - started) / count * 1e6
+    
+    started = time.perf_counter()
+    for period in ["daily", "weekly", "monthly"]:
+        log.summary(period, now)
+    report_us = (time.perf_counter() - started) * 1e6
+    
+    return record_us, duplicate_us, report_us
+
+def bench_legacy(count: int) -> tuple:
+    """Return (record µs/op, duplicate µs/op, report µs) for the list-based buckets"""
+    user_activity = {"daily": {}, "weekly": {}, "monthly": {}}
+    ids = channel_ids(count, False)
+    
+    started = time.perf_counter()
+    for channel_id in ids:
+        legacy_record(user_activity, USER_ID, channel_id, "addressed")
+    record_us = (time.perf_counter() - started) / count * 1e6
+    
+    sample = ids[:1000]
+    started = time.perf_counter()
+    for channel_id in sample:
+        legacy_record(user_activity, USER_ID, channel_id, "addressed")
+    duplicate_us = (time.perf_counter() - started) / len(sample) * 1e6
+    
+    started = time.perf_counter()
+    for period in ["daily", "weekly", "monthly"]:
+        {user_id: {action_type: len(ids) for action_type, ids in actions.items()}
+         for user_id, actions in user_activity[period].items()}
+    report_us = (time.perf_counter() - started) * 1e6
+    
+    return record_us, duplicate_us, report_us
+
+if __name__ == "__main__":
+    run_legacy = "--legacy" in sys.argv
+    
+    print(f"{'implementation':<28}{'channels':>10}{'record µs/op':>15}{'duplicate µs/op':>18}{'report µs':>12}")
+    for count in CHANNEL_COUNTS:
+        for shuffled in [False, True]:
+            name = "ActivityLog (shuffled IDs)" if shuffled else "ActivityLog"
+            record_us, duplicate_us, report_us = bench_activity_log(count, shuffled)
+            print(f"{name:<28}{count:>10}{record_us:>15.2f}{duplicate_us:>18.2f}{report_us:>12.1f}")
+        
+        # The list scans are quadratic, so 100k channels takes minutes
+        if run_legacy or count <= 10_000:
+            record_us, duplicate_us, report_us = bench_legacy(count)
+            print(f"{'legacy lists':<28}{count:>10}{record_us:>15.2f}{duplicate_us:>18.2f}{report_us:>12.1f}")
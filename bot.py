@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 import asyncio
+import time
+import signal
 import traceback
 from datetime import datetime, timezone
 
@@ -9,6 +11,18 @@ from config_manager import ConfigManager
 from data_manager import DataManager
 from tasks.scheduler import setup_scheduled_tasks
 from tasks.audit_watcher import AuditLogWatcher
+from tasks.channel_watcher import TicketChannelWatcher
+from tasks.persistence import PersistenceWorker
+from tasks.backfill import HistoryBackfill
+from tasks.dashboard import LiveDashboard
+from tasks.stats_api import StatsApi
+from tasks.loop_watchdog import LoopWatchdog
+from tasks.profiler import Profiler
+from user_directory import UserDirectory
+from period_history import PeriodHistory
+from utils.report_renderer import ReportRenderer
+from utils.metrics import BotMetrics
+from utils.tracing import Tracer, current_span
 from utils.helpers import get_current_datetime_utc
 from constants import INTENTS
 
@@ -17,13 +31,42 @@ class TicketBot(commands.Bot):
         super().__init__(command_prefix="!", intents=INTENTS)
         
         # Initialize managers
+        self.metrics = BotMetrics(self)
+        self.tracer = Tracer(self)
+        self.persistence = PersistenceWorker(self)
         self.config_manager = ConfigManager(self)
         self.data_manager = DataManager(self)
+        self.user_directory = UserDirectory(self)
+        self.period_history = PeriodHistory(self)
+        self.channel_watcher = TicketChannelWatcher(self)
+        self.audit_watcher = AuditLogWatcher(self)
         
         # Load configuration and data
-        self.config = self.config_manager.load_config()
+        self.config_manager.apply_config(self.config_manager.load_config())
         self.data_manager.load_data()
         self.data_manager.load_messages()
+        self.user_directory.load()
+        self.period_history.load()
+        
+        # Catches up on messages sent while the bot was offline
+        self.backfill = HistoryBackfill(self)
+        
+        # Keeps rendered reports until the activity data changes
+        self.report_renderer = ReportRenderer(self)
+        
+        # Pinned report messages edited in place as activity comes in
+        self.dashboard = LiveDashboard(self)
+        
+        # Finds out what blocks the event loop; commands are named in its reports
+        self.watchdog = LoopWatchdog(self)
+        self.before_invoke(self.watchdog.command_started)
+        self.after_invoke(self.watchdog.command_finished)
+        
+        # Runs !profile against the live bot
+        self.profiler = Profiler(self)
+        
+        # Read-only HTTP API, started in setup_hook when api_port is configured
+        self.stats_api = None
         
         # Set debug mode
         self.debug_mode = True
@@ -36,7 +79,7 @@ class TicketBot(commands.Bot):
         
         # Setup error handlers
         self.setup_error_handlers()
-        
+    
     def load_command_modules(self):
         """Load all command modules"""
         # Import here to avoid circular imports
@@ -54,7 +97,7 @@ class TicketBot(commands.Bot):
         async def on_command_error(ctx, error):
             if isinstance(error, commands.MissingRequiredArgument):
                 if ctx.command.name == "report":
-                    await ctx.send("❌ Error: Missing required argument.\nUsage: `!report [daily,weekly,monthly]`")
+                    await ctx.send("❌ Error: Missing required argument.\nUsage: `!report [daily,weekly,monthly,rolling]`")
                 elif ctx.command.name == "manage_user":
                     await ctx.send("❌ Error: Missing required argument.\nUsage: `!manage_user [add/remove] @user`")
                 elif ctx.command.name == "add_user" or ctx.command.name == "remove_user_id":
@@ -78,8 +121,57 @@ class TicketBot(commands.Bot):
     async def setup_hook(self) -> None:
         """Set up the bot with tasks and slash commands"""
         # Start background tasks
-        setup_scheduled_tasks(self)
+        self.scheduler = setup_scheduled_tasks(self)
+        self.watchdog.start()
+        
+        # Move data saves off the event loop from now on
+        self.persistence.start()
+        
+        # Pick up manual edits of config.json without a restart
+        self.config_watch_task = self.loop.create_task(self.config_manager.watch())
         
+        # Keep the live dashboards up to date
+        self.dashboard_task = self.loop.create_task(self.dashboard.run())
+        
+        # Serve the stats API for dashboards and scripts
+        if self.config.get("api_port"):
+            try:
+                self.stats_api = StatsApi(self)
+                await self.stats_api.start(self.config.get("api_host") or "127.0.0.1", int(self.config["api_port"]))
+            except Exception as e:
+                print(f"Error starting stats API: {e}")
+                traceback.print_exc()
+                self.stats_api = None
+        
+        # Flush pending data before exiting on SIGTERM
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, lambda: self.loop.create_task(self.close()))
+        except (NotImplementedError, RuntimeError):
+            # Signal handlers are not supported on this platform (e.g. Windows)
+            pass
+    
+    async def close(self) -> None:
+        """Write any pending data before disconnecting"""
+        self.watchdog.stop()
+        try:
+            if self.stats_api is not None:
+                await self.stats_api.close()
+            await self.persistence.close()
+            self.data_manager.close()
+            if self.user_directory.dirty:
+                self.user_directory.save()
+            if self.period_history.dirty:
+                self.period_history.write_snapshot(self.period_history.build_snapshot())
+            if self.data_manager.lifecycles.dirty:
+                self.data_manager.lifecycles.write_snapshot(self.data_manager.lifecycles.build_snapshot())
+        except Exception as e:
+            print(f"Error flushing data on shutdown: {e}")
+            traceback.print_exc()
+        
+        # Last, so traces of the final flush are written too
+        self.tracer.close()
+        await super().close()
+    
     async def on_ready(self) -> None:
         """Called when the bot is ready"""
         print(f"Logged in as {self.user.name} (ID: {self.user.id})")
@@ -109,6 +201,13 @@ class TicketBot(commands.Bot):
         # Check for all known Sahara bot IDs
         await self.config_manager.check_sahara_bots()
         
+        # Seed the user directory from the member cache, then keep it fresh in the background
+        guild = self.get_guild(guild_id)
+        if guild:
+            self.user_directory.observe_members(guild, self.config.get("tracked_users", []) + self.config.get("sahara_bot_ids", []))
+        if not getattr(self, "user_directory_task", None):
+            self.user_directory_task = self.loop.create_task(self.user_directory.run())
+        
         # Sync slash commands with Discord
         if guild_id:
             guild = discord.Object(id=guild_id)
@@ -119,14 +218,14 @@ class TicketBot(commands.Bot):
             await self.tree.sync()
             print("Synchronized slash commands globally")
         
-        # Check for deleted channels on startup
-        deleted_count = await self.data_manager.check_and_remove_deleted_channels()
-        if deleted_count > 0:
-            print(f"Removed {deleted_count} deleted channel(s) during startup.")
+        # Replay ticket messages sent while the bot was offline or disconnected
+        self.backfill.start()
         
-        # Start audit log monitoring
-        self.audit_watcher = AuditLogWatcher(self)
-        self.bg_task = self.loop.create_task(self.audit_watcher.run())
+        # Start audit log monitoring; on reconnects, reconcile channels created while disconnected
+        if not getattr(self, "bg_task", None):
+            self.bg_task = self.loop.create_task(self.audit_watcher.run())
+        else:
+            self.audit_watcher.request_reconcile()
         
         # Set status
         await self.change_presence(activity=discord.Activity(
@@ -134,47 +233,107 @@ class TicketBot(commands.Bot):
             name="ticket activity | !help"
         ))
     
+    async def on_disconnect(self) -> None:
+        """Remember where each ticket channel stood, to catch up once reconnected"""
+        self.backfill.mark_disconnected()
+    
+    async def on_resumed(self) -> None:
+        """Catch up on a resumed session too, since on_ready only fires after a full reconnect"""
+        self.backfill.start()
+    
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel) -> None:
+        """Start tracking new ticket channels"""
+        try:
+            await self.channel_watcher.on_channel_create(channel)
+        except Exception as e:
+            print(f"Error processing new channel: {e}")
+            traceback.print_exc()
+    
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        """Stop tracking deleted ticket channels"""
+        try:
+            self.channel_watcher.on_channel_delete(channel)
+        except Exception as e:
+            print(f"Error processing deleted channel: {e}")
+            traceback.print_exc()
+    
     async def on_message(self, message: discord.Message) -> None:
         """Process messages for activity tracking"""
+        with self.tracer.trace("message", channel_id=message.channel.id, author_id=message.author.id):
+            # Messages in a channel that is still being checked are tracked once it is confirmed
+            started = time.perf_counter()
+            with self.tracer.span("hold_check") as span:
+                held = self.channel_watcher.hold_message(message)
+                span.set("held", held)
+            if not held:
+                await self.track_message(message)
+            tracked = "true" if message.channel.id in self.data_manager.ticket_channels else "false"
+            self.metrics.message_seconds.labels(tracked).observe(time.perf_counter() - started)
+            
+            # Process commands regardless of errors in tracking
+            try:
+                with self.tracer.span("process_commands"):
+                    await self.process_commands(message)
+            except Exception as e:
+                print(f"Error processing commands: {e}")
+                traceback.print_exc()
+    
+    async def track_message(self, message: discord.Message, record_message: bool = True, advance_cursor: bool = True) -> None:
+        """Record ticket activity for a message (record_message=False skips storing an already stored message,
+        advance_cursor=False leaves the channel's cursor to the caller)"""
         try:
-            # List of tracked Sahara bot IDs
-            sahara_bot_ids = self.config.get("sahara_bot_ids", [])
+            with self.tracer.span("channel_check") as span:
+                in_ticket = message.channel.id in self.data_manager.ticket_channels
+                span.set("in_ticket", in_ticket)
+                if in_ticket:
+                    self.backfill.note_live_message(message)
+                    if advance_cursor:
+                        self.data_manager.advance_message_cursor(message.channel.id, message.id)
             
-            # Debug info for any message from any Sahara Bot
-            if message.author.bot and message.author.id in sahara_bot_ids:
-                if self.debug_mode:
-                    print(f"📩 Message from Sahara Bot {message.author.name} (ID: {message.author.id}): '{message.content}'")
+            # Only tracked users and Sahara bots matter; everyone else is rejected with one set lookup
+            with self.tracer.span("config") as span:
+                config = self.compiled_config
+                watched = message.author.id in config.watched_authors
+                span.set("watched", watched)
+            if not watched:
+                return
+            
+            # Messages from Sahara bots are logged on the trace (raise "trace_sample_rate" to see more of them).
+            # Traces are kept on disk, so they hold IDs and lengths, never message text.
+            if message.author.bot and message.author.id in config.sahara_bot_ids:
+                self.user_directory.observe(message.author)
+                current_span().set("message_id", message.id)
+                current_span().set("content_length", len(message.content))
                 
                 # Check for ticket activities
-                if message.channel.id in self.data_manager.ticket_channels:
+                if in_ticket:
                     await self.data_manager.process_sahara_message(message)
             
             # Handle messages from regular users
-            elif not message.author.bot and message.channel.id in self.data_manager.ticket_channels:
+            elif not message.author.bot and in_ticket:
                 # Check if this is a tracked user
-                if message.author.id in self.config.get("tracked_users", []):
+                if message.author.id in config.tracked_users:
+                    self.user_directory.observe(message.author)
+                    
                     # Record ticket being addressed
                     self.data_manager.record_activity(
                         message.author.id,
                         message.channel.id, 
                         message.channel.name,
-                        "addressed"
+                        "addressed",
+                        message.created_at
                     )
                     
                     # Record the moderator's message for future analysis
-                    self.data_manager.record_message(
-                        message.author.id, 
-                        message.author.name,
-                        message.channel.id,
-                        message.content
-                    )
+                    if record_message:
+                        self.data_manager.record_message(
+                            message.author.id, 
+                            message.author.name,
+                            message.channel.id,
+                            message.content,
+                            message.id,
+                            message.created_at
+                        )
         except Exception as e:
             print(f"Error processing message: {e}")
-            traceback.print_exc()
-        
-        # Process commands regardless of errors above
-        try:
-            await self.process_commands(message)
-        except Exception as e:
-            print(f"Error processing commands: {e}")
             traceback.print_exc()
\ No newline at end of file
@@ -1,7 +1,12 @@
+import io
+import time
 import discord
 from discord.ext import commands
 import asyncio
 import traceback
+from datetime import datetime, timezone
+from constants import PROFILE_MAX_SECONDS, TRACE_FILE
+from tasks.scheduler import NEVER
 
 def register_admin_commands(bot):
     """Register all admin commands with the bot"""
@@ -11,11 +16,11 @@ def register_admin_commands(bot):
         if not action or not user:
             await ctx.send("❌ Error: Please specify both action and user.\nExample: `!manage_user add @username` or `!manage_user remove @username`")
             return
-                
+        
         if action.lower() not in ["add", "remove"]:
             await ctx.send("❌ Error: Invalid action. Use 'add' or 'remove'.")
             return
-                
+        
         await manage_user_command(bot, ctx, action.lower(), user)
     
     @bot.command(name="add_user", help="Add user to tracking list by ID: !add_user [user_id]")
@@ -30,6 +35,7 @@ def register_admin_commands(bot):
         try:
             # Try to find user by ID to verify
             user = await bot.fetch_user(user_id)
+            bot.user_directory.observe(user)
             tracked_users.append(user_id)
             bot.config["tracked_users"] = tracked_users
             bot.config_manager.save_config()
@@ -47,7 +53,7 @@ def register_admin_commands(bot):
         if user_id not in tracked_users:
             await ctx.send(f"⚠️ User with ID {user_id} is not in the tracked users list.")
             return
-                
+        
         tracked_users.remove(user_id)
         bot.config["tracked_users"] = tracked_users
         bot.config_manager.save_config()
@@ -91,12 +97,11 @@ def register_admin_commands(bot):
                 return
             
             # Add channel to tracking list
-            bot.data_manager.ticket_channels[channel_id] = (channel.name, guild.id)
-            bot.data_manager.save_data()
+            bot.data_manager.add_ticket_channel(channel_id, channel.name, guild.id)
             
             # Confirmation
             await ctx.send(f"✅ Added channel **{channel.name}** to tracking list.")
-            
+        
         except Exception as e:
             await ctx.send(f"❌ Error adding channel: {str(e)}")
             traceback.print_exc()
@@ -153,17 +158,13 @@ def register_admin_commands(bot):
                     continue
                 
                 # Add channel to tracking list
-                bot.data_manager.ticket_channels[channel_id] = (channel.name, guild.id)
+                bot.data_manager.add_ticket_channel(channel_id, channel.name, guild.id)
                 added_count += 1
-                
+            
             except Exception as e:
                 print(f"Error processing channel reference {reference}: {e}")
                 errors += 1
         
-        # Save data only if channels were added
-        if added_count > 0:
-            bot.data_manager.save_data()
-        
         # Update status message with results
         result = f"✅ Processed {len(channel_references)} channels:\n"
         result += f"• Added: **{added_count}**\n"
@@ -182,7 +183,7 @@ def register_admin_commands(bot):
         if bot_id in sahara_bot_ids:
             await ctx.send(f"⚠️ Bot ID {bot_id} is already in the monitoring list.")
             return
-                
+        
         sahara_bot_ids.append(bot_id)
         bot.config["sahara_bot_ids"] = sahara_bot_ids
         bot.config_manager.save_config()
@@ -196,7 +197,7 @@ def register_admin_commands(bot):
         if bot_id not in sahara_bot_ids:
             await ctx.send(f"⚠️ Bot ID {bot_id} is not in the monitoring list.")
             return
-                
+        
         sahara_bot_ids.remove(bot_id)
         bot.config["sahara_bot_ids"] = sahara_bot_ids
         bot.config_manager.save_config()
@@ -207,7 +208,8 @@ def register_admin_commands(bot):
     async def debug_cmd(ctx, state: str):
         if state.lower() == "on":
             bot.debug_mode = True
-            await ctx.send("✅ Debug mode turned ON. Detailed logging will be shown.")
+            await ctx.send(f"✅ Debug mode turned ON. Detailed logging will be shown. Message traces are sampled separately "
+                           f"(\"trace_sample_rate\" in config.json, now {bot.tracer.sample_rate:.0%}) into `{TRACE_FILE}`.")
         elif state.lower() == "off":
             bot.debug_mode = False
             await ctx.send("✅ Debug mode turned OFF.")
@@ -239,25 +241,32 @@ def register_admin_commands(bot):
             # Wait for 30 seconds for confirmation
             await bot.wait_for('message', check=check, timeout=30.0)
             
-            # Reset all data structures
-            bot.data_manager.user_activity = {
-                "daily": {},
-                "weekly": {},
-                "monthly": {},
-            }
-            
-            # Reset all messages data
-            bot.data_manager.ticket_messages = {}
-            
-            # Save empty data
-            bot.data_manager.save_data()
-            bot.data_manager.save_messages()
+            # Reset all activity and messages data
+            bot.data_manager.reset_all()
+            bot.period_history.clear()
+            await bot.period_history.save()
             
             await ctx.send("✅ All activity data has been reset! Statistics are now clean.")
-            
+        
         except asyncio.TimeoutError:
             await confirmation_msg.edit(content="⚠️ Reset operation cancelled - confirmation timeout.")
     
+    @bot.command(name="dashboard", help="Post a live dashboard in this channel: !dashboard [off]")
+    @commands.has_permissions(administrator=True)
+    async def dashboard_cmd(ctx, action: str = None):
+        try:
+            if action and action.lower() == "off":
+                if bot.dashboard.remove_channel(ctx.channel.id):
+                    await ctx.send("✅ The dashboard in this channel will no longer be updated.")
+                else:
+                    await ctx.send("❌ There is no dashboard in this channel.")
+                return
+            
+            await bot.dashboard.add_channel(ctx.channel)
+        except Exception as e:
+            await ctx.send(f"❌ Error setting up dashboard: {str(e)}")
+            traceback.print_exc()
+    
     @bot.command(name="set_reports_channel", help="Set channel for automatic reports: !set_reports_channel [channel_id]")
     @commands.has_permissions(administrator=True)
     async def set_reports_channel_cmd(ctx, channel_id: int = None):
@@ -275,6 +284,7 @@ def register_admin_commands(bot):
             # Save the channel ID to config
             bot.config["reports_channel_id"] = channel_id
             bot.config_manager.save_config()
+            bot.scheduler.reschedule("alert_unanswered_tickets")
             await ctx.send(f"✅ Set {channel.mention} as the reports channel. Automatic reports will be sent there.")
         except Exception as e:
             await ctx.send(f"❌ Error: {str(e)}")
@@ -299,18 +309,168 @@ def register_admin_commands(bot):
                 for channel in guild.text_channels:
                     if "-" in channel.name:  # Simple check for ticket format
                         if channel.id not in bot.data_manager.ticket_channels:
-                            bot.data_manager.ticket_channels[channel.id] = (channel.name, guild.id)
+                            bot.data_manager.add_ticket_channel(channel.id, channel.name, guild.id)
                             new_count += 1
             
-            # Save data if any new channels found
-            if new_count > 0:
-                bot.data_manager.save_data()
-            
             await message.edit(content=f"✅ Statistics updated!\n• Removed {deleted_count} deleted channels\n• Added {new_count} new channels\n• Total channels tracked: {len(bot.data_manager.ticket_channels)}")
-            
+        
         except Exception as e:
             await ctx.send(f"❌ Error updating statistics: {str(e)}")
             traceback.print_exc()
+    
+    @bot.command(name="persistence_stats", help="Show background data writer statistics")
+    @commands.has_permissions(administrator=True)
+    async def persistence_stats_cmd(ctx):
+        stats = bot.persistence.stats
+        flushes = stats["flushes"]
+        avg_flush_ms = stats["total_flush_ms"] / flushes if flushes else 0.0
+        
+        embed = discord.Embed(
+            title="Persistence Statistics",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Save Requests", value=str(stats["save_requests"]), inline=True)
+        embed.add_field(name="Flushes", value=str(flushes), inline=True)
+        embed.add_field(name="Coalesced Writes", value=str(stats["coalesced_writes"]), inline=True)
+        embed.add_field(name="Failed Flushes", value=str(stats["failed_flushes"]), inline=True)
+        embed.add_field(name="Pending Changes", value=str(bot.persistence.pending_changes), inline=True)
+        embed.add_field(name="Storage Backend", value=bot.config.get("storage_backend", "json"), inline=True)
+        embed.add_field(
+            name="Flush Latency",
+            value=f"Last: {stats['last_flush_ms']:.1f} ms\n"
+                  f"Average: {avg_flush_ms:.1f} ms\n"
+                  f"Max: {stats['max_flush_ms']:.1f} ms\n"
+                  f"On event loop (last): {stats['last_snapshot_ms']:.1f} ms",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    
+    @bot.command(name="audit_status", help="Show audit log watcher progress")
+    @commands.has_permissions(administrator=True)
+    async def audit_status_cmd(ctx):
+        watcher = bot.audit_watcher
+        stats = watcher.stats
+        lag = watcher.lag()
+        
+        embed = discord.Embed(
+            title="Audit Log Watcher",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="High-Water Mark", value=str(watcher.latest_entry_id), inline=True)
+        embed.add_field(name="Poll Interval", value=f"{watcher.interval:.0f} s", inline=True)
+        embed.add_field(name="Lag", value="never caught up" if lag == float("inf") else f"{lag:.0f} s", inline=True)
+        embed.add_field(name="Passes", value=str(stats["passes"]), inline=True)
+        embed.add_field(name="Requests", value=str(stats["requests"]), inline=True)
+        embed.add_field(name="Channels Added", value=str(stats["channels_added"]), inline=True)
+        embed.add_field(
+            name="Entries",
+            value=f"Last pass: {stats['entries_last_pass']}\n"
+                  f"Total: {stats['entries_total']}\n"
+                  f"Behind (current pass): {stats['behind_seconds']:.0f} s",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    
+    @bot.command(name="scheduler_status", help="Show scheduled jobs and their timings")
+    @commands.has_permissions(administrator=True)
+    async def scheduler_status_cmd(ctx):
+        scheduler = bot.scheduler
+        
+        embed = discord.Embed(
+            title="Scheduler",
+            description=f"Wakeups since start: {scheduler.wakeups}",
+            color=discord.Color.blue()
+        )
+        for job in scheduler.jobs.values():
+            stats = job.stats
+            avg_ms = stats["total_ms"] / stats["runs"] if stats["runs"] else 0.0
+            embed.add_field(
+                name=job.name,
+                value=f"Last run: {job.last_run.strftime('%Y-%m-%d %H:%M:%S') if job.last_run else 'never'}\n"
+                      f"Next run: {job.next_run.strftime('%Y-%m-%d %H:%M:%S') if job.next_run and job.next_run != NEVER else 'not planned'}\n"
+                      f"Runs: {stats['runs']} (failed: {stats['failures']}, skipped: {stats['skipped']}, caught up: {stats['caught_up']})\n"
+                      f"Duration: last {stats['last_ms']:.1f} ms, average {avg_ms:.1f} ms, max {stats['max_ms']:.1f} ms\n"
+                      f"Started late by: {stats['last_lateness']:.1f} s",
+                inline=False
+            )
+        
+        await ctx.send(embed=embed)
+    
+    @bot.command(name="stalls", help="Show what blocked the event loop longest: !stalls [count|reset]")
+    @commands.has_permissions(administrator=True)
+    async def stalls_cmd(ctx, arg: str = "5"):
+        watchdog = bot.watchdog
+        if arg.lower() == "reset":
+            watchdog.reset()
+            await ctx.send("✅ Recorded event loop stalls have been cleared.")
+            return
+        
+        try:
+            count = max(1, min(int(arg), 20))
+        except ValueError:
+            await ctx.send("❌ Error: Usage: `!stalls [count|reset]`")
+            return
+        
+        stats = watchdog.stats
+        embed = discord.Embed(
+            title="Event Loop Stalls",
+            description=f"Threshold: {watchdog.threshold * 1000:.0f} ms\n"
+                        f"Stalls: {stats['stalls']} (log lines suppressed: {stats['rate_limited']})\n"
+                        f"Loop lag: last {stats['last_lag_ms']:.1f} ms, max {stats['max_lag_ms']:.1f} ms",
+            color=discord.Color.blue()
+        )
+        
+        offenders = watchdog.top(count)
+        if not offenders:
+            embed.add_field(name="No stalls recorded", value="The event loop has not been blocked past the threshold.", inline=False)
+            await ctx.send(embed=embed)
+            return
+        
+        now = time.time()
+        dump = []
+        for i, stall in enumerate(offenders, 1):
+            embed.add_field(
+                name=f"{i}. {stall.context}",
+                value=f"At: `{stall.location}`\n"
+                      f"Stalls: {stall.count}, blocked {stall.total:.2f} s in total, max {stall.max * 1000:.0f} ms\n"
+                      f"Last seen: {(now - stall.last_seen) / 60:.0f} min ago",
+                inline=False
+            )
+            dump.append(f"#{i} {stall.context} - {stall.count} stall(s), {stall.total:.3f} s total, max {stall.max:.3f} s")
+            dump.extend(f"    {line}" for line in stall.stack)
+            dump.append("")
+        
+        # Full stacks do not fit in an embed
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO("\n".join(dump).encode("utf-8")), filename="stalls.txt"))
+    
+    @bot.command(name="profile", help="Profile the bot and attach the report: !profile <seconds> [cpu|alloc]")
+    @commands.has_permissions(administrator=True)
+    async def profile_cmd(ctx, seconds: int, kind: str = "cpu"):
+        kind = kind.lower()
+        if kind not in ("cpu", "alloc"):
+            await ctx.send("❌ Error: Usage: `!profile <seconds> [cpu|alloc]`")
+            return
+        if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+            await ctx.send(f"❌ Error: The profile must last between 1 and {PROFILE_MAX_SECONDS} seconds.")
+            return
+        if bot.profiler.running:
+            await ctx.send(f"❌ Error: A {bot.profiler.running} profile is already running.")
+            return
+        
+        try:
+            await ctx.send(f"🔬 Profiling {'CPU' if kind == 'cpu' else 'allocations'} for {seconds} s...")
+            report = await (bot.profiler.cpu(seconds) if kind == "cpu" else bot.profiler.alloc(seconds))
+            
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+            await ctx.send(
+                f"✅ {'CPU' if kind == 'cpu' else 'Allocation'} profile finished.",
+                file=discord.File(io.BytesIO(report.encode("utf-8")), filename=f"profile-{kind}-{stamp}.txt")
+            )
+        except Exception as e:
+            await ctx.send(f"❌ Error while profiling: {str(e)}")
+            traceback.print_exc()
 
 
 async def manage_user_command(bot, ctx, action: str, user: discord.User) -> None:
@@ -324,7 +484,7 @@ async def manage_user_command(bot, ctx, action: str, user: discord.User) -> None
         if not ctx.author.guild_permissions.administrator:
             await ctx.send("❌ You need administrator permissions to use this command.")
             return
-        
+    
     tracked_users = bot.config.get("tracked_users", [])
     
     if action == "add":
@@ -367,35 +527,12 @@ async def cleanup_deleted_channels(bot, ctx) -> None:
         await ctx.send("No ticket channels are currently being tracked.")
         return
     
-    # Create copy of dictionary to avoid size change during iteration errors
-    channels_to_check = dict(bot.data_manager.ticket_channels)
-    deleted_count = 0
-    
     # Status check
     status_message = await ctx.send("🔍 Checking for deleted channels...")
     
-    # Check each channel
-    for channel_id, (name, guild_id) in channels_to_check.items():
-        guild = bot.get_guild(guild_id)
-        if not guild:
-            # If server is inaccessible, skip
-            continue
-                
-        channel = guild.get_channel(channel_id)
-        if not channel:
-            # Channel not found - remove from tracking
-            if channel_id in bot.data_manager.ticket_channels:
-                del bot.data_manager.ticket_channels[channel_id]
-                deleted_count += 1
-                
-                # Also remove from recorded messages
-                if channel_id in bot.data_manager.ticket_messages:
-                    del bot.data_manager.ticket_messages[channel_id]
-    
-    # Save updated data
+    # Remove channels together with their recorded messages
+    deleted_count = await bot.data_manager.check_and_remove_deleted_channels()
     if deleted_count > 0:
-        bot.data_manager.save_data()
-        bot.data_manager.save_messages()
         await status_message.edit(content=f"✅ Cleanup complete! Removed {deleted_count} deleted channel(s) from tracking.")
     else:
         await status_message.edit(content="✅ Cleanup complete! No deleted channels found.")
\ No newline at end of file
@@ -3,6 +3,7 @@ from discord.ext import commands
 from datetime import datetime, timezone
 from utils.ui import TicketListPaginator
 from utils.helpers import get_current_datetime_utc
+from utils.report_renderer import format_duration
 
 def register_utility_commands(bot):
     """Register utility commands with the bot"""
@@ -18,7 +19,18 @@ def register_utility_commands(bot):
         embed.add_field(
             name="!report [period]", 
             value="Generate activity report for all users for the specified period.\n" +
-                  "Period can be: 'daily', 'weekly', 'monthly', or combined like 'daily,weekly'", 
+                  "Period can be: 'daily', 'weekly', 'monthly', 'rolling' (actions in the last 24h / 7d / 30d), or combined like 'daily,weekly'", 
+            inline=False
+        )
+        embed.add_field(
+            name="!history [period] [date]", 
+            value="Show the archived report of a past period.\n" +
+                  "Period can be: 'daily', 'weekly', 'biweekly' or 'monthly'; date as YYYY-MM-DD or YYYY-MM (default: the previous period)", 
+            inline=False
+        )
+        embed.add_field(
+            name="!sla [period]", 
+            value="Median and 90th percentile time to first response and to close per moderator, for tickets opened in the period (default: monthly)", 
             inline=False
         )
         embed.add_field(
@@ -41,6 +53,11 @@ def register_utility_commands(bot):
             value="List all tracked ticket channels with links", 
             inline=False
         )
+        embed.add_field(
+            name="!queue [count]", 
+            value="List the tickets waiting longest for a first moderator response (default: 10)", 
+            inline=False
+        )
         embed.add_field(
             name="!list_sahara_bots", 
             value="List all tracked Sahara bot IDs", 
@@ -66,6 +83,11 @@ def register_utility_commands(bot):
             value="Add multiple channels to tracking (Admin only)", 
             inline=False
         )
+        embed.add_field(
+            name="!dashboard [off]", 
+            value="Post a pinned dashboard with daily/weekly/monthly counts in this channel, kept up to date (Admin only)", 
+            inline=False
+        )
         embed.add_field(
             name="!set_reports_channel [channel_id]", 
             value="Set channel for automatic reports (Admin only)", 
@@ -76,6 +98,31 @@ def register_utility_commands(bot):
             value="Update all statistics (Admin only)", 
             inline=False
         )
+        embed.add_field(
+            name="!persistence_stats", 
+            value="Show background data writer statistics (Admin only)", 
+            inline=False
+        )
+        embed.add_field(
+            name="!audit_status",
+            value="Show audit log watcher progress and lag (Admin only)",
+            inline=False
+        )
+        embed.add_field(
+            name="!scheduler_status",
+            value="Show scheduled jobs, their next runs and timings (Admin only)",
+            inline=False
+        )
+        embed.add_field(
+            name="!stalls [count|reset]",
+            value="Show what blocked the event loop longest, with stacks attached (Admin only)",
+            inline=False
+        )
+        embed.add_field(
+            name="!profile <seconds> [cpu|alloc]",
+            value="Profile the running bot and attach collapsed CPU stacks or the top allocation sites (Admin only)",
+            inline=False
+        )
         embed.add_field(
             name="!debug [on/off]",
             value="Toggle debug mode (Admin only)",
@@ -92,6 +139,10 @@ def register_utility_commands(bot):
     async def list_tickets_cmd(ctx):
         await list_tickets_command(bot, ctx)
     
+    @bot.command(name="queue", help="List the tickets waiting longest for a first response: !queue [count]")
+    async def queue_cmd(ctx, count: int = 10):
+        await queue_command(bot, ctx, count)
+    
     @bot.command(name="list_sahara_bots", help="List all tracked Sahara bot IDs")
     async def list_sahara_bots_cmd(ctx):
         sahara_bot_ids = bot.config.get("sahara_bot_ids", [])
@@ -106,12 +157,12 @@ def register_utility_commands(bot):
             color=discord.Color.green()
         )
         
+        names = await bot.user_directory.resolve(sahara_bot_ids)
         for bot_id in sahara_bot_ids:
-            try:
-                bot_user = await bot.fetch_user(bot_id)
-                embed.add_field(name=bot_user.name, value=f"ID: {bot_id}", inline=True)
-            except Exception as e:
-                embed.add_field(name=f"Unknown Bot", value=f"ID: {bot_id}\nError: {str(e)}", inline=True)
+            if names.get(bot_id):
+                embed.add_field(name=names[bot_id], value=f"ID: {bot_id}", inline=True)
+            else:
+                embed.add_field(name=f"Unknown Bot", value=f"ID: {bot_id}\nError: user could not be found", inline=True)
         
         await ctx.send(embed=embed)
 
@@ -130,11 +181,11 @@ async def list_users_command(bot, ctx) -> None:
         color=discord.Color.green()
     )
     
+    names = await bot.user_directory.resolve(tracked_users)
     for user_id in tracked_users:
-        try:
-            user = await bot.fetch_user(user_id)
-            embed.add_field(name=user.name, value=f"ID: {user.id}", inline=True)
-        except Exception as e:
+        if names.get(user_id):
+            embed.add_field(name=names[user_id], value=f"ID: {user_id}", inline=True)
+        else:
             embed.add_field(name=f"Invalid User ID", value=f"ID: {user_id}\nUse `!remove_user_id {user_id}` to remove", inline=True)
     
     current_utc = get_current_datetime_utc()
@@ -143,11 +194,39 @@ async def list_users_command(bot, ctx) -> None:
     await ctx.send(embed=embed)
 
 
+async def queue_command(bot, ctx, count: int) -> None:
+    """Handle the !queue command: the oldest unanswered tickets with links"""
+    queue = bot.data_manager.unanswered
+    if not len(queue):
+        await ctx.send("✅ No tickets are waiting for a response.")
+        return
+    
+    count = max(1, min(count, 25))
+    now = datetime.now(timezone.utc).timestamp()
+    
+    embed = discord.Embed(
+        title="Unanswered Tickets",
+        description=f"**{len(queue)}** ticket(s) waiting for a first response, oldest first:",
+        color=discord.Color.orange()
+    )
+    
+    lines = []
+    for channel_id, created in queue.oldest(count):
+        name, guild_id = bot.data_manager.ticket_channels.get(channel_id, ("unknown", 0))
+        channel_url = f"https://discord.com/channels/{guild_id}/{channel_id}"
+        lines.append(f"• [{name}]({channel_url}) - waiting **{format_duration(now - created)}**")
+    embed.description += "\n" + "\n".join(lines)
+    
+    # Add current date and time in UTC in YYYY-MM-DD HH:MM:SS format
+    current_utc = get_current_datetime_utc()
+    embed.set_footer(text=f"Current UTC Time: {current_utc}")
+    
+    await ctx.send(embed=embed)
+
+
 async def list_tickets_command(bot, ctx) -> None:
     """Handle the !list_tickets command with interactive pagination"""
-    # First check for deleted channels
-    updated = await bot.data_manager.check_and_remove_deleted_channels()
-    
+    # Deleted channels are removed as their delete events arrive
     if not bot.data_manager.ticket_channels:
         await ctx.send("No ticket channels are currently being tracked.")
         return
@@ -156,16 +235,11 @@ async def list_tickets_command(bot, ctx) -> None:
     total_channels = len(bot.data_manager.ticket_channels)
     status_msg = await ctx.send(f"📋 Found **{total_channels}** tracked ticket channels. Preparing pagination view...")
     
-    # Prepare flat list of channels
-    channels = []
-    for channel_id, (name, guild_id) in bot.data_manager.ticket_channels.items():
-        channels.append((channel_id, name, guild_id))
-    
-    # Sort channels by name
-    channels.sort(key=lambda x: x[1])
+    # Flat list of channels sorted by name
+    channels = bot.data_manager.list_ticket_channels()
     
     # Create paginator object
-    paginator = TicketListPaginator(ctx, channels, bot, updated)
+    paginator = TicketListPaginator(ctx, channels, bot)
     
     # Start the paginator
     await paginator.start()
@@ -1,45 +1,109 @@
 import json
 import os
+import asyncio
 from discord.ext import tasks
 from datetime import datetime, timezone
-from constants import CONFIG_FILE, DEFAULT_CONFIG
+from typing import FrozenSet, NamedTuple, Optional
+from constants import CONFIG_FILE, DEFAULT_CONFIG, CONFIG_WATCH_INTERVAL
+from utils.classifier import DEFAULT_MESSAGE_RULES, MessageClassifier
+
+class CompiledConfig(NamedTuple):
+    """Immutable snapshot of the settings read for every message"""
+    tracked_users: FrozenSet[int]
+    sahara_bot_ids: FrozenSet[int]
+    watched_authors: FrozenSet[int]  # Tracked users and Sahara bots: the only authors whose messages matter
+    guild_id: Optional[int]
+    has_tracked_users: bool
+    classifier: MessageClassifier    # Ticket bot message rules, compiled
+
+def compile_config(config: dict) -> CompiledConfig:
+    """Build the lookup sets for a configuration dict"""
+    tracked_users = frozenset(config.get("tracked_users", []))
+    sahara_bot_ids = frozenset(config.get("sahara_bot_ids", []))
+    return CompiledConfig(
+        tracked_users=tracked_users,
+        sahara_bot_ids=sahara_bot_ids,
+        watched_authors=tracked_users | sahara_bot_ids,
+        guild_id=config.get("guild_id"),
+        has_tracked_users=bool(tracked_users),
+        classifier=MessageClassifier(config.get("message_rules", DEFAULT_MESSAGE_RULES)),
+    )
 
 class ConfigManager:
     def __init__(self, bot):
         self.bot = bot
+        self._file_mtime = None  # Modification time of config.json as last read or written
     
     def load_config(self) -> dict:
         """Load bot configuration from file or create default"""
         if os.path.exists(CONFIG_FILE):
             try:
-                with open(CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                    
-                    # Update config if it uses old format with one bot ID
-                    if "sahara_bot_id" in config and "sahara_bot_ids" not in config:
-                        config["sahara_bot_ids"] = [
-                            config.get("sahara_bot_id"),
-                            1275351977286570056,
-                            1335639507411664896
-                        ]
-                    
-                    # Add reports channel key if it doesn't exist
-                    if "reports_channel_id" not in config:
-                        config["reports_channel_id"] = None
-                    
-                    return config
+                return self._read_config_file()
             except Exception as e:
                 print(f"Error loading config: {e}")
                 return DEFAULT_CONFIG
         else:
             with open(CONFIG_FILE, 'w') as f:
                 json.dump(DEFAULT_CONFIG, f, indent=4)
+            self._file_mtime = os.stat(CONFIG_FILE).st_mtime
             return DEFAULT_CONFIG
-
+    
+    def _read_config_file(self) -> dict:
+        """Read config.json and bring it up to the current format"""
+        self._file_mtime = os.stat(CONFIG_FILE).st_mtime
+        with open(CONFIG_FILE, 'r') as f:
+            config = json.load(f)
+            
+            # Update config if it uses old format with one bot ID
+            if "sahara_bot_id" in config and "sahara_bot_ids" not in config:
+                config["sahara_bot_ids"] = [
+                    config.get("sahara_bot_id"),
+                    1275351977286570056,
+                    1335639507411664896
+                ]
+            
+            # Add reports channel key if it doesn't exist
+            if "reports_channel_id" not in config:
+                config["reports_channel_id"] = None
+            
+            # Default to the JSON storage backend
+            if "storage_backend" not in config:
+                config["storage_backend"] = "json"
+            
+            return config
+    
+    def apply_config(self, config: dict) -> None:
+        """Swap in a configuration together with its compiled snapshot"""
+        # Both assignments happen without yielding to the event loop, so handlers never see a mix
+        self.bot.compiled_config = compile_config(config)
+        self.bot.config = config
+    
     def save_config(self) -> None:
-        """Save configuration to file"""
+        """Save configuration to file and recompile the lookup snapshot"""
+        self.bot.compiled_config = compile_config(self.bot.config)
         with open(CONFIG_FILE, 'w') as f:
             json.dump(self.bot.config, f, indent=4)
+        self._file_mtime = os.stat(CONFIG_FILE).st_mtime
+    
+    async def watch(self) -> None:
+        """Reload config.json when it is edited by hand"""
+        while True:
+            await asyncio.sleep(CONFIG_WATCH_INTERVAL)
+            try:
+                if not os.path.exists(CONFIG_FILE) or os.stat(CONFIG_FILE).st_mtime == self._file_mtime:
+                    continue
+                
+                config = self._read_config_file()
+                if config.get("storage_backend") != self.bot.config.get("storage_backend"):
+                    print("Warning: storage_backend changes take effect after a restart.")
+                self.apply_config(config)
+                if getattr(self.bot, "scheduler", None) is not None:
+                    self.bot.scheduler.reschedule("alert_unanswered_tickets")
+                print(f"Reloaded {CONFIG_FILE}: tracking {len(config.get('tracked_users', []))} user(s), "
+                      f"{len(config.get('sahara_bot_ids', []))} Sahara bot(s)")
+            except Exception as e:
+                # Most likely a half-saved edit; keep the current configuration and retry on the next change
+                print(f"Error reloading config: {e}")
     
     def _cleanup_invalid_users(self):
         """Clean up the list of tracked users from invalid IDs"""
@@ -0,0 +1,11 @@
+from types import SimpleNamespace
+import pytest
+
+@pytest.fixture
+def bot():
+    """Minimal stand-in for the bot: configuration and a persistence worker that only records dirty kinds"""
+    dirty = set()
+    return SimpleNamespace(
+        config={"guild_id": 1},
+        persistence=SimpleNamespace(running=True, dirty=dirty, mark_dirty=dirty.add),
+    )
@@ -4,6 +4,95 @@ import discord
 CONFIG_FILE = "config.json"
 DATA_FILE = "activity_data.json"
 MESSAGES_FILE = "ticket_messages.json"
+MESSAGES_DIR = "ticket_messages"
+JOURNAL_FILE = "activity_journal.jsonl"
+ROTATED_JOURNAL_FILE = "activity_journal.jsonl.1"
+SQLITE_FILE = "activity.db"
+USER_DIRECTORY_FILE = "user_directory.json"
+AUDIT_STATE_FILE = "audit_watcher_state.json"
+MESSAGE_CURSORS_FILE = "message_cursors.json"
+SCHEDULER_STATE_FILE = "scheduler_state.json"
+PERIOD_HISTORY_FILE = "period_history.json.gz"
+LIFECYCLE_FILE = "ticket_lifecycles.json"
+DASHBOARD_STATE_FILE = "dashboard_state.json"
+TRACE_FILE = "traces.jsonl"
+
+# Number of journal records after which the activity snapshot is compacted
+JOURNAL_COMPACT_THRESHOLD = 500
+
+# Number of channels whose ticket messages are kept in memory
+MESSAGE_CACHE_CHANNELS = 64
+
+# User directory: names older than USER_DIRECTORY_MAX_AGE seconds are refreshed in the background
+USER_DIRECTORY_MAX_AGE = 7 * 24 * 3600
+USER_DIRECTORY_REFRESH_INTERVAL = 6 * 3600
+USER_DIRECTORY_SAVE_INTERVAL = 60
+USER_FETCH_CONCURRENCY = 4
+
+# Audit log polling interval bounds in seconds; halved while channels are created, doubled while idle
+AUDIT_POLL_MIN_INTERVAL = 10
+AUDIT_POLL_MAX_INTERVAL = 300
+
+# Seconds between checks of config.json for manual edits
+CONFIG_WATCH_INTERVAL = 5
+
+# Number of ticket channels whose history is caught up at the same time after downtime
+BACKFILL_CONCURRENCY = 3
+
+# Messages replayed between cursor saves during catch-up (one page of channel history)
+BACKFILL_PAGE_SIZE = 100
+
+# Archived period snapshots: daily ones are kept for HISTORY_DAILY_DAYS, weekly and bi-weekly ones
+# for HISTORY_WEEKLY_DAYS, monthly ones forever. Raw activity events are kept for ACTIVITY_RETENTION_DAYS.
+HISTORY_DAILY_DAYS = 92
+HISTORY_WEEKLY_DAYS = 730
+ACTIVITY_RETENTION_DAYS = 92
+
+# Ticket lifecycle records (for !sla) are kept for this many days after the ticket was created
+LIFECYCLE_RETENTION_DAYS = 92
+
+# Live dashboard: seconds between edits (overridable with "dashboard_interval_seconds" in config.json),
+# never less than the minimum, which keeps well within Discord's message edit rate limit
+DASHBOARD_EDIT_INTERVAL = 30
+DASHBOARD_MIN_EDIT_INTERVAL = 5
+
+# HTTP stats API: responses kept encoded, and the largest page size
+API_CACHE_SIZE = 64
+API_DEFAULT_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+# Event loop watchdog: the heartbeat interval in seconds, the lag counted as a stall (overridable with
+# "stall_threshold_ms" in config.json), how often one offender is logged, and how many offenders are kept
+WATCHDOG_BEAT_INTERVAL = 0.1
+WATCHDOG_STALL_THRESHOLD_MS = 250
+WATCHDOG_CAPTURE_COOLDOWN = 300
+WATCHDOG_MAX_OFFENDERS = 50
+
+# !profile: longest profile in seconds, the CPU sampling interval, frames kept per allocation trace
+# and the number of allocation sites reported
+PROFILE_MAX_SECONDS = 120
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TRACEMALLOC_FRAMES = 10
+PROFILE_TOP_ALLOCATIONS = 50
+
+# Tracing: share of messages traced (overridable with "trace_sample_rate" in config.json, independent of
+# debug mode), and the size at which the trace file is rotated, keeping TRACE_BACKUP_COUNT old files
+TRACE_SAMPLE_RATE = 0.01
+TRACE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+
+# Seconds between checks for tickets waiting longer than queue_alert_minutes
+QUEUE_ALERT_INTERVAL = 60
+
+# Longest the scheduler sleeps before re-checking the clock, in seconds
+SCHEDULER_MAX_SLEEP = 3600
+
+# Tracked channels checked between yields to the event loop when reconciling deleted channels
+RECONCILE_CHUNK_SIZE = 200
+
+# Background persistence: flush at most every PERSIST_INTERVAL_MS, or sooner after PERSIST_MAX_CHANGES changes
+PERSIST_INTERVAL_MS = 2000
+PERSIST_MAX_CHANGES = 200
 
 # Configure intents
 INTENTS = discord.Intents.default()
@@ -18,5 +107,9 @@ DEFAULT_CONFIG = {
     "tracked_users": [1267999362601189400],  # Your ID
     "sahara_bot_ids": [1275351977286570056, 1335639507411664896],  # Sahara AI bot IDs
     "guild_id": 1209630079936630824,  # Your server ID
-    "reports_channel_id": None  # ID for automatic reports channel
+    "reports_channel_id": None,  # ID for automatic reports channel
+    "api_host": "127.0.0.1",  # Address of the read-only HTTP stats API
+    "api_port": None,  # Port of the HTTP stats API (None: disabled)
+    "queue_alert_minutes": 0,  # Alert in the reports channel when a ticket waits this long for a response (0: off)
+    "storage_backend": "json"  # "json" or "sqlite"
 }
\ No newline at end of file
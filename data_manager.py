@@ -1,9 +1,13 @@
-import os
-import json
-import re
-from datetime import datetime, timezone
+import time
+import asyncio
+from datetime import datetime, timezone, timedelta
 from typing import Dict, Set, List, Optional, Tuple, Union, Any
-from constants import DATA_FILE, MESSAGES_FILE
+from storage import create_storage
+from utils.classifier import mentioned_user_ids
+from utils.rolling import RollingActivity, ROLLING_RESOLUTIONS
+from utils.tracing import current_span
+from ticket_lifecycle import TicketLifecycles, UnansweredQueue
+from constants import RECONCILE_CHUNK_SIZE
 
 class DataManager:
     def __init__(self, bot):
@@ -11,252 +15,312 @@ class DataManager:
         
         # Data structures
         self.ticket_channels: Dict[int, Tuple[str, int]] = {}  # channel_id -> (channel_name, guild_id)
+        self.last_message_ids: Dict[int, int] = {}  # channel_id -> last processed message ID
         
-        # Activity data structure
-        self.user_activity = {
-            "daily": {},    # user_id -> {"addressed": [channel_ids], "closed": [channel_ids], "deleted": [channel_ids]}
-            "weekly": {},   # user_id -> {"addressed": [channel_ids], "closed": [channel_ids], "deleted": [channel_ids]}
-            "monthly": {},  # user_id -> {"addressed": [channel_ids], "closed": [channel_ids], "deleted": [channel_ids]}
-        }
+        # Sliding-window counts (last 24 hours / 7 days / 30 days), rebuilt from stored events on load
+        self.rolling = RollingActivity()
+        
+        # Created / first response / closed / deleted times of recent tickets
+        self.lifecycles = TicketLifecycles()
+        bot.persistence.register("lifecycles", self.lifecycles.build_snapshot,
+                                 lambda kind, rows: TicketLifecycles.write_snapshot(rows))
+        
+        # Tracked tickets no moderator has answered yet, oldest first
+        self.unanswered = UnansweredQueue()
+        
+        # Tombstones: channel IDs are never reused, so a deleted channel is never tracked again
+        self.deleted_channels: Set[int] = set()
         
-        # Ticket messages structure
-        self.ticket_messages = {}  # channel_id -> [{"user_id": id, "username": name, "timestamp": time, "content": msg}]
+        # Storage backend, created once the configuration is loaded
+        self.storage = None
+        
+        # Incremented when tracked channels or recorded messages change (for HTTP API ETags)
+        self.channels_version = 0
+        self.messages_version = 0
     
     def load_data(self) -> None:
-        """Load activity data from file"""
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    
-                    # Convert channel IDs and user IDs to integers
-                    if "ticket_channels" in data:
-                        if isinstance(data["ticket_channels"], list):
-                            # Old format - update it
-                            self.ticket_channels = {int(channel_id): ("unknown", self.bot.config.get("guild_id", 0)) 
-                                               for channel_id in data["ticket_channels"]}
-                        else:
-                            # New format with names and guild IDs
-                            self.ticket_channels = {int(channel_id): (info[0], int(info[1])) 
-                                               for channel_id, info in data["ticket_channels"].items()}
-                    
-                    # Load activity data
-                    if "user_activity" in data:
-                        for period in ["daily", "weekly", "monthly"]:
-                            if period in data["user_activity"]:
-                                for user_id_str, actions in data["user_activity"][period].items():
-                                    user_id = int(user_id_str)
-                                    self.user_activity[period][user_id] = {}
-                                    for action_type, channel_list in actions.items():
-                                        self.user_activity[period][user_id][action_type] = [int(ch_id) for ch_id in channel_list]
-            except Exception as e:
-                print(f"Error loading data: {e}")
-                self.initialize_data()  # Create a new data structure
-        else:
-            self.initialize_data()  # Create a new data structure
+        """Load activity data from the configured storage backend"""
+        self.storage = create_storage(self.bot)
+        self.ticket_channels = self.storage.load_data()
+        self.last_message_ids = self.storage.load_message_cursors()
+        
+        now = datetime.now(timezone.utc)
+        longest = max(bucket_seconds * size for bucket_seconds, size in ROLLING_RESOLUTIONS.values())
+        self.rolling.load(self.storage.iter_activity(now - timedelta(seconds=longest)), int(now.timestamp()))
+        
+        self.lifecycles.load()
     
     def load_messages(self) -> None:
-        """Load ticket messages from file"""
-        if os.path.exists(MESSAGES_FILE):
-            try:
-                with open(MESSAGES_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Convert channel IDs to integers
-                    self.ticket_messages = {int(channel_id): messages for channel_id, messages in data.items()}
-            except Exception as e:
-                print(f"Error loading ticket messages: {e}")
-                self.ticket_messages = {}
-        else:
-            self.ticket_messages = {}
-            self.save_messages()
+        """Load ticket messages from the configured storage backend"""
+        self.storage.load_messages()
+        
+        # Recent channels tracked before lifecycles were recorded get a record from their first recorded message (once);
+        # older ones are skipped before any messages are read
+        for channel_id in self.ticket_channels:
+            if channel_id not in self.lifecycles.tickets and self.lifecycles.retained(channel_id):
+                self.lifecycles.seed(channel_id, self.storage.get_first_ticket_message(channel_id))
+        self.unanswered.load(self.lifecycles, self.ticket_channels)
+    
+    def save_data(self) -> None:
+        """Save activity data, in the background when the persistence worker is running"""
+        self.storage.request_save("data")
     
     def save_messages(self) -> None:
-        """Save ticket messages to file"""
-        with open(MESSAGES_FILE, 'w', encoding='utf-8') as f:
-            # Convert channel IDs to strings for JSON serialization
-            data = {str(channel_id): messages for channel_id, messages in self.ticket_messages.items()}
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        """Save ticket messages, in the background when the persistence worker is running"""
+        self.storage.request_save("messages")
     
-    def initialize_data(self) -> None:
-        """Initialize empty data structures"""
-        self.user_activity = {
-            "daily": {},
-            "weekly": {},
-            "monthly": {},
-        }
+    def close(self) -> None:
+        """Close the storage backend"""
+        if self.storage is not None:
+            self.storage.close()
+    
+    def add_ticket_channel(self, channel_id: int, channel_name: str, guild_id: int, discovered: bool = False) -> None:
+        """Start tracking a ticket channel (discovered: found live as it was created, not by a scan or command)"""
+        # A lookup that finished after the channel was deleted must not bring it back
+        if channel_id in self.deleted_channels:
+            return
+        is_new = channel_id not in self.ticket_channels
+        self.ticket_channels[channel_id] = (channel_name, guild_id)
+        self.storage.add_ticket_channel(channel_id, channel_name, guild_id)
         
-        self.save_data()
-
-    def save_data(self) -> None:
-        """Save activity data to file"""
-        data = {
-            "ticket_channels": {str(channel_id): [name, str(guild_id)] 
-                              for channel_id, (name, guild_id) in self.ticket_channels.items()},
-            
-            "user_activity": {
-                period: {
-                    str(user_id): {
-                        action_type: [str(ch_id) for ch_id in channel_ids]
-                        for action_type, channel_ids in actions.items()
-                    }
-                    for user_id, actions in period_data.items()
-                }
-                for period, period_data in self.user_activity.items()
-            }
-        }
+        if is_new:
+            self.channels_version += 1
+        
+        # Only tickets opened just now start a lifecycle and wait in the queue; channels added in bulk
+        # (!update_stats, audit log catch-up) may be months old and would all be overdue at once
+        if is_new and discovered and self.lifecycles.retained(channel_id):
+            ticket = self.lifecycles.note_created(channel_id)
+            self._save_lifecycles()
+            if ticket.first_response is None and ticket.closed is None and ticket.deleted is None:
+                self.unanswered.push(channel_id, ticket.created)
+                
+                # The new ticket may become overdue before any ticket already waiting
+                scheduler = getattr(self.bot, "scheduler", None)
+                if scheduler is not None:
+                    scheduler.reschedule("alert_unanswered_tickets", earlier_only=True)
+    
+    def _save_lifecycles(self) -> None:
+        """Have the persistence worker write the lifecycle table if it changed (on shutdown otherwise)"""
+        if self.lifecycles.dirty and self.bot.persistence.running:
+            self.bot.persistence.mark_dirty("lifecycles")
+    
+    def remove_ticket_channels(self, channel_ids: List[int]) -> None:
+        """Stop tracking ticket channels and drop their recorded messages"""
+        for channel_id in channel_ids:
+            self.ticket_channels.pop(channel_id, None)
+            self.last_message_ids.pop(channel_id, None)
+            self.unanswered.discard(channel_id)
+        self.storage.remove_ticket_channels(channel_ids)
+        self.channels_version += 1
+        self.messages_version += 1
+    
+    def mark_channel_deleted(self, channel_id: int) -> bool:
+        """Handle a channel delete event, return True if the channel was tracked"""
+        self.deleted_channels.add(channel_id)
+        if channel_id not in self.ticket_channels:
+            return False
         
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        self.lifecycles.note_channel_deleted(channel_id, time.time())
+        self._save_lifecycles()
+        
+        self.remove_ticket_channels([channel_id])
+        return True
+    
+    def list_ticket_channels(self) -> List[Tuple[int, str, int]]:
+        """List tracked channels as (channel_id, name, guild_id), sorted by name"""
+        return self.storage.list_ticket_channels()
+    
+    def get_activity_summary(self, period: str) -> Dict[int, Dict[str, int]]:
+        """Get per-user counts of addressed/closed/deleted tickets for the current daily, weekly, biweekly or monthly period"""
+        return self.storage.get_activity_summary(period, datetime.now(timezone.utc))
+    
+    def get_activity_summaries(self, periods: List[str]) -> Dict[str, Dict[int, Dict[str, int]]]:
+        """Get the summaries of several periods in one pass (period -> summary)"""
+        return self.storage.get_activity_summaries(periods, datetime.now(timezone.utc))
+    
+    def get_range_summary(self, start: datetime, end: datetime) -> Dict[int, Dict[str, int]]:
+        """Get per-user counts between two day boundaries (for archiving closed periods)"""
+        return self.storage.get_range_summary(start, end)
+    
+    def earliest_activity(self) -> Optional[datetime]:
+        """Time of the oldest stored activity event, or None if there is none"""
+        return self.storage.earliest_activity()
     
-    def record_activity(self, user_id: int, channel_id: int, channel_name: str, action_type: str) -> None:
-        """Record user activity with the specified action type"""
-        if user_id not in self.bot.config.get("tracked_users", []):
-            if self.bot.debug_mode:
-                print(f"⚠️ User {user_id} is not in tracked users list - activity not recorded")
+    def prune_activity(self, before: datetime) -> int:
+        """Delete activity events older than the given day boundary"""
+        return self.storage.prune_activity(before)
+    
+    def get_rolling_summary(self) -> Dict[int, Dict[str, Dict[str, int]]]:
+        """Get per-user counts over the last 24 hours, 7 days and 30 days (user_id -> action_type -> window -> count)"""
+        return self.rolling.summary(int(time.time()))
+    
+    @property
+    def activity_version(self) -> int:
+        """Changes whenever activity counts may have changed"""
+        return self.storage.activity_version
+    
+    def get_ticket_messages(self, channel_id: int) -> List[Dict[str, Any]]:
+        """Get recorded moderator messages for a ticket channel"""
+        return self.storage.get_ticket_messages(channel_id)
+    
+    def advance_message_cursor(self, channel_id: int, message_id: int) -> None:
+        """Remember that a channel's messages up to message_id have been processed"""
+        if message_id > self.last_message_ids.get(channel_id, 0):
+            self.last_message_ids[channel_id] = message_id
+            self.storage.set_last_message_id(channel_id, message_id)
+    
+    def reset_all(self) -> None:
+        """Delete all activity data, recorded messages and message cursors"""
+        self.storage.reset_all()
+        self.last_message_ids.clear()
+        self.messages_version += 1
+        self.bot.dashboard.notify()
+        self.rolling.clear()
+        self.lifecycles.clear()
+        self._save_lifecycles()
+        self.unanswered.load(self.lifecycles, ())
+    
+    def record_activity(self, user_id: int, channel_id: int, channel_name: str, action_type: str,
+                        when: Optional[datetime] = None) -> None:
+        """Record user activity with the specified action type, at when (default: now)"""
+        with self.bot.tracer.span("record_activity", user_id=user_id, action_type=action_type) as span:
+            self._record_activity(span, user_id, channel_id, channel_name, action_type, when)
+    
+    def _record_activity(self, span, user_id: int, channel_id: int, channel_name: str, action_type: str,
+                         when: Optional[datetime]) -> None:
+        if user_id not in self.bot.compiled_config.tracked_users:
+            span.set("untracked", True)
             return
-            
-        now = datetime.now(timezone.utc)
+        
+        now = when or datetime.now(timezone.utc)
         
         # Record activity for all periods
-        for period in ["daily", "weekly", "monthly"]:
-            # Initialize data structures if needed
-            if user_id not in self.user_activity[period]:
-                self.user_activity[period][user_id] = {"addressed": [], "closed": [], "deleted": []}
-            
-            # Add the channel to the appropriate action list if not already there
-            if channel_id not in self.user_activity[period][user_id].get(action_type, []):
-                if action_type not in self.user_activity[period][user_id]:
-                    self.user_activity[period][user_id][action_type] = []
-                    
-                self.user_activity[period][user_id][action_type].append(channel_id)
-                if self.bot.debug_mode or action_type in ["closed", "deleted"]:
-                    print(f"[{now}] ✅ {action_type.title()} activity recorded: User {user_id} on channel {channel_name} for {period}")
+        with self.bot.tracer.span("persist"):
+            new_periods = self.storage.record_activity(user_id, channel_id, action_type, now)
+        span.set("new_periods", new_periods)
+        
+        # First response, close and delete times feed !sla
+        self.lifecycles.note(channel_id, action_type, user_id, now.timestamp())
+        self._save_lifecycles()
+        if action_type in ("addressed", "closed", "deleted"):
+            self.unanswered.discard(channel_id)
+        
+        if new_periods is None:
+            # Already recorded for this channel today
+            return
+        self.bot.dashboard.notify()
+        
+        # Rolling windows count each channel once per day, like the day partitions
+        self.rolling.add(user_id, action_type, int(now.timestamp()), int(time.time()))
+        
+        # Activity caught up from history may belong to periods that are already archived
+        if when is not None:
+            self.bot.period_history.note_activity(now)
         
-        # Save data
-        self.save_data()
+        if action_type in ["closed", "deleted"]:
+            for period in new_periods:
+                print(f"[{now}] ✅ {action_type.title()} activity recorded: User {user_id} on channel {channel_name} for {period}")
     
-    def record_message(self, user_id: int, username: str, channel_id: int, message_content: str) -> None:
+    def record_message(self, user_id: int, username: str, channel_id: int, message_content: str,
+                       message_id: Optional[int] = None, when: Optional[datetime] = None) -> None:
         """Record moderator's message in a ticket"""
         if channel_id not in self.ticket_channels:
             return
-            
+        
         # Get current time in UTC
-        now = datetime.now(timezone.utc)
+        now = when or datetime.now(timezone.utc)
         timestamp = now.isoformat()
         
-        # Create structure for channel if it doesn't exist
-        if channel_id not in self.ticket_messages:
-            self.ticket_messages[channel_id] = []
-            
         # Add message
         message_data = {
             "user_id": user_id,
             "username": username,
             "timestamp": timestamp,
-            "content": message_content
+            "content": message_content,
+            "message_id": message_id
         }
         
-        self.ticket_messages[channel_id].append(message_data)
-        
-        # Save data
-        self.save_messages()
+        with self.bot.tracer.span("record_message"):
+            started = time.perf_counter()
+            self.storage.record_message(channel_id, message_data)
+            self.bot.metrics.message_append_seconds.observe(time.perf_counter() - started)
+        self.messages_version += 1
     
     async def check_and_remove_deleted_channels(self) -> int:
-        """Check for and remove deleted channels, return count of removed channels"""
+        """Remove channels deleted without a delete event (e.g. while offline), return count of removed channels"""
         if not self.ticket_channels:
             return 0
-            
-        # Create copy of dictionary
-        channels_to_check = dict(self.ticket_channels)
-        deleted_count = 0
         
-        for channel_id, (name, guild_id) in channels_to_check.items():
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                continue
-                
-            channel = guild.get_channel(channel_id)
-            if not channel:
-                if channel_id in self.ticket_channels:
-                    del self.ticket_channels[channel_id]
-                    deleted_count += 1
-                    
-                    # Also remove channel from recorded messages
-                    if channel_id in self.ticket_messages:
-                        del self.ticket_messages[channel_id]
+        # Deletions are normally applied from gateway events; this full scan is only a rare
+        # reconciliation, so it checks the channels in chunks and lets other events run in between
+        channel_ids = list(self.ticket_channels)
+        deleted_channels = []
         
-        if deleted_count > 0:
-            self.save_data()
-            self.save_messages()
+        for i in range(0, len(channel_ids), RECONCILE_CHUNK_SIZE):
+            for channel_id in channel_ids[i:i + RECONCILE_CHUNK_SIZE]:
+                entry = self.ticket_channels.get(channel_id)
+                if entry is None:
+                    # Removed by a delete event during the scan
+                    continue
+                
+                # Skip servers that are inaccessible or in an outage, whose channel lists are empty
+                guild = self.bot.get_guild(entry[1])
+                if not guild or guild.unavailable:
+                    continue
+                
+                if not guild.get_channel(channel_id):
+                    deleted_channels.append(channel_id)
             
-        return deleted_count
+            await asyncio.sleep(0)
+        
+        # Also removes the channels' recorded messages
+        if deleted_channels:
+            self.deleted_channels.update(deleted_channels)
+            self.remove_ticket_channels(deleted_channels)
+        
+        return len(deleted_channels)
     
     async def process_sahara_message(self, message):
         """Process message from Sahara bot for ticket activities"""
-        content = message.content
+        classifier = self.bot.compiled_config.classifier
+        with self.bot.tracer.span("classify") as span:
+            match = classifier.classify(message.author.id, message.content, message.embeds)
+            if match is not None:
+                span.set("action_type", match[0])
+                span.set("matched_length", len(match[1]))
+        if match is None:
+            return
         
-        # For closed tickets
-        if "closed the ticket" in content.lower():
-            if self.bot.debug_mode:
-                print(f"🔍 Found closed ticket pattern in #{message.channel.name}: '{content}'")
-            
-            # Check for mentions
-            if message.mentions:
-                for mention in message.mentions:
-                    user_id = mention.id
-                    if user_id in self.bot.config.get("tracked_users", []):
-                        self.record_activity(
-                            user_id,
-                            message.channel.id, 
-                            message.channel.name,
-                            "closed"
-                        )
-                        print(f"✅ Recorded 'closed' activity for user {mention.name} in channel {message.channel.name}")
-                    elif self.bot.debug_mode:
-                        print(f"⚠️ User {mention.name} (ID: {mention.id}) not in tracked list - activity not recorded")
-            else:
-                # Alternate approach - try to find ID through regex (for old mention formats)
-                user_match = re.search(r"<@!?(\d+)>", content)
-                if user_match:
-                    user_id = int(user_match.group(1))
-                    if user_id in self.bot.config.get("tracked_users", []):
-                        self.record_activity(
-                            user_id,
-                            message.channel.id,
-                            message.channel.name,
-                            "closed"
-                        )
-                        print(f"✅ Recorded 'closed' activity for user ID {user_id} in channel {message.channel.name}")
+        action_type, text = match
         
-        # For deleted tickets
-        elif "deleted the ticket" in content.lower():
-            if self.bot.debug_mode:
-                print(f"🔍 Found deleted ticket pattern in #{message.channel.name}: '{content}'")
-            
-            # Check for mentions
-            if message.mentions:
-                for mention in message.mentions:
-                    user_id = mention.id
-                    if user_id in self.bot.config.get("tracked_users", []):
-                        self.record_activity(
-                            user_id,
-                            message.channel.id,
-                            message.channel.name,
-                            "deleted"
-                        )
-                        print(f"✅ Recorded 'deleted' activity for user {mention.name} in channel {message.channel.name}")
-                    elif self.bot.debug_mode:
-                        print(f"⚠️ User {mention.name} (ID: {mention.id}) not in tracked list - activity not recorded")
-            else:
-                # Alternate approach using regex
-                user_match = re.search(r"<@!?(\d+)>", content)
-                if user_match:
-                    user_id = int(user_match.group(1))
-                    if user_id in self.bot.config.get("tracked_users", []):
-                        self.record_activity(
-                            user_id,
-                            message.channel.id,
-                            message.channel.name,
-                            "deleted"
-                        )
-                        print(f"✅ Recorded 'deleted' activity for user ID {user_id} in channel {message.channel.name}")
\ No newline at end of file
+        tracked_users = self.bot.compiled_config.tracked_users
+        
+        # Check for mentions
+        if message.mentions:
+            for mention in message.mentions:
+                user_id = mention.id
+                if user_id in tracked_users:
+                    self.record_activity(
+                        user_id,
+                        message.channel.id,
+                        message.channel.name,
+                        action_type,
+                        message.created_at
+                    )
+                    print(f"✅ Recorded '{action_type}' activity for user {mention.name} in channel {message.channel.name}")
+                else:
+                    current_span().set("untracked_mention", mention.id)
+        else:
+            # Alternate approach - find the ID in the text (old mention formats, mentions inside embeds)
+            user_ids = mentioned_user_ids(text)
+            if user_ids:
+                user_id = user_ids[0]
+                if user_id in tracked_users:
+                    self.record_activity(
+                        user_id,
+                        message.channel.id,
+                        message.channel.name,
+                        action_type,
+                        message.created_at
+                    )
+                    print(f"✅ Recorded '{action_type}' activity for user ID {user_id} in channel {message.channel.name}")
@@ -0,0 +1,160 @@
+import os
+import gzip
+import json
+import time
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional, Set
+from constants import PERIOD_HISTORY_FILE, HISTORY_DAILY_DAYS, HISTORY_WEEKLY_DAYS, ACTIVITY_RETENTION_DAYS
+from storage.activity_log import SECONDS_PER_DAY
+from utils.periods import period_start, period_end
+
+# Periods archived when they end, shortest first
+HISTORY_PERIODS = ["daily", "weekly", "biweekly", "monthly"]
+
+# Days each kind of snapshot is kept for (None: forever); older days survive in the longer periods
+HISTORY_RETENTION_DAYS = {
+    "daily": HISTORY_DAILY_DAYS,
+    "weekly": HISTORY_WEEKLY_DAYS,
+    "biweekly": HISTORY_WEEKLY_DAYS,
+    "monthly": None,
+}
+
+class PeriodHistory:
+    """Per-user counts of every closed period, archived at rollover so past periods need no raw events"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        
+        # period -> period start (YYYY-MM-DD) -> user_id -> action_type -> count
+        self.snapshots: Dict[str, Dict[str, Dict[int, Dict[str, int]]]] = {period: {} for period in HISTORY_PERIODS}
+        
+        # period -> end of the last archived window; everything before it is archived
+        self.archived_until: Dict[str, datetime] = {}
+        
+        # Days that received activity after they ended (e.g. caught up from channel history)
+        self.late_days: Set[datetime] = set()
+        self.dirty = False
+    
+    def load(self) -> None:
+        """Load the archive from file"""
+        if not os.path.exists(PERIOD_HISTORY_FILE):
+            return
+        
+        try:
+            with gzip.open(PERIOD_HISTORY_FILE, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            for period in HISTORY_PERIODS:
+                self.snapshots[period] = {
+                    start: {int(user_id): counts for user_id, counts in summary.items()}
+                    for start, summary in data["snapshots"].get(period, {}).items()
+                }
+            self.archived_until = {period: datetime.fromisoformat(end) for period, end in data["archived_until"].items()}
+        except Exception as e:
+            print(f"Error loading period history: {e}")
+    
+    def build_snapshot(self) -> dict:
+        """Copy the archive into a JSON-ready structure"""
+        self.dirty = False
+        return {
+            "snapshots": {period: {start: {str(user_id): dict(counts) for user_id, counts in summary.items()}
+                                   for start, summary in snapshots.items()}
+                          for period, snapshots in self.snapshots.items()},
+            "archived_until": {period: end.isoformat() for period, end in self.archived_until.items()},
+        }
+    
+    @staticmethod
+    def write_snapshot(data: dict) -> None:
+        """Write an archive snapshot to file, compressed (safe to call from a worker thread)"""
+        temp_file = PERIOD_HISTORY_FILE + ".tmp"
+        with gzip.open(temp_file, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_file, PERIOD_HISTORY_FILE)
+    
+    def clear(self) -> None:
+        """Delete all archived periods (saved by the next save())"""
+        self.snapshots = {period: {} for period in HISTORY_PERIODS}
+        self.archived_until = {}
+        self.late_days.clear()
+        self.dirty = True
+    
+    async def save(self) -> None:
+        """Write the archive in a worker thread if it changed"""
+        if self.dirty:
+            await asyncio.get_running_loop().run_in_executor(None, self.write_snapshot, self.build_snapshot())
+    
+    def note_activity(self, when: datetime) -> None:
+        """Remember activity recorded for a day that may already be archived"""
+        # Called for every tracked message, so the common case is a single comparison
+        if when.timestamp() < time.time() // SECONDS_PER_DAY * SECONDS_PER_DAY:
+            self.late_days.add(period_start("daily", when))
+    
+    def get(self, period: str, when: datetime) -> Optional[Dict[int, Dict[str, int]]]:
+        """Archived counts of the period containing when, or None if it is not (or no longer) archived"""
+        return self.snapshots[period].get(period_start(period, when).strftime("%Y-%m-%d"))
+    
+    def _archive_window(self, period: str, start: datetime) -> None:
+        """Store the counts of one closed window"""
+        summary = self.bot.data_manager.get_range_summary(start, period_end(period, start))
+        self.snapshots[period][start.strftime("%Y-%m-%d")] = summary
+        self.dirty = True
+    
+    def archive(self, now: datetime) -> int:
+        """Archive every window that closed since the last run, downsample and prune, return windows archived"""
+        today = period_start("daily", now)
+        raw_cutoff = today - timedelta(days=ACTIVITY_RETENTION_DAYS)
+        archived = 0
+        
+        # Re-archive closed windows that received late activity, while their raw events still exist
+        late_days, self.late_days = self.late_days, set()
+        for period in HISTORY_PERIODS:
+            starts = {period_start(period, day) for day in late_days}
+            for start in starts:
+                if start >= raw_cutoff and period_end(period, start) <= self.archived_until.get(period, start):
+                    self._archive_window(period, start)
+                    archived += 1
+        
+        earliest = self.bot.data_manager.earliest_activity()
+        for period in HISTORY_PERIODS:
+            start = self.archived_until.get(period)
+            if start is None:
+                if earliest is None:
+                    continue
+                start = period_start(period, earliest)
+            
+            # Windows older than the retention would be dropped right away
+            retention = HISTORY_RETENTION_DAYS[period]
+            if retention is not None:
+                start = max(start, period_start(period, today - timedelta(days=retention)))
+            
+            while period_end(period, start) <= now:
+                self._archive_window(period, start)
+                archived += 1
+                start = period_end(period, start)
+            self.archived_until[period] = start
+        
+        # Downsample: short periods are dropped first, their days remain covered by longer ones
+        for period, retention in HISTORY_RETENTION_DAYS.items():
+            if retention is None:
+                continue
+            cutoff = (today - timedelta(days=retention)).strftime("%Y-%m-%d")
+            old_starts = [start for start in self.snapshots[period] if start < cutoff]
+            for start in old_starts:
+                del self.snapshots[period][start]
+            if old_starts:
+                self.dirty = True
+        
+        # Every closed window is archived now, so raw events past the retention are no longer needed
+        pruned = self.bot.data_manager.prune_activity(raw_cutoff)
+        if pruned:
+            print(f"Pruned activity older than {raw_cutoff.strftime('%Y-%m-%d')} ({pruned} removed)")
+        
+        return archived
+    
+    async def run_archive(self) -> None:
+        """Archive closed periods and save the archive in the background"""
+        archived = self.archive(datetime.now(timezone.utc))
+        if archived:
+            print(f"Archived {archived} closed period(s)")
+        
+        await self.save()
@@ -0,0 +1,17 @@
+# This file makes the storage directory a Python package
+from storage.json_store import JsonStorage
+from storage.sqlite_store import SqliteStorage
+
+# Available DataManager storage backends, selected with the "storage_backend" config key
+STORAGE_BACKENDS = {
+    "json": JsonStorage,
+    "sqlite": SqliteStorage,
+}
+
+def create_storage(bot):
+    """Create the storage backend selected in the configuration"""
+    backend = bot.config.get("storage_backend", "json")
+    if backend not in STORAGE_BACKENDS:
+        print(f"Warning: Unknown storage backend '{backend}', using 'json'")
+        backend = "json"
+    return STORAGE_BACKENDS[backend](bot)
@@ -0,0 +1,194 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.periods import PERIODS, period_start, period_end
+
+SECONDS_PER_DAY = 86400
+
+# Periods whose current window keeps a running index and counts
+INDEXED_PERIODS = PERIODS + ["biweekly"]
+
+def legacy_bucket_events(user_activity: dict, now: datetime) -> Iterator[Tuple[int, int, str, int]]:
+    """Convert old daily/weekly/monthly buckets into (user_id, channel_id, action_type, ts) events"""
+    # Buckets carry no timestamps, so place each entry at the start of its period
+    for period in PERIODS:
+        ts = int(period_start(period, now).timestamp())
+        for user_id, actions in user_activity.get(period, {}).items():
+            for action_type, channel_ids in actions.items():
+                for channel_id in channel_ids:
+                    yield int(user_id), int(channel_id), action_type, ts
+
+class ChannelSet:
+    """Sorted channel IDs with the second of the day each was first seen, stored in flat arrays"""
+    
+    __slots__ = ("channels", "offsets")
+    
+    def __init__(self):
+        self.channels = array('Q')  # Sorted channel IDs
+        self.offsets = array('I')   # Seconds since midnight, parallel to channels
+    
+    def add(self, channel_id: int, offset: int) -> bool:
+        """Insert a channel, return False if it is already present"""
+        # Channel IDs are snowflakes that grow over time, so this is almost always an append
+        channels = self.channels
+        if not channels or channel_id > channels[-1]:
+            channels.append(channel_id)
+            self.offsets.append(offset)
+            return True
+        
+        i = bisect_left(channels, channel_id)
+        if i < len(channels) and channels[i] == channel_id:
+            return False
+        channels.insert(i, channel_id)
+        self.offsets.insert(i, offset)
+        return True
+    
+    def __contains__(self, channel_id: int) -> bool:
+        i = bisect_left(self.channels, channel_id)
+        return i < len(self.channels) and self.channels[i] == channel_id
+    
+    def __len__(self) -> int:
+        return len(self.channels)
+
+class PeriodIndex:
+    """Distinct channels and running counts for the current window of one period"""
+    
+    def __init__(self, period: str):
+        self.period = period
+        self.start_ts = 0
+        self.end_ts = 0
+        self.channels: Dict[Tuple[int, str], set] = {}  # (user_id, action_type) -> channel IDs
+        self.counts: Dict[int, Dict[str, int]] = {}     # user_id -> action_type -> count
+    
+    def covers(self, ts: int) -> bool:
+        """Check whether ts falls into the indexed window"""
+        return self.start_ts <= ts < self.end_ts
+    
+    def add(self, user_id: int, channel_id: int, action_type: str) -> bool:
+        """Add a channel, return False if it was already counted in this window"""
+        channels = self.channels.get((user_id, action_type))
+        if channels is None:
+            channels = self.channels[(user_id, action_type)] = set()
+        elif channel_id in channels:
+            return False
+        
+        channels.add(channel_id)
+        user_counts = self.counts.get(user_id)
+        if user_counts is None:
+            user_counts = self.counts[user_id] = {}
+        user_counts[action_type] = user_counts.get(action_type, 0) + 1
+        return True
+
+class ActivityLog:
+    """Timestamped activity events partitioned by UTC day"""
+    
+    def __init__(self):
+        # day number -> (user_id, action_type) -> channels first recorded that day
+        self.partitions: Dict[int, Dict[Tuple[int, str], ChannelSet]] = {}
+        
+        # Running indexes for the current daily/weekly/biweekly/monthly windows, built lazily
+        self.period_indexes = {period: PeriodIndex(period) for period in INDEXED_PERIODS}
+    
+    def add(self, user_id: int, channel_id: int, action_type: str, ts: int) -> Optional[List[str]]:
+        """Insert an event, return the indexed periods in which the channel is new (None if already recorded that day)"""
+        day, offset = divmod(ts, SECONDS_PER_DAY)
+        partition = self.partitions.get(day)
+        if partition is None:
+            partition = self.partitions[day] = {}
+        
+        channels = partition.get((user_id, action_type))
+        if channels is None:
+            channels = partition[(user_id, action_type)] = ChannelSet()
+        if not channels.add(channel_id, offset):
+            # Already recorded that day, and therefore in every longer period too
+            return None
+        
+        new_periods = []
+        for period, index in self.period_indexes.items():
+            if not index.covers(ts):
+                if ts < index.start_ts:
+                    # Older than the current window (e.g. replayed history)
+                    continue
+                self._rebuild_index(index, ts)
+                # The rebuild already picked up this event
+                new_periods.append(period)
+            elif index.add(user_id, channel_id, action_type):
+                new_periods.append(period)
+        return new_periods
+    
+    def _rebuild_index(self, index: PeriodIndex, ts: int) -> None:
+        """Point the index at the window containing ts and fill it from the day partitions"""
+        now = datetime.fromtimestamp(ts, timezone.utc)
+        index.start_ts = int(period_start(index.period, now).timestamp())
+        index.end_ts = int(period_end(index.period, now).timestamp())
+        index.channels = {}
+        index.counts = {}
+        
+        for day in range(index.start_ts // SECONDS_PER_DAY, index.end_ts // SECONDS_PER_DAY):
+            partition = self.partitions.get(day)
+            if partition is None:
+                continue
+            for (user_id, action_type), channels in partition.items():
+                for channel_id in channels.channels:
+                    index.add(user_id, channel_id, action_type)
+    
+    def summary(self, period: str, now: datetime) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type for the period containing now"""
+        ts = int(now.timestamp())
+        index = self.period_indexes.get(period)
+        if index is not None:
+            if not index.covers(ts):
+                self._rebuild_index(index, ts)
+            return {user_id: dict(counts) for user_id, counts in index.counts.items()}
+        
+        return self.range_summary(int(period_start(period, now).timestamp()), int(period_end(period, now).timestamp()))
+    
+    def range_summary(self, start_ts: int, end_ts: int) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type between two day-aligned timestamps"""
+        channels_by_key = {}
+        for day in range(start_ts // SECONDS_PER_DAY, end_ts // SECONDS_PER_DAY):
+            partition = self.partitions.get(day)
+            if partition is None:
+                continue
+            for key, channels in partition.items():
+                channels_by_key.setdefault(key, set()).update(channels.channels)
+        
+        summary = {}
+        for (user_id, action_type), channels in channels_by_key.items():
+            summary.setdefault(user_id, {})[action_type] = len(channels)
+        return summary
+    
+    def prune(self, before_day: int) -> int:
+        """Delete the partitions of days before before_day, return count of days removed"""
+        old_days = [day for day in self.partitions if day < before_day]
+        for day in old_days:
+            del self.partitions[day]
+        return len(old_days)
+    
+    def clear(self) -> None:
+        """Delete all events"""
+        self.partitions = {}
+        self.period_indexes = {period: PeriodIndex(period) for period in INDEXED_PERIODS}
+    
+    def to_json(self) -> Dict[str, List[list]]:
+        """Serialize as {day: [[user_id, action_type, [channel_ids], [offsets]], ...]}"""
+        return {
+            str(day): [[user_id, action_type, channels.channels.tolist(), channels.offsets.tolist()]
+                       for (user_id, action_type), channels in partition.items()]
+            for day, partition in self.partitions.items()
+        }
+    
+    def load_json(self, data: Dict[str, List[list]]) -> None:
+        """Load events serialized by to_json"""
+        for day_str, entries in data.items():
+            day_ts = int(day_str) * SECONDS_PER_DAY
+            for entry in entries:
+                if isinstance(entry[2], list):
+                    user_id, action_type, channel_ids, offsets = entry
+                    for channel_id, offset in zip(channel_ids, offsets):
+                        self.add(int(user_id), int(channel_id), action_type, day_ts + int(offset))
+                else:
+                    # One event per entry: [user_id, action_type, channel_id, ts]
+                    user_id, action_type, channel_id, ts = entry
+                    self.add(int(user_id), int(channel_id), action_type, int(ts))
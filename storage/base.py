@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+class StorageBackend:
+    """Interface implemented by every DataManager storage backend"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        
+        # Incremented whenever activity counts may have changed; report caches compare against it
+        self.activity_version = 0
+    
+    # Loading
+    def load_data(self) -> Dict[int, Tuple[str, int]]:
+        """Load activity data, return tracked ticket channels (channel_id -> (name, guild_id))"""
+        raise NotImplementedError
+    
+    def load_messages(self) -> None:
+        """Load (or open) the ticket message store"""
+        raise NotImplementedError
+    
+    def load_message_cursors(self) -> Dict[int, int]:
+        """Load the last processed message ID of each ticket channel"""
+        raise NotImplementedError
+    
+    # Ticket channels
+    def add_ticket_channel(self, channel_id: int, name: str, guild_id: int) -> None:
+        """Persist a newly tracked ticket channel"""
+        raise NotImplementedError
+    
+    def remove_ticket_channels(self, channel_ids: List[int]) -> None:
+        """Forget ticket channels and their recorded messages"""
+        raise NotImplementedError
+    
+    def list_ticket_channels(self) -> List[Tuple[int, str, int]]:
+        """List tracked channels as (channel_id, name, guild_id), sorted by name"""
+        raise NotImplementedError
+    
+    # Activity
+    def record_activity(self, user_id: int, channel_id: int, action_type: str, now: datetime) -> Optional[List[str]]:
+        """Record activity, return the periods in which it was new (None if already recorded that day)"""
+        raise NotImplementedError
+    
+    def get_activity_summary(self, period: str, now: datetime) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type for the period (daily, weekly, biweekly or monthly)"""
+        raise NotImplementedError
+    
+    def get_activity_summaries(self, periods: List[str], now: datetime) -> Dict[str, Dict[int, Dict[str, int]]]:
+        """Count activity for several periods at once (period -> summary)"""
+        return {period: self.get_activity_summary(period, now) for period in periods}
+    
+    def get_range_summary(self, start: datetime, end: datetime) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type between two day boundaries"""
+        raise NotImplementedError
+    
+    def iter_activity(self, since: datetime) -> Iterator[Tuple[int, str, int]]:
+        """Yield (user_id, action_type, ts) for every activity event at or after since"""
+        raise NotImplementedError
+    
+    def earliest_activity(self) -> Optional[datetime]:
+        """Time of the oldest stored activity event, or None if there is none"""
+        raise NotImplementedError
+    
+    def prune_activity(self, before: datetime) -> int:
+        """Delete activity events older than the given day boundary, return count of days or events removed"""
+        raise NotImplementedError
+    
+    def reset_all(self) -> None:
+        """Delete all activity data, recorded messages and message cursors"""
+        raise NotImplementedError
+    
+    # Ticket messages
+    def record_message(self, channel_id: int, message_data: Dict[str, Any]) -> None:
+        """Store one moderator message"""
+        raise NotImplementedError
+    
+    def get_ticket_messages(self, channel_id: int) -> List[Dict[str, Any]]:
+        """Get all recorded moderator messages for a channel"""
+        raise NotImplementedError
+    
+    def get_first_ticket_message(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Get the first recorded moderator message of a channel, without reading the others"""
+        raise NotImplementedError
+    
+    def messages_size(self) -> int:
+        """Bytes taken by the recorded moderator messages (cheap enough to call on every metrics scrape)"""
+        raise NotImplementedError
+    
+    def set_last_message_id(self, channel_id: int, message_id: int) -> None:
+        """Remember the last processed message of a channel"""
+        raise NotImplementedError
+    
+    # Persistence (driven by PersistenceWorker)
+    def build_snapshots(self, kinds: set) -> List[Tuple[str, Any]]:
+        """Capture dirty state on the event loop, return (kind, payload) pairs to write"""
+        raise NotImplementedError
+    
+    def write_snapshot(self, kind: str, payload: Any) -> int:
+        """Write a captured snapshot (runs in a worker thread), return bytes written"""
+        raise NotImplementedError
+    
+    def snapshot_written(self, kind: str) -> None:
+        """Called on the event loop once a snapshot is safely on disk"""
+        pass
+    
+    def request_save(self, kind: str) -> None:
+        """Save in the background when the persistence worker is running, otherwise immediately"""
+        if self.bot.persistence.running:
+            self.bot.persistence.mark_dirty(kind)
+        else:
+            self.write_now(kind)
+    
+    def write_now(self, kind: str) -> None:
+        """Synchronously save one kind of state"""
+        for snapshot_kind, payload in self.build_snapshots({kind}):
+            self.write_snapshot(snapshot_kind, payload)
+            self.snapshot_written(snapshot_kind)
+    
+    def close(self) -> None:
+        """Release any open files or connections"""
+        pass
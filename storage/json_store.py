@@ -0,0 +1,306 @@
+import os
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+from constants import DATA_FILE, MESSAGE_CURSORS_FILE, JOURNAL_FILE, ROTATED_JOURNAL_FILE, JOURNAL_COMPACT_THRESHOLD
+from storage.activity_log import ActivityLog, SECONDS_PER_DAY, legacy_bucket_events
+from storage.base import StorageBackend
+from storage.message_store import MessageSegmentStore
+from utils.periods import PERIODS
+
+class JsonStorage(StorageBackend):
+    """Keeps everything in memory; snapshots to JSON files plus an append-only activity journal"""
+    
+    def __init__(self, bot):
+        super().__init__(bot)
+        
+        # Data structures
+        self.ticket_channels: Dict[int, Tuple[str, int]] = {}  # channel_id -> (channel_name, guild_id)
+        
+        # Activity events partitioned by day; periods are range queries over it
+        self.activity_log = ActivityLog()
+        
+        # Ticket messages, one segment file per channel: [{"user_id": id, "username": name, "timestamp": time, "content": msg}]
+        self.messages = MessageSegmentStore()
+        
+        # Activity journal state
+        self.journal_seq = 0       # Sequence number of the last journal record written or replayed
+        self.journal_entries = 0   # Journal records written since the last snapshot
+        self._journal = None       # Open journal file handle (append mode)
+        
+        # Last processed message ID per ticket channel, for catching up after downtime
+        self.message_cursors: Dict[int, int] = {}
+    
+    def load_data(self) -> Dict[int, Tuple[str, int]]:
+        """Load activity data from file"""
+        if os.path.exists(DATA_FILE):
+            try:
+                with open(DATA_FILE, 'r') as f:
+                    data = json.load(f)
+                    
+                    # Convert channel IDs and user IDs to integers
+                    if "ticket_channels" in data:
+                        if isinstance(data["ticket_channels"], list):
+                            # Old format - update it
+                            self.ticket_channels = {int(channel_id): ("unknown", self.bot.config.get("guild_id", 0))
+                                               for channel_id in data["ticket_channels"]}
+                        else:
+                            # New format with names and guild IDs
+                            self.ticket_channels = {int(channel_id): (info[0], int(info[1]))
+                                               for channel_id, info in data["ticket_channels"].items()}
+                    
+                    # Load activity data
+                    if "activity_log" in data:
+                        self.activity_log.load_json(data["activity_log"])
+                    elif "user_activity" in data:
+                        # Old format with daily/weekly/monthly buckets - convert it
+                        for user_id, channel_id, action_type, ts in legacy_bucket_events(data["user_activity"], datetime.now(timezone.utc)):
+                            self.activity_log.add(user_id, channel_id, action_type, ts)
+                    
+                    self.journal_seq = int(data.get("journal_seq", 0))
+            except Exception as e:
+                print(f"Error loading data: {e}")
+                self.initialize_data()  # Create a new data structure
+        else:
+            self.initialize_data()  # Create a new data structure
+        
+        # Apply activity recorded after the snapshot was written
+        replayed = self.replay_journal()
+        if replayed > 0:
+            print(f"Replayed {replayed} record(s) from the activity journal.")
+            self.request_save("data")
+        
+        return self.ticket_channels
+    
+    def initialize_data(self) -> None:
+        """Initialize empty data structures"""
+        self.activity_log = ActivityLog()
+        
+        self.request_save("data")
+    
+    def load_messages(self) -> None:
+        """Open the per-channel message segments; messages are read when first requested"""
+        self.messages.open()
+    
+    def load_message_cursors(self) -> Dict[int, int]:
+        """Load the last processed message ID of each channel"""
+        if os.path.exists(MESSAGE_CURSORS_FILE):
+            try:
+                with open(MESSAGE_CURSORS_FILE, 'r') as f:
+                    self.message_cursors = {int(channel_id): int(message_id) for channel_id, message_id in json.load(f).items()}
+            except Exception as e:
+                print(f"Error loading message cursors: {e}")
+                self.message_cursors = {}
+        
+        return dict(self.message_cursors)
+    
+    def replay_journal(self) -> int:
+        """Apply journal records newer than the loaded snapshot, return count of replayed records"""
+        replayed = 0
+        
+        # A rotated journal is left behind if the bot stopped before its snapshot was written
+        for journal_file in [ROTATED_JOURNAL_FILE, JOURNAL_FILE]:
+            if not os.path.exists(journal_file):
+                continue
+            
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A partially written last line after a crash - nothing after it is usable
+                        break
+                    
+                    if record["s"] <= self.journal_seq:
+                        continue
+                    
+                    op = record.get("op")
+                    if op is None:
+                        self.activity_log.add(record["u"], record["c"], record["a"], int(datetime.fromisoformat(record["t"]).timestamp()))
+                    elif op == "add":
+                        self.ticket_channels[record["c"]] = (record["n"], record["g"])
+                    elif op == "del":
+                        for channel_id in record["c"]:
+                            self.ticket_channels.pop(channel_id, None)
+                    self.journal_seq = record["s"]
+                    replayed += 1
+        
+        return replayed
+    
+    def _append_journal(self, record: Dict[str, Any]) -> None:
+        """Append a single record to the journal, compacting into a full snapshot only occasionally"""
+        if self._journal is None:
+            self._journal = open(JOURNAL_FILE, 'a', encoding='utf-8')
+        
+        self.journal_seq += 1
+        self._journal.write(json.dumps({"s": self.journal_seq, **record}, separators=(',', ':')) + "\n")
+        self._journal.flush()
+        self.journal_entries += 1
+        
+        if self.journal_entries >= JOURNAL_COMPACT_THRESHOLD:
+            self.request_save("data")
+    
+    def _rotate_journal(self) -> None:
+        """Move the current journal aside; it is deleted once the snapshot covering it is written"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self.journal_entries = 0
+        
+        if not os.path.exists(JOURNAL_FILE):
+            return
+        
+        if os.path.exists(ROTATED_JOURNAL_FILE):
+            # The previous snapshot write failed - keep its records alongside the new ones
+            with open(JOURNAL_FILE, 'r', encoding='utf-8') as src, open(ROTATED_JOURNAL_FILE, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            os.remove(JOURNAL_FILE)
+        else:
+            os.replace(JOURNAL_FILE, ROTATED_JOURNAL_FILE)
+    
+    # Ticket channels
+    def add_ticket_channel(self, channel_id: int, name: str, guild_id: int) -> None:
+        """Persist a newly tracked ticket channel"""
+        self.ticket_channels[channel_id] = (name, guild_id)
+        self._append_journal({"op": "add", "c": channel_id, "n": name, "g": guild_id})
+    
+    def remove_ticket_channels(self, channel_ids: List[int]) -> None:
+        """Forget ticket channels and their recorded messages"""
+        for channel_id in channel_ids:
+            self.ticket_channels.pop(channel_id, None)
+            self.messages.delete(channel_id)
+            self.message_cursors.pop(channel_id, None)
+        
+        self._append_journal({"op": "del", "c": list(channel_ids)})
+        self.request_save("cursors")
+    
+    def list_ticket_channels(self) -> List[Tuple[int, str, int]]:
+        """List tracked channels as (channel_id, name, guild_id), sorted by name"""
+        channels = [(channel_id, name, guild_id) for channel_id, (name, guild_id) in self.ticket_channels.items()]
+        channels.sort(key=lambda x: x[1])
+        return channels
+    
+    # Activity
+    def record_activity(self, user_id: int, channel_id: int, action_type: str, now: datetime) -> Optional[List[str]]:
+        """Record activity, return the periods in which it was new (None if already recorded that day)"""
+        new_periods = self.activity_log.add(user_id, channel_id, action_type, int(now.timestamp()))
+        if new_periods is None:
+            return None
+        self.activity_version += 1
+        
+        self._append_journal({"u": user_id, "c": channel_id, "a": action_type, "t": now.isoformat()})
+        
+        return [period for period in PERIODS if period in new_periods]
+    
+    def get_activity_summary(self, period: str, now: datetime) -> Dict[int, Dict[str, int]]:
+        """Read the running counts for the period"""
+        return self.activity_log.summary(period, now)
+    
+    def get_range_summary(self, start: datetime, end: datetime) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type between two day boundaries"""
+        return self.activity_log.range_summary(int(start.timestamp()), int(end.timestamp()))
+    
+    def iter_activity(self, since: datetime) -> Iterator[Tuple[int, str, int]]:
+        """Yield (user_id, action_type, ts) for every activity event at or after since"""
+        since_ts = int(since.timestamp())
+        for day, partition in self.activity_log.partitions.items():
+            if (day + 1) * SECONDS_PER_DAY <= since_ts:
+                continue
+            for (user_id, action_type), channels in partition.items():
+                for offset in channels.offsets:
+                    ts = day * SECONDS_PER_DAY + offset
+                    if ts >= since_ts:
+                        yield user_id, action_type, ts
+    
+    def earliest_activity(self) -> Optional[datetime]:
+        """Start of the oldest day with activity, or None if there is none"""
+        if not self.activity_log.partitions:
+            return None
+        return datetime.fromtimestamp(min(self.activity_log.partitions) * SECONDS_PER_DAY, timezone.utc)
+    
+    def prune_activity(self, before: datetime) -> int:
+        """Delete day partitions older than the given day boundary, return count of days removed"""
+        removed = self.activity_log.prune(int(before.timestamp()) // SECONDS_PER_DAY)
+        if removed:
+            self.request_save("data")
+        return removed
+    
+    def reset_all(self) -> None:
+        """Delete all activity data, recorded messages and message cursors"""
+        self.activity_log.clear()
+        self.messages.clear()
+        self.message_cursors.clear()
+        self.activity_version += 1
+        
+        self.request_save("data")
+        self.request_save("cursors")
+    
+    # Ticket messages
+    def record_message(self, channel_id: int, message_data: Dict[str, Any]) -> None:
+        """Append one moderator message to its channel's segment"""
+        self.messages.append(channel_id, message_data)
+    
+    def get_ticket_messages(self, channel_id: int) -> List[Dict[str, Any]]:
+        """Get all recorded moderator messages for a channel"""
+        return self.messages.get(channel_id)
+    
+    def get_first_ticket_message(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Read the head of the channel's segment"""
+        return self.messages.first(channel_id)
+    
+    def messages_size(self) -> int:
+        """Total size of the message segments"""
+        return self.messages.total_bytes
+    
+    def set_last_message_id(self, channel_id: int, message_id: int) -> None:
+        """Remember the last processed message of a channel"""
+        self.message_cursors[channel_id] = message_id
+        # Called for every tracked message; the persistence worker coalesces these into one write per interval
+        self.request_save("cursors")
+    
+    # Persistence
+    def build_snapshots(self, kinds: set) -> List[Tuple[str, Any]]:
+        """Copy dirty state into JSON-ready structures"""
+        snapshots = []
+        
+        if "data" in kinds:
+            # Records journaled from now on are not covered by this snapshot
+            self._rotate_journal()
+            
+            snapshots.append(("data", {
+                "journal_seq": self.journal_seq,
+                
+                "ticket_channels": {str(channel_id): [name, str(guild_id)]
+                                  for channel_id, (name, guild_id) in self.ticket_channels.items()},
+                
+                "activity_log": self.activity_log.to_json()
+            }))
+        
+        if "cursors" in kinds:
+            snapshots.append(("cursors", {str(channel_id): message_id for channel_id, message_id in self.message_cursors.items()}))
+        
+        # Messages are appended to their segments directly, so "messages" needs no snapshot
+        
+        return snapshots
+    
+    def write_snapshot(self, kind: str, payload: Any) -> int:
+        """Write a snapshot to file (safe to call from a worker thread), return its size"""
+        path = MESSAGE_CURSORS_FILE if kind == "cursors" else DATA_FILE
+        
+        # Write to a temporary file first so a crash never leaves a half-written snapshot
+        temp_file = path + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=4 if kind == "data" else None)
+        os.replace(temp_file, path)
+        return os.path.getsize(path)
+    
+    def snapshot_written(self, kind: str) -> None:
+        """Delete the rotated journal once the snapshot covering it is on disk"""
+        if kind == "data" and os.path.exists(ROTATED_JOURNAL_FILE):
+            os.remove(ROTATED_JOURNAL_FILE)
+    
+    def close(self) -> None:
+        """Close the journal file"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,110 @@
+import os
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+from constants import MESSAGES_DIR, MESSAGES_FILE, MESSAGE_CACHE_CHANNELS
+
+class MessageSegmentStore:
+    """Ticket messages in one append-only segment file per channel, with an LRU of loaded channels"""
+    
+    def __init__(self, directory: str = MESSAGES_DIR, cache_size: int = MESSAGE_CACHE_CHANNELS):
+        self.directory = directory
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()  # channel_id -> messages
+        self.total_bytes = 0  # Size of all segments, kept up to date as they change
+    
+    def open(self) -> None:
+        """Create the segment directory, splitting up the old single-file store if present"""
+        os.makedirs(self.directory, exist_ok=True)
+        
+        if os.path.exists(MESSAGES_FILE):
+            migrated = self.import_legacy_file(MESSAGES_FILE)
+            os.replace(MESSAGES_FILE, MESSAGES_FILE + ".migrated")
+            print(f"Moved {migrated} message(s) from {MESSAGES_FILE} into per-channel segments in {self.directory}/")
+        
+        # One stat per segment at startup; appends and deletes keep the total current afterwards
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".jsonl"))
+    
+    def import_legacy_file(self, path: str) -> int:
+        """Append every channel of an old ticket_messages.json to its segment, return message count"""
+        # Import here to avoid a circular import through the storage package
+        from storage.migrate import iter_json_object
+        
+        count = 0
+        for channel_id, messages in iter_json_object(path):
+            with open(self._segment_path(int(channel_id)), 'a', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps(message, ensure_ascii=False, separators=(',', ':')) + "\n")
+            count += len(messages)
+        return count
+    
+    def _segment_path(self, channel_id: int) -> str:
+        return os.path.join(self.directory, f"{channel_id}.jsonl")
+    
+    def append(self, channel_id: int, message_data: Dict[str, Any]) -> None:
+        """Append one message; only this channel's segment is touched"""
+        line = (json.dumps(message_data, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+        with open(self._segment_path(channel_id), 'ab') as f:
+            f.write(line)
+        self.total_bytes += len(line)
+        
+        # Keep the cached copy in step, and mark the channel as recently active
+        messages = self._cache.get(channel_id)
+        if messages is not None:
+            messages.append(message_data)
+            self._cache.move_to_end(channel_id)
+    
+    def get(self, channel_id: int) -> List[Dict[str, Any]]:
+        """Get a channel's messages, loading its segment on a cache miss"""
+        messages = self._cache.get(channel_id)
+        if messages is not None:
+            self._cache.move_to_end(channel_id)
+            return list(messages)
+        
+        messages = []
+        path = self._segment_path(channel_id)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        messages.append(json.loads(line))
+                    except ValueError:
+                        # A partially written last line after a crash
+                        break
+        
+        self._cache[channel_id] = messages
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return list(messages)
+    
+    def first(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Get a channel's first message, reading only the first line of its segment"""
+        messages = self._cache.get(channel_id)
+        if messages is not None:
+            return messages[0] if messages else None
+        
+        path = self._segment_path(channel_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                return json.loads(f.readline())
+            except ValueError:
+                # Empty, or a partially written first line after a crash
+                return None
+    
+    def delete(self, channel_id: int) -> None:
+        """Delete a channel's segment"""
+        self._cache.pop(channel_id, None)
+        path = self._segment_path(channel_id)
+        if os.path.exists(path):
+            self.total_bytes -= os.path.getsize(path)
+            os.remove(path)
+    
+    def clear(self) -> None:
+        """Delete every segment"""
+        self._cache.clear()
+        for name in os.listdir(self.directory):
+            if name.endswith(".jsonl"):
+                os.remove(os.path.join(self.directory, name))
+        self.total_bytes = 0
@@ -0,0 +1,223 @@
+import os
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Iterator, Tuple, Any, Dict
+from constants import CONFIG_FILE, DATA_FILE, MESSAGES_FILE, MESSAGES_DIR, MESSAGE_CURSORS_FILE, JOURNAL_FILE, ROTATED_JOURNAL_FILE, SQLITE_FILE
+from storage.activity_log import ActivityLog, SECONDS_PER_DAY, legacy_bucket_events
+
+# Messages are committed in batches of this many rows
+IMPORT_BATCH_SIZE = 5000
+
+def iter_json_object(path: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """Yield the top-level (key, value) pairs of a JSON object file without loading it whole"""
+    decoder = json.JSONDecoder()
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        
+        def skip_whitespace():
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                buffer = f.read(chunk_size)
+                pos = 0
+                eof = not buffer
+        
+        def decode():
+            nonlocal buffer, pos, eof
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A value ending exactly at the buffer end may be a truncated number
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+        
+        def expect(char):
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buffer) or buffer[pos] != char:
+                raise ValueError(f"Expected '{char}' in {path}")
+            pos += 1
+        
+        expect("{")
+        skip_whitespace()
+        if pos < len(buffer) and buffer[pos] == "}":
+            return
+        
+        while True:
+            skip_whitespace()
+            key = decode()
+            expect(":")
+            skip_whitespace()
+            value = decode()
+            yield key, value
+            
+            skip_whitespace()
+            if pos < len(buffer) and buffer[pos] == ",":
+                pos += 1
+                continue
+            expect("}")
+            return
+
+def import_json_files(conn: sqlite3.Connection, data_file: str = DATA_FILE, messages_file: str = MESSAGES_FILE,
+                      messages_dir: str = MESSAGES_DIR, default_guild_id: int = 0,
+                      message_cursors_file: str = MESSAGE_CURSORS_FILE) -> Dict[str, int]:
+    """Import the JSON snapshot, activity journal, ticket messages and message cursors into the database"""
+    counts = {"channels": 0, "events": 0, "messages": 0}
+    now = datetime.now(timezone.utc)
+    journal_seq = 0
+    
+    if os.path.exists(data_file):
+        for key, value in iter_json_object(data_file):
+            if key == "journal_seq":
+                journal_seq = int(value)
+            
+            elif key == "ticket_channels":
+                if isinstance(value, list):
+                    # Old format without names and guild IDs
+                    rows = [(int(channel_id), "unknown", default_guild_id) for channel_id in value]
+                else:
+                    rows = [(int(channel_id), info[0], int(info[1])) for channel_id, info in value.items()]
+                conn.executemany("INSERT OR REPLACE INTO ticket_channels (channel_id, name, guild_id) VALUES (?, ?, ?)", rows)
+                counts["channels"] += len(rows)
+            
+            elif key == "user_activity":
+                # Old format with daily/weekly/monthly buckets
+                rows = [(user_id, action_type, channel_id, ts // SECONDS_PER_DAY, ts)
+                        for user_id, channel_id, action_type, ts in legacy_bucket_events(value, now)]
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO activity_events (user_id, action, channel_id, day, ts) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                counts["events"] += cursor.rowcount
+            
+            elif key == "activity_log":
+                log = ActivityLog()
+                log.load_json(value)
+                rows = [(user_id, action_type, channel_id, day, day * SECONDS_PER_DAY + offset)
+                        for day, partition in log.partitions.items()
+                        for (user_id, action_type), channels in partition.items()
+                        for channel_id, offset in zip(channels.channels, channels.offsets)]
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO activity_events (user_id, action, channel_id, day, ts) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                counts["events"] += cursor.rowcount
+        conn.commit()
+    
+    # Activity and channel changes journaled after the last snapshot
+    for journal_file in [ROTATED_JOURNAL_FILE, JOURNAL_FILE]:
+        if not os.path.exists(journal_file):
+            continue
+        
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record["s"] <= journal_seq:
+                    continue
+                
+                op = record.get("op")
+                if op == "add":
+                    conn.execute("INSERT OR REPLACE INTO ticket_channels (channel_id, name, guild_id) VALUES (?, ?, ?)",
+                                 (record["c"], record["n"], record["g"]))
+                    counts["channels"] += 1
+                    continue
+                if op == "del":
+                    conn.executemany("DELETE FROM ticket_channels WHERE channel_id = ?", [(channel_id,) for channel_id in record["c"]])
+                    continue
+                
+                ts = int(datetime.fromisoformat(record["t"]).timestamp())
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO activity_events (user_id, action, channel_id, day, ts) VALUES (?, ?, ?, ?, ?)",
+                    (record["u"], record["a"], record["c"], ts // SECONDS_PER_DAY, ts)
+                )
+                counts["events"] += cursor.rowcount
+        conn.commit()
+    
+    # Ticket messages, one channel at a time
+    if os.path.exists(messages_file):
+        pending = 0
+        for channel_id, messages in iter_json_object(messages_file):
+            rows = [(int(channel_id), message["user_id"], message.get("username"), message["timestamp"], message.get("content"),
+                     message.get("message_id"))
+                    for message in messages]
+            conn.executemany(
+                "INSERT INTO moderator_messages (channel_id, user_id, username, timestamp, content, message_id) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            counts["messages"] += len(rows)
+            pending += len(rows)
+            
+            if pending >= IMPORT_BATCH_SIZE:
+                conn.commit()
+                pending = 0
+        conn.commit()
+    
+    # Per-channel message segments written by the JSON backend
+    if os.path.isdir(messages_dir):
+        for name in os.listdir(messages_dir):
+            if not name.endswith(".jsonl"):
+                continue
+            
+            channel_id = int(name[:-len(".jsonl")])
+            rows = []
+            with open(os.path.join(messages_dir, name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        break
+                    rows.append((channel_id, message["user_id"], message.get("username"), message["timestamp"], message.get("content"),
+                                 message.get("message_id")))
+            conn.executemany(
+                "INSERT INTO moderator_messages (channel_id, user_id, username, timestamp, content, message_id) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            counts["messages"] += len(rows)
+        conn.commit()
+    
+    # Last processed message per channel
+    if os.path.exists(message_cursors_file):
+        with open(message_cursors_file, 'r') as f:
+            rows = [(int(channel_id), int(message_id)) for channel_id, message_id in json.load(f).items()]
+        conn.executemany("INSERT OR REPLACE INTO message_cursors (channel_id, message_id) VALUES (?, ?)", rows)
+        conn.commit()
+    
+    return counts
+
+if __name__ == "__main__":
+    # One-shot import: python -m storage.migrate
+    from storage.sqlite_store import open_database
+    
+    if os.path.exists(SQLITE_FILE):
+        print(f"Error: {SQLITE_FILE} already exists. Move it away to import again.")
+        exit(1)
+    
+    guild_id = 0
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, 'r') as f:
+            guild_id = json.load(f).get("guild_id", 0)
+    
+    conn = open_database(SQLITE_FILE)
+    counts = import_json_files(conn, default_guild_id=guild_id)
+    conn.close()
+    print(f"Imported {counts['channels']} channel(s), {counts['events']} activity event(s) "
+          f"and {counts['messages']} message(s) into {SQLITE_FILE}.")
+    print('Set "storage_backend": "sqlite" in config.json to use it.')
@@ -0,0 +1,313 @@
+import os
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+from constants import SQLITE_FILE, DATA_FILE, MESSAGES_FILE, MESSAGES_DIR, MESSAGE_CURSORS_FILE
+from storage.activity_log import SECONDS_PER_DAY
+from storage.base import StorageBackend
+from utils.periods import PERIODS, period_start, period_end
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticket_channels (
+    channel_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    guild_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ticket_channels_name ON ticket_channels(name);
+
+-- One row per user, action and channel per UTC day (day = ts // 86400)
+CREATE TABLE IF NOT EXISTS activity_events (
+    user_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (user_id, action, channel_id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_activity_ts ON activity_events(ts);
+CREATE INDEX IF NOT EXISTS idx_activity_channel ON activity_events(channel_id);
+
+CREATE TABLE IF NOT EXISTS moderator_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    username TEXT,
+    timestamp TEXT NOT NULL,
+    content TEXT,
+    message_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_messages_channel ON moderator_messages(channel_id, id);
+CREATE INDEX IF NOT EXISTS idx_messages_user ON moderator_messages(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON moderator_messages(timestamp);
+
+-- Last processed Discord message per ticket channel
+CREATE TABLE IF NOT EXISTS message_cursors (
+    channel_id INTEGER PRIMARY KEY,
+    message_id INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first release: (table, column, definition)
+ADDED_COLUMNS = [
+    ("moderator_messages", "message_id", "INTEGER"),
+]
+
+def open_database(path: str = SQLITE_FILE) -> sqlite3.Connection:
+    """Open (and if needed create) the activity database in WAL mode"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL only syncs on checkpoints, so a commit is a cheap append
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    
+    # Bring databases created by older versions up to date
+    for table, column, definition in ADDED_COLUMNS:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    
+    conn.commit()
+    return conn
+
+class SqliteStorage(StorageBackend):
+    """Stores channels, activity events and moderator messages in an indexed SQLite database"""
+    
+    # The connection belongs to a single database thread. Writes nobody waits for (messages, cursors, channels)
+    # are queued to it; reads wait for their result, and commits run there between other statements, so the
+    # event loop never shares the connection with another thread.
+    
+    def __init__(self, bot, path: str = SQLITE_FILE):
+        super().__init__(bot)
+        self.path = path
+        self.conn = None
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+    
+    def _run(self, func, *args):
+        """Run func(*args) on the database thread and wait for its result"""
+        return self._db.submit(func, *args).result()
+    
+    def _queue(self, sql: str, params=(), many: bool = False) -> None:
+        """Execute a write on the database thread without waiting for it"""
+        execute = self.conn.executemany if many else self.conn.execute
+        self._db.submit(execute, sql, params).add_done_callback(self._report_error)
+    
+    @staticmethod
+    def _report_error(future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            print(f"Error writing to the database: {error}")
+    
+    def _fetchall(self, sql: str, params=()) -> list:
+        """Run a query on the database thread and return its rows"""
+        return self._run(lambda: self.conn.execute(sql, params).fetchall())
+    
+    def load_data(self) -> Dict[int, Tuple[str, int]]:
+        """Open the database, importing the JSON files the first time it is created"""
+        is_new = not os.path.exists(self.path)
+        self.conn = self._run(open_database, self.path)
+        
+        if is_new and (os.path.exists(DATA_FILE) or os.path.exists(MESSAGES_FILE) or os.path.isdir(MESSAGES_DIR)
+                       or os.path.exists(MESSAGE_CURSORS_FILE)):
+            # Import here to avoid loading the importer when it is not needed
+            from storage.migrate import import_json_files
+            
+            print(f"Importing existing JSON data into {self.path}...")
+            counts = self._run(lambda: import_json_files(self.conn, default_guild_id=self.bot.config.get("guild_id", 0)))
+            print(f"Imported {counts['channels']} channel(s), {counts['events']} activity event(s) "
+                  f"and {counts['messages']} message(s).")
+        
+        return {channel_id: (name, guild_id) for channel_id, name, guild_id
+                in self._fetchall("SELECT channel_id, name, guild_id FROM ticket_channels")}
+    
+    def load_messages(self) -> None:
+        """Messages are queried on demand, nothing to load"""
+        pass
+    
+    def load_message_cursors(self) -> Dict[int, int]:
+        """Load the last processed message ID of each channel"""
+        return dict(self._fetchall("SELECT channel_id, message_id FROM message_cursors"))
+    
+    # Ticket channels
+    def add_ticket_channel(self, channel_id: int, name: str, guild_id: int) -> None:
+        """Persist a newly tracked ticket channel"""
+        self._queue(
+            "INSERT OR REPLACE INTO ticket_channels (channel_id, name, guild_id) VALUES (?, ?, ?)",
+            (channel_id, name, guild_id)
+        )
+        self.request_save("data")
+    
+    def remove_ticket_channels(self, channel_ids: List[int]) -> None:
+        """Forget ticket channels and their recorded messages"""
+        rows = [(channel_id,) for channel_id in channel_ids]
+        self._queue("DELETE FROM ticket_channels WHERE channel_id = ?", rows, many=True)
+        self._queue("DELETE FROM moderator_messages WHERE channel_id = ?", rows, many=True)
+        self._queue("DELETE FROM message_cursors WHERE channel_id = ?", rows, many=True)
+        self.request_save("data")
+    
+    def list_ticket_channels(self) -> List[Tuple[int, str, int]]:
+        """List tracked channels as (channel_id, name, guild_id), sorted by name"""
+        return self._fetchall("SELECT channel_id, name, guild_id FROM ticket_channels ORDER BY name")
+    
+    # Activity
+    def record_activity(self, user_id: int, channel_id: int, action_type: str, now: datetime) -> Optional[List[str]]:
+        """Record activity, return the periods in which it was new (None if already recorded that day)"""
+        new_periods = self._run(self._record_activity, user_id, channel_id, action_type, now)
+        if new_periods is not None:
+            self.activity_version += 1
+            self.request_save("data")
+        return new_periods
+    
+    def _record_activity(self, user_id: int, channel_id: int, action_type: str, now: datetime) -> Optional[List[str]]:
+        """Check and insert one event in a single trip to the database thread"""
+        ts = int(now.timestamp())
+        
+        # Times this channel was already counted for the user this month (at most one per day)
+        counted = [row[0] for row in self.conn.execute(
+            "SELECT ts FROM activity_events "
+            "WHERE user_id = ? AND action = ? AND channel_id = ? AND ts >= ? AND ts < ?",
+            (user_id, action_type, channel_id,
+             int(period_start("monthly", now).timestamp()), int(period_end("monthly", now).timestamp()))
+        )]
+        
+        # Events may be older than ones already counted (e.g. caught up from channel history)
+        new_periods = []
+        for period in PERIODS:
+            start = int(period_start(period, now).timestamp())
+            end = int(period_end(period, now).timestamp())
+            if not any(start <= counted_ts < end for counted_ts in counted):
+                new_periods.append(period)
+        if not new_periods:
+            # Counted in every period containing the event, so already recorded that day
+            return None
+        
+        self.conn.execute(
+            "INSERT OR IGNORE INTO activity_events (user_id, action, channel_id, day, ts) VALUES (?, ?, ?, ?, ?)",
+            (user_id, action_type, channel_id, ts // SECONDS_PER_DAY, ts)
+        )
+        return new_periods
+    
+    def get_activity_summary(self, period: str, now: datetime) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type with an indexed range query"""
+        return self.get_range_summary(period_start(period, now), period_end(period, now))
+    
+    def get_activity_summaries(self, periods: List[str], now: datetime) -> Dict[str, Dict[int, Dict[str, int]]]:
+        """Count every period in a single scan over the widest window"""
+        windows = [(int(period_start(period, now).timestamp()), int(period_end(period, now).timestamp())) for period in periods]
+        if not windows:
+            return {}
+        
+        counts = ", ".join("COUNT(DISTINCT CASE WHEN ts >= ? AND ts < ? THEN channel_id END)" for _ in windows)
+        rows = self._fetchall(
+            f"SELECT user_id, action, {counts} FROM activity_events "
+            "WHERE ts >= ? AND ts < ? GROUP BY user_id, action",
+            [bound for window in windows for bound in window]
+            + [min(start for start, _ in windows), max(end for _, end in windows)]
+        )
+        
+        summaries = {period: {} for period in periods}
+        for user_id, action_type, *period_counts in rows:
+            for period, count in zip(periods, period_counts):
+                if count:
+                    summaries[period].setdefault(user_id, {})[action_type] = count
+        return summaries
+    
+    def get_range_summary(self, start: datetime, end: datetime) -> Dict[int, Dict[str, int]]:
+        """Count distinct channels per user and action type between two day boundaries"""
+        summary = {}
+        rows = self._fetchall(
+            "SELECT user_id, action, COUNT(DISTINCT channel_id) FROM activity_events "
+            "WHERE ts >= ? AND ts < ? GROUP BY user_id, action",
+            (int(start.timestamp()), int(end.timestamp()))
+        )
+        for user_id, action_type, count in rows:
+            summary.setdefault(user_id, {})[action_type] = count
+        return summary
+    
+    def iter_activity(self, since: datetime) -> Iterator[Tuple[int, str, int]]:
+        """Yield (user_id, action_type, ts) for every activity event at or after since"""
+        yield from self._fetchall("SELECT user_id, action, ts FROM activity_events WHERE ts >= ?", (int(since.timestamp()),))
+    
+    def earliest_activity(self) -> Optional[datetime]:
+        """Time of the oldest activity event, or None if there is none"""
+        ts = self._fetchall("SELECT MIN(ts) FROM activity_events")[0][0]
+        return datetime.fromtimestamp(ts, timezone.utc) if ts is not None else None
+    
+    def prune_activity(self, before: datetime) -> int:
+        """Delete activity events older than the given day boundary, return count of events removed"""
+        removed = self._run(lambda: self.conn.execute("DELETE FROM activity_events WHERE ts < ?", (int(before.timestamp()),)).rowcount)
+        if removed:
+            self.request_save("data")
+        return removed
+    
+    def reset_all(self) -> None:
+        """Delete all activity data, recorded messages and message cursors"""
+        self._queue("DELETE FROM activity_events")
+        self._queue("DELETE FROM moderator_messages")
+        self._queue("DELETE FROM message_cursors")
+        self.activity_version += 1
+        self.request_save("data")
+    
+    # Ticket messages
+    def record_message(self, channel_id: int, message_data: Dict[str, Any]) -> None:
+        """Store one moderator message"""
+        self._queue(
+            "INSERT INTO moderator_messages (channel_id, user_id, username, timestamp, content, message_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (channel_id, message_data["user_id"], message_data["username"],
+             message_data["timestamp"], message_data["content"], message_data.get("message_id"))
+        )
+        self.request_save("messages")
+    
+    def messages_size(self) -> int:
+        """Size of the database file, which holds the messages with everything else"""
+        return self._run(lambda: self.conn.execute("PRAGMA page_count").fetchone()[0] * self.conn.execute("PRAGMA page_size").fetchone()[0])
+    
+    def get_ticket_messages(self, channel_id: int) -> List[Dict[str, Any]]:
+        """Get all recorded moderator messages for a channel"""
+        rows = self._fetchall(
+            "SELECT user_id, username, timestamp, content, message_id FROM moderator_messages WHERE channel_id = ? ORDER BY id",
+            (channel_id,)
+        )
+        return [{"user_id": user_id, "username": username, "timestamp": timestamp, "content": content, "message_id": message_id}
+                for user_id, username, timestamp, content, message_id in rows]
+    
+    def get_first_ticket_message(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Get the first recorded moderator message of a channel"""
+        rows = self._fetchall(
+            "SELECT user_id, username, timestamp, content, message_id FROM moderator_messages WHERE channel_id = ? ORDER BY id LIMIT 1",
+            (channel_id,)
+        )
+        if not rows:
+            return None
+        user_id, username, timestamp, content, message_id = rows[0]
+        return {"user_id": user_id, "username": username, "timestamp": timestamp, "content": content, "message_id": message_id}
+    
+    def set_last_message_id(self, channel_id: int, message_id: int) -> None:
+        """Remember the last processed message of a channel"""
+        self._queue(
+            "INSERT OR REPLACE INTO message_cursors (channel_id, message_id) VALUES (?, ?)",
+            (channel_id, message_id)
+        )
+        # Called for every tracked message; the persistence worker coalesces these into one commit per interval
+        self.request_save("cursors")
+    
+    # Persistence
+    def build_snapshots(self, kinds: set) -> List[Tuple[str, Any]]:
+        """Every change lives in the open transaction, so a single commit saves all kinds"""
+        return [("commit", None)] if kinds and self.conn is not None else []
+    
+    def write_snapshot(self, kind: str, payload: Any) -> int:
+        """Commit the pending transaction on the database thread (waited for by a persistence worker thread)"""
+        self._run(self.conn.commit)
+        return 0
+    
+    def close(self) -> None:
+        """Commit and close the database connection, after every queued write"""
+        if self.conn is not None:
+            self._run(self._close)
+        self._db.shutdown(wait=True)
+    
+    def _close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
@@ -1,20 +1,50 @@
+import os
+import json
+import time
 import discord
 import asyncio
 import traceback
+from collections import OrderedDict
 from datetime import datetime, timezone
+from constants import AUDIT_STATE_FILE, AUDIT_POLL_MIN_INTERVAL, AUDIT_POLL_MAX_INTERVAL
+from tasks.channel_watcher import is_ticket_candidate, is_ticket_creator
+
+# Audit log entries returned per request
+AUDIT_PAGE_SIZE = 100
+
+# Creators of this many recently created channels are kept for channel event lookups
+AUDIT_CREATOR_CACHE = 200
 
 class AuditLogWatcher:
     def __init__(self, bot):
         self.bot = bot
+        self.latest_entry_id = None  # High-water mark: newest channel creation processed
+        self.interval = AUDIT_POLL_MIN_INTERVAL
+        self.reconnected = asyncio.Event()
+        self._lock = asyncio.Lock()  # One pass at a time, whether polled or requested by a lookup
+        self.creators: "OrderedDict[int, discord.abc.User]" = OrderedDict()  # channel_id -> creator
+        
+        # Counters
+        self.stats = {
+            "passes": 0,
+            "requests": 0,
+            "entries_last_pass": 0,
+            "entries_total": 0,
+            "channels_added": 0,
+            "behind_seconds": 0.0,   # Age of the entry being processed during a pass
+            "last_caught_up": None,  # Time the last pass reached the newest entry
+        }
+        
+        self.load_state()
     
     async def run(self) -> None:
-        """Continuously monitor audit logs for new ticket channels"""
+        """Catch up on channel creations in the audit log, polling at an adaptive interval"""
         await self.bot.wait_until_ready()
         
         if not self.bot.guilds:
             print("Error: Bot is not connected to any guilds.")
             return
-            
+        
         guild_id = self.bot.config.get("guild_id")
         guild = None
         
@@ -33,7 +63,7 @@ class AuditLogWatcher:
         if not guild:
             print("Error: Could not find any accessible guild.")
             return
-            
+        
         print(f"Starting audit log watcher for guild: {guild.name} (ID: {guild.id})")
         
         # Check if bot has required permissions
@@ -41,7 +71,7 @@ class AuditLogWatcher:
         if not bot_member:
             print("Error: Bot is not a member of the guild.")
             return
-            
+        
         permissions = bot_member.guild_permissions
         if not permissions.view_audit_log:
             print("Warning: Bot does not have 'View Audit Log' permission.")
@@ -62,70 +92,133 @@ class AuditLogWatcher:
         if not sahara_bots:
             print("Warning: No Sahara Bots found in guild. Will track channels created by any bot.")
         
-        # Get the initial latest audit log entry ID
-        latest_entry_id = None
-        try:
-            async for entry in guild.audit_logs(limit=1):
-                latest_entry_id = entry.id
-                break
-        except discord.Forbidden:
-            print("Error: Bot does not have permission to view audit logs.")
-            return
+        # Without a saved high-water mark, start from the latest entry
+        if self.latest_entry_id is None:
+            try:
+                async for entry in guild.audit_logs(limit=1):
+                    self.latest_entry_id = entry.id
+                    self.save_state()
+                    break
+            except discord.Forbidden:
+                print("Error: Bot does not have permission to view audit logs.")
+                return
         
+        # New tickets arrive through channel events; polling catches up on anything they missed.
+        # The first pass runs immediately, so channels created during downtime are found at startup.
         while True:
             try:
-                # Look for new channel creation events
-                new_latest_id = None
-                
-                async for entry in guild.audit_logs(action=discord.AuditLogAction.channel_create, limit=10):
-                    # Update latest entry ID for future comparisons
-                    if not new_latest_id:
-                        new_latest_id = entry.id
-                    
-                    # Skip if we've already processed this entry
-                    if latest_entry_id and entry.id <= latest_entry_id:
-                        break
-                    
-                    # Check if the channel was created by a Sahara AI bot or any other bot if none found
-                    created_by_target = False
-                    
-                    if entry.user and entry.user.id in sahara_bot_ids:
-                        created_by_target = True
-                        print(f"Channel created by Sahara AI: {entry.user.name} (ID: {entry.user.id})")
-                    elif not sahara_bots and entry.user and entry.user.bot:
-                        # If no Sahara bots found, track channels created by any bot
-                        created_by_target = True
-                        print(f"Channel created by bot: {entry.user.name} (ID: {entry.user.id})")
-                        
-                    if created_by_target and isinstance(entry.target, discord.TextChannel):
-                        # Check if it's a ticket channel by name pattern
-                        channel_name = entry.target.name
-                        channel_id = entry.target.id
-                        if "-" in channel_name:  # Simple check for ticket format
-                            # Check channel existence before adding
-                            channel = guild.get_channel(channel_id)
-                            if channel:
-                                # Save channel ID, name and guild ID
-                                self.bot.data_manager.ticket_channels[channel_id] = (channel_name, guild.id)
-                                print(f"New ticket channel tracked: {channel_name} (ID: {channel_id})")
-                                
-                                # Generate channel link
-                                channel_url = f"https://discord.com/channels/{guild.id}/{channel_id}"
-                                print(f"Channel URL: {channel_url}")
-                                
-                                self.bot.data_manager.save_data()
-                
-                # Update the latest entry ID we've seen
-                if new_latest_id:
-                    latest_entry_id = new_latest_id
-                
-                # Wait before checking again
-                await asyncio.sleep(10)
+                started = time.perf_counter()
+                added = await self.catch_up(guild)
+                self.bot.metrics.audit_poll_seconds.observe(time.perf_counter() - started)
+                if added:
+                    print(f"Audit log catch-up added {added} ticket channel(s) missed by channel events.")
                 
+                # Poll faster while channels are being created, back off while idle
+                if self.stats["entries_last_pass"]:
+                    self.interval = max(AUDIT_POLL_MIN_INTERVAL, self.interval / 2)
+                else:
+                    self.interval = min(AUDIT_POLL_MAX_INTERVAL, self.interval * 2)
             except discord.Forbidden:
                 print("Error: Lost permission to view audit logs.")
-                await asyncio.sleep(60)  # Wait longer before trying again
+                self.interval = AUDIT_POLL_MAX_INTERVAL
             except Exception as e:
                 print(f"Error in audit log watcher: {e}")
                 traceback.print_exc()
-                await asyncio.sleep(30)  # Wait longer if there was an error
\ No newline at end of file
+            
+            # Wake up early after a reconnect
+            try:
+                await asyncio.wait_for(self.reconnected.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.reconnected.clear()
+    
+    def request_reconcile(self) -> None:
+        """Schedule a catch-up pass, e.g. after the gateway session was re-established"""
+        self.reconnected.set()
+    
+    def lag(self) -> float:
+        """Seconds since the watcher was last known to be caught up with the audit log"""
+        if self.stats["last_caught_up"] is None:
+            return float("inf")
+        return time.time() - self.stats["last_caught_up"]
+    
+    async def find_creator(self, guild: discord.Guild, channel_id: int):
+        """Find who created a channel, paging the audit log forward only if the entry was not seen yet"""
+        creator = self.creators.get(channel_id)
+        if creator is not None or self.latest_entry_id is None:
+            # Without a high-water mark the watcher has not started; the channel event lookup falls back
+            return creator
+        
+        # A pass costs one request when few channels were created, and serves every lookup waiting on it
+        await self.catch_up(guild)
+        return self.creators.get(channel_id)
+    
+    async def catch_up(self, guild: discord.Guild) -> int:
+        """Page forward from the high-water mark until caught up, return count of channels added"""
+        async with self._lock:
+            return await self._catch_up(guild)
+    
+    async def _catch_up(self, guild: discord.Guild) -> int:
+        added = 0
+        entries = 0
+        
+        # With after=, entries come oldest first, 100 per request
+        after = discord.Object(id=self.latest_entry_id) if self.latest_entry_id else None
+        try:
+            async for entry in guild.audit_logs(action=discord.AuditLogAction.channel_create, limit=None, after=after):
+                entries += 1
+                self.stats["behind_seconds"] = (datetime.now(timezone.utc) - entry.created_at).total_seconds()
+                
+                if entry.target and entry.user:
+                    self.creators[entry.target.id] = entry.user
+                    if len(self.creators) > AUDIT_CREATOR_CACHE:
+                        self.creators.popitem(last=False)
+                
+                if entry.user and is_ticket_creator(self.bot, guild, entry.user):
+                    # Only channels that still exist and were not picked up (or are being checked) from channel events
+                    channel = guild.get_channel(entry.target.id) if entry.target else None
+                    if (channel and is_ticket_candidate(channel) and channel.id not in self.bot.data_manager.ticket_channels
+                            and channel.id not in self.bot.channel_watcher.looking_up):
+                        # Save channel ID, name and guild ID
+                        self.bot.data_manager.add_ticket_channel(channel.id, channel.name, guild.id)
+                        print(f"New ticket channel tracked: {channel.name} (ID: {channel.id})")
+                        added += 1
+                        
+                        # Its first messages were missed along with the channel event
+                        self.bot.backfill.queue_channel(channel.id)
+                
+                # Advance the high-water mark entry by entry, so an interrupted pass resumes where it stopped
+                self.latest_entry_id = entry.id
+        finally:
+            if entries:
+                self.save_state()
+        
+        self.stats["passes"] += 1
+        self.stats["requests"] += entries // AUDIT_PAGE_SIZE + 1
+        self.stats["entries_last_pass"] = entries
+        self.stats["entries_total"] += entries
+        self.stats["channels_added"] += added
+        self.stats["behind_seconds"] = 0.0
+        self.stats["last_caught_up"] = time.time()
+        return added
+    
+    def load_state(self) -> None:
+        """Load the saved high-water mark"""
+        if not os.path.exists(AUDIT_STATE_FILE):
+            return
+        
+        try:
+            with open(AUDIT_STATE_FILE, 'r') as f:
+                self.latest_entry_id = json.load(f).get("latest_entry_id")
+        except Exception as e:
+            print(f"Error loading audit log watcher state: {e}")
+    
+    def save_state(self) -> None:
+        """Save the high-water mark"""
+        try:
+            temp_file = AUDIT_STATE_FILE + ".tmp"
+            with open(temp_file, 'w') as f:
+                json.dump({"latest_entry_id": self.latest_entry_id}, f)
+            os.replace(temp_file, AUDIT_STATE_FILE)
+        except Exception as e:
+            print(f"Error saving audit log watcher state: {e}")
@@ -0,0 +1,124 @@
+import discord
+import asyncio
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+from utils.periods import period_start
+from constants import BACKFILL_CONCURRENCY, BACKFILL_PAGE_SIZE
+
+class HistoryBackfill:
+    """Replays ticket channel history missed while the bot was offline or disconnected"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        
+        # Cursors as they were when the bot stopped seeing messages; None while connected
+        self.start_cursors: Optional[Dict[int, int]] = dict(bot.data_manager.last_message_ids)
+        
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.queued: Set[int] = set()
+        self.active: Dict[int, Set[int]] = {}  # channel_id -> message IDs already recorded
+        self._workers = []
+        
+        # Counters
+        self.stats = {"channels": 0, "messages": 0, "errors": 0}
+    
+    def mark_disconnected(self) -> None:
+        """Remember where every channel stood when the gateway connection dropped"""
+        if self.start_cursors is None:
+            self.start_cursors = dict(self.bot.data_manager.last_message_ids)
+    
+    def start(self) -> None:
+        """Queue every tracked channel for catch-up if messages may have been missed"""
+        if not self._workers:
+            loop = asyncio.get_running_loop()
+            self._workers = [loop.create_task(self._worker()) for _ in range(BACKFILL_CONCURRENCY)]
+        
+        if self.start_cursors is None:
+            return
+        
+        cursors = self.start_cursors
+        self.start_cursors = None
+        for channel_id in list(self.bot.data_manager.ticket_channels):
+            self.queue_channel(channel_id, cursors.get(channel_id))
+    
+    def queue_channel(self, channel_id: int, after_id: Optional[int] = None) -> None:
+        """Queue one channel for catch-up from after_id (from its last recorded message if None)"""
+        if channel_id in self.queued:
+            return
+        self.queued.add(channel_id)
+        self.queue.put_nowait((channel_id, after_id))
+    
+    def note_live_message(self, message: discord.Message) -> None:
+        """Record a message seen live, so a catch-up running on its channel does not store it again"""
+        recorded = self.active.get(message.channel.id)
+        if recorded is not None:
+            recorded.add(message.id)
+    
+    async def _worker(self) -> None:
+        """Catch up on queued channels one at a time"""
+        while True:
+            channel_id, after_id = await self.queue.get()
+            try:
+                await self.backfill_channel(channel_id, after_id)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Error catching up channel {channel_id}: {e}")
+                traceback.print_exc()
+            finally:
+                self.queued.discard(channel_id)
+                self.queue.task_done()
+    
+    def _advance_cursor(self, channel_id: int, message_id: int) -> None:
+        """Move a channel's cursor past replayed messages, unless the channel was deleted meanwhile"""
+        if channel_id in self.bot.data_manager.ticket_channels:
+            self.bot.data_manager.advance_message_cursor(channel_id, message_id)
+    
+    async def backfill_channel(self, channel_id: int, after_id: Optional[int]) -> int:
+        """Replay messages after after_id through the live message handling, return count replayed"""
+        channel = self.bot.get_channel(channel_id)
+        if channel is None or channel_id not in self.bot.data_manager.ticket_channels:
+            return 0
+        
+        # Messages already recorded; activity is counted once per channel anyway, but messages are not
+        messages = self.bot.data_manager.get_ticket_messages(channel_id)
+        recorded = {message.get("message_id") for message in messages}
+        
+        now = datetime.now(timezone.utc)
+        after = discord.Object(id=after_id) if after_id else None
+        if after is None:
+            # No cursor yet: continue after the newest recorded message, but never read further back than
+            # the current monthly period (older messages no longer change any current report)
+            after = period_start("monthly", now)
+            if messages:
+                after = max(after, datetime.fromisoformat(max(message["timestamp"] for message in messages)))
+        
+        # Anything newer than this is handled by on_message
+        before = discord.Object(id=discord.utils.time_snowflake(now))
+        
+        self.active[channel_id] = recorded
+        replayed = 0
+        last_id = None
+        try:
+            # discord.py waits out rate limits on these requests itself
+            async for message in channel.history(limit=None, after=after, before=before, oldest_first=True):
+                await self.bot.track_message(message, record_message=message.id not in recorded, advance_cursor=False)
+                recorded.add(message.id)
+                replayed += 1
+                last_id = message.id
+                
+                # Save the cursor once per page rather than once per message
+                if replayed % BACKFILL_PAGE_SIZE == 0:
+                    self._advance_cursor(channel_id, last_id)
+        except discord.Forbidden:
+            print(f"Error: No permission to read history of channel {channel.name}.")
+        finally:
+            del self.active[channel_id]
+            if last_id is not None:
+                self._advance_cursor(channel_id, last_id)
+        
+        self.stats["channels"] += 1
+        self.stats["messages"] += replayed
+        if replayed:
+            print(f"Caught up {replayed} message(s) in {channel.name} (ID: {channel_id})")
+        return replayed
@@ -0,0 +1,113 @@
+import discord
+import asyncio
+from typing import Dict, List, Optional, Set
+
+# Audit log entries can show up shortly after the gateway event, so the lookup is retried
+CREATOR_LOOKUP_ATTEMPTS = 3
+CREATOR_LOOKUP_DELAY = 1.0
+
+def is_ticket_candidate(channel) -> bool:
+    """Check whether a channel looks like a ticket (text channel with the ticket name format)"""
+    return isinstance(channel, discord.TextChannel) and "-" in channel.name
+
+def is_ticket_creator(bot, guild: discord.Guild, user) -> bool:
+    """Check whether channels created by this user are tickets"""
+    sahara_bot_ids = bot.compiled_config.sahara_bot_ids
+    if user.id in sahara_bot_ids:
+        return True
+    
+    # If no Sahara bots are in the guild, track channels created by any bot
+    if user.bot and not any(guild.get_member(bot_id) for bot_id in sahara_bot_ids):
+        return True
+    return False
+
+class TicketChannelWatcher:
+    """Track ticket channels from gateway channel events, as soon as they are created"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        
+        # Channels whose creator is being looked up -> messages received in the meantime
+        self.pending: Dict[int, List[discord.Message]] = {}
+        
+        # Channels whose creator is being looked up, which the audit log catch-up leaves to this watcher
+        self.looking_up: Set[int] = set()
+    
+    async def on_channel_create(self, channel) -> None:
+        """Start tracking a new channel if it was created by a Sahara bot"""
+        if not is_ticket_candidate(channel) or channel.id in self.bot.data_manager.ticket_channels:
+            return
+        
+        # Ticket bots give themselves access to the channels they create. Anyone can add such an
+        # overwrite, so it only means the channel is likely a ticket whose messages are worth holding.
+        sahara_bot_ids = self.bot.compiled_config.sahara_bot_ids
+        likely_ticket = any(target.id in sahara_bot_ids for target in channel.overwrites)
+        
+        # The gateway event carries no creator, so confirm it with a single audit log lookup.
+        # Messages arriving meanwhile in a likely ticket are held back and replayed once the channel is tracked.
+        if likely_ticket:
+            self.pending[channel.id] = []
+        self.looking_up.add(channel.id)
+        try:
+            creator = await self._find_creator(channel)
+        finally:
+            self.looking_up.discard(channel.id)
+            held_messages = self.pending.pop(channel.id, None)
+        
+        if creator and is_ticket_creator(self.bot, channel.guild, creator):
+            self._track(channel)
+            if held_messages is None:
+                # Nothing was held: pick up anything sent during the lookup from the channel history
+                self.bot.backfill.queue_channel(channel.id)
+            else:
+                for message in held_messages:
+                    await self.bot.track_message(message)
+    
+    def on_channel_delete(self, channel) -> None:
+        """Stop tracking a deleted channel"""
+        self.pending.pop(channel.id, None)
+        if self.bot.data_manager.mark_channel_deleted(channel.id):
+            print(f"Ticket channel deleted: {channel.name} (ID: {channel.id})")
+    
+    def hold_message(self, message: discord.Message) -> bool:
+        """Hold a message back if its channel is still being checked, return True if held"""
+        held_messages = self.pending.get(message.channel.id)
+        if held_messages is None:
+            return False
+        held_messages.append(message)
+        return True
+    
+    async def _find_creator(self, channel) -> Optional[discord.abc.User]:
+        """Find who created a channel from the audit log"""
+        audit_watcher = self.bot.audit_watcher
+        for attempt in range(CREATOR_LOOKUP_ATTEMPTS):
+            try:
+                if audit_watcher.latest_entry_id is not None:
+                    # Share the audit watcher's pages instead of fetching the log separately
+                    creator = await audit_watcher.find_creator(channel.guild, channel.id)
+                    if creator is not None:
+                        return creator
+                else:
+                    # The watcher has not started paging yet
+                    async for entry in channel.guild.audit_logs(action=discord.AuditLogAction.channel_create, limit=5):
+                        if entry.target and entry.target.id == channel.id:
+                            return entry.user
+            except discord.Forbidden:
+                print("Error: Bot does not have permission to view audit logs.")
+                return None
+            except discord.HTTPException as e:
+                print(f"Error looking up creator of channel {channel.name}: {e}")
+            
+            # No point waiting after the last attempt
+            if attempt < CREATOR_LOOKUP_ATTEMPTS - 1:
+                await asyncio.sleep(CREATOR_LOOKUP_DELAY)
+        return None
+    
+    def _track(self, channel) -> None:
+        """Add a ticket channel"""
+        self.bot.data_manager.add_ticket_channel(channel.id, channel.name, channel.guild.id, discovered=True)
+        print(f"New ticket channel tracked: {channel.name} (ID: {channel.id})")
+        
+        # Generate channel link
+        channel_url = f"https://discord.com/channels/{channel.guild.id}/{channel.id}"
+        print(f"Channel URL: {channel_url}")
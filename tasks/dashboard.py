@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import asyncio
+import traceback
+import discord
+from typing import Dict
+from constants import DASHBOARD_STATE_FILE, DASHBOARD_EDIT_INTERVAL, DASHBOARD_MIN_EDIT_INTERVAL
+from utils.periods import PERIODS
+
+class LiveDashboard:
+    """One pinned report message per channel, edited in place as activity comes in"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.messages: Dict[int, int] = {}  # channel_id -> dashboard message ID
+        self.changed = asyncio.Event()
+        self.last_edit = 0.0
+        
+        # Counters
+        self.stats = {"edits": 0, "coalesced": 0, "reposts": 0, "errors": 0}
+        
+        self.load_state()
+    
+    def notify(self) -> None:
+        """Note that the counts changed; bursts of changes turn into a single edit"""
+        if self.changed.is_set():
+            self.stats["coalesced"] += 1
+        else:
+            self.changed.set()
+    
+    async def run(self) -> None:
+        """Edit the dashboards after changes, at most once per interval, and at least every hour"""
+        await self.bot.wait_until_ready()
+        
+        while True:
+            try:
+                # Wake up on the hour even without activity, so period rollovers show up
+                try:
+                    await asyncio.wait_for(self.changed.wait(), timeout=3600 - time.time() % 3600)
+                except asyncio.TimeoutError:
+                    pass
+                
+                # Changes arriving during the wait are folded into this edit
+                interval = max(self.bot.config.get("dashboard_interval_seconds") or DASHBOARD_EDIT_INTERVAL, DASHBOARD_MIN_EDIT_INTERVAL)
+                delay = self.last_edit + interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                
+                self.changed.clear()
+                if self.messages:
+                    await self.refresh()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Error updating dashboard: {e}")
+                traceback.print_exc()
+    
+    async def refresh(self) -> None:
+        """Edit every dashboard message with the current counts"""
+        embeds = await self.bot.report_renderer.period_reports(PERIODS)
+        self.last_edit = time.monotonic()
+        
+        for channel_id, message_id in list(self.messages.items()):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            
+            try:
+                await channel.get_partial_message(message_id).edit(embeds=embeds)
+                self.stats["edits"] += 1
+            except discord.NotFound:
+                # Someone deleted the dashboard message; post a new one
+                self.stats["reposts"] += 1
+                await self._post(channel, embeds)
+            except discord.HTTPException as e:
+                self.stats["errors"] += 1
+                print(f"Error editing dashboard in channel {channel_id}: {e}")
+    
+    async def add_channel(self, channel) -> None:
+        """Post a dashboard in a channel, replacing an earlier one there"""
+        self.remove_channel(channel.id)
+        await self._post(channel, await self.bot.report_renderer.period_reports(PERIODS))
+    
+    def remove_channel(self, channel_id: int) -> bool:
+        """Stop updating a channel's dashboard, return True if it had one"""
+        if self.messages.pop(channel_id, None) is None:
+            return False
+        self.save_state()
+        return True
+    
+    async def _post(self, channel, embeds) -> None:
+        """Send and pin a new dashboard message and remember it"""
+        message = await channel.send(content="📊 **Live Dashboard**", embeds=embeds)
+        try:
+            await message.pin()
+        except discord.HTTPException as e:
+            print(f"Could not pin dashboard in channel {channel.id}: {e}")
+        
+        self.messages[channel.id] = message.id
+        self.save_state()
+    
+    def load_state(self) -> None:
+        """Load the dashboard message IDs"""
+        if not os.path.exists(DASHBOARD_STATE_FILE):
+            return
+        
+        try:
+            with open(DASHBOARD_STATE_FILE, 'r') as f:
+                self.messages = {int(channel_id): int(message_id) for channel_id, message_id in json.load(f).items()}
+        except Exception as e:
+            print(f"Error loading dashboard state: {e}")
+    
+    def save_state(self) -> None:
+        """Save the dashboard message IDs"""
+        try:
+            temp_file = DASHBOARD_STATE_FILE + ".tmp"
+            with open(temp_file, 'w') as f:
+                json.dump({str(channel_id): message_id for channel_id, message_id in self.messages.items()}, f)
+            os.replace(temp_file, DASHBOARD_STATE_FILE)
+        except Exception as e:
+            print(f"Error saving dashboard state: {e}")
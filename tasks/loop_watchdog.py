@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from typing import Dict, List, Optional, Tuple
+from constants import (WATCHDOG_BEAT_INTERVAL, WATCHDOG_STALL_THRESHOLD_MS, WATCHDOG_CAPTURE_COOLDOWN,
+                       WATCHDOG_MAX_OFFENDERS)
+
+# Frames under this directory are the bot's own code; the stall is blamed on the innermost of them
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Stall:
+    """Every stall seen with the same context and blocking line"""
+    
+    __slots__ = ("context", "location", "stack", "count", "total", "max", "last_seen", "last_logged")
+    
+    def __init__(self, context: str, location: str, stack: List[str]):
+        self.context = context    # Command or event that was running, e.g. "!update_stats" or "on_message"
+        self.location = location  # Innermost line of bot code in the blocking stack
+        self.stack = stack        # Last captured stack, outermost frame first
+        self.count = 0
+        self.total = 0.0          # Seconds the loop was blocked, summed over all stalls
+        self.max = 0.0
+        self.last_seen = 0.0
+        self.last_logged = 0.0
+
+class LoopWatchdog:
+    """Measures event loop lag and, when the loop stalls, captures what is blocking it from a sidecar thread"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.last_beat = time.monotonic()  # When the heartbeat coroutine last got to run
+        
+        # (context, location) -> stalls; written by the sidecar thread, so guarded by the lock
+        self.offenders: Dict[Tuple[str, str], Stall] = {}
+        self._lock = threading.Lock()
+        self._current: Optional[Stall] = None  # Stall captured by the thread that has not ended yet
+        
+        # Task -> name of the command it is running
+        self.commands: Dict[asyncio.Task, str] = {}
+        
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+        
+        # Counters
+        self.stats = {"stalls": 0, "captures": 0, "rate_limited": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0}
+    
+    @property
+    def threshold(self) -> float:
+        """Loop lag in seconds that counts as a stall ("stall_threshold_ms" in config.json)"""
+        return (self.bot.config.get("stall_threshold_ms") or WATCHDOG_STALL_THRESHOLD_MS) / 1000
+    
+    def start(self) -> None:
+        """Start the heartbeat on the running loop and the sidecar thread watching it"""
+        if self._task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = self.loop.create_task(self.run())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the heartbeat and the sidecar thread"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def command_started(self, ctx) -> None:
+        """before_invoke hook: remember which command the current task runs"""
+        self.commands[asyncio.current_task()] = f"!{ctx.command.qualified_name}"
+    
+    async def command_finished(self, ctx) -> None:
+        """after_invoke hook"""
+        self.commands.pop(asyncio.current_task(), None)
+    
+    async def run(self) -> None:
+        """Wake up every beat interval and measure how late the wakeup was"""
+        while True:
+            expected = time.monotonic() + WATCHDOG_BEAT_INTERVAL
+            await asyncio.sleep(WATCHDOG_BEAT_INTERVAL)
+            now = time.monotonic()
+            self.last_beat = now
+            
+            lag = max(now - expected, 0.0)
+            self.bot.metrics.loop_lag_seconds.observe(lag)
+            self.stats["last_lag_ms"] = lag * 1000
+            self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], lag * 1000)
+            
+            # The stall is over; only now is its full length known
+            stall, self._current = self._current, None
+            if stall is not None:
+                with self._lock:
+                    stall.total += lag
+                    stall.max = max(stall.max, lag)
+                self.stats["stalls"] += 1
+    
+    def _watch(self) -> None:
+        """Sidecar thread: capture the loop thread's stack once per stall"""
+        while not self._stop.wait(WATCHDOG_BEAT_INTERVAL):
+            stalled_for = time.monotonic() - self.last_beat - WATCHDOG_BEAT_INTERVAL
+            if stalled_for < self.threshold or self._current is not None:
+                continue
+            try:
+                self._capture(stalled_for)
+            except Exception as e:
+                print(f"Error capturing event loop stall: {e}")
+                traceback.print_exc()
+    
+    def _context(self) -> str:
+        """Name of the command, event or task the loop is currently running"""
+        task = asyncio.current_task(self.loop)
+        if task is None:
+            return "callback"
+        command = self.commands.get(task)
+        if command:
+            return command
+        
+        # discord.py names event tasks "discord.py: on_<event>"
+        name = task.get_name()
+        if name.startswith("discord.py: "):
+            return name[len("discord.py: "):]
+        if name.startswith("Task-"):
+            return getattr(task.get_coro(), "__qualname__", name)
+        return name
+    
+    def _capture(self, stalled_for: float) -> None:
+        """Record the blocking stack of the loop thread"""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        
+        summary = traceback.StackSummary.extract(traceback.walk_stack(frame), lookup_lines=False)
+        summary.reverse()
+        own = [entry for entry in summary if entry.filename.startswith(PROJECT_DIR)]
+        blamed = (own or summary)[-1]
+        location = f"{os.path.relpath(blamed.filename, PROJECT_DIR)}:{blamed.lineno} in {blamed.name}"
+        context = self._context()
+        now = time.time()
+        
+        with self._lock:
+            stall = self.offenders.get((context, location))
+            if stall is None:
+                if len(self.offenders) >= WATCHDOG_MAX_OFFENDERS:
+                    # Make room by forgetting the offender with the least blocked time
+                    del self.offenders[min(self.offenders, key=lambda key: self.offenders[key].total)]
+                stall = self.offenders[(context, location)] = Stall(context, location, [])
+            stall.stack = [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in summary]
+            stall.count += 1
+            stall.last_seen = now
+            self._current = stall
+            self.stats["captures"] += 1
+            
+            # Log each offender at most once per cooldown, however often it stalls the loop
+            log = now - stall.last_logged >= WATCHDOG_CAPTURE_COOLDOWN
+            if log:
+                stall.last_logged = now
+            else:
+                self.stats["rate_limited"] += 1
+        
+        if log:
+            print(f"⚠️ Event loop blocked for {stalled_for * 1000:.0f}+ ms by {context} at {location}")
+    
+    def top(self, count: int) -> List[Stall]:
+        """The offenders that blocked the loop longest in total"""
+        with self._lock:
+            offenders = list(self.offenders.values())
+        return sorted(offenders, key=lambda stall: stall.total, reverse=True)[:count]
+    
+    def reset(self) -> None:
+        """Forget every recorded stall"""
+        with self._lock:
+            self.offenders = {}
+            self._current = None
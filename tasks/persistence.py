@@ -0,0 +1,146 @@
+import asyncio
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional, Tuple
+from constants import PERSIST_INTERVAL_MS, PERSIST_MAX_CHANGES
+
+class PersistenceWorker:
+    """Coalesces DataManager saves into periodic background writes"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        
+        # Pending state
+        self.dirty = set()          # Which files need writing: "data", "messages", or a registered kind
+        self.pending_changes = 0    # Save requests since the last flush
+        
+        self._dirty_event = asyncio.Event()
+        self._full_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        
+        # State saved alongside the storage backend: kind -> (build snapshot on the loop, write it in a thread)
+        self.writers: Dict[str, Tuple[Callable[[], Any], Callable[[str, Any], Optional[int]]]] = {}
+        
+        # Counters
+        self.stats = {
+            "save_requests": 0,     # Calls to save_data/save_messages
+            "flushes": 0,           # Background writes actually performed
+            "coalesced_writes": 0,  # Save requests absorbed into another write
+            "failed_flushes": 0,
+            "last_snapshot_ms": 0.0,  # Time spent on the event loop building the snapshot
+            "last_flush_ms": 0.0,     # Total flush time including the threaded write
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+    
+    @property
+    def running(self) -> bool:
+        """Whether the background task is accepting save requests"""
+        return self._task is not None and not self._task.done()
+    
+    def start(self) -> None:
+        """Start the background flush task on the running event loop"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+    
+    def register(self, kind: str, build: Callable[[], Any], write: Callable[[str, Any], Optional[int]]) -> None:
+        """Save another kind of state with the same coalescing; write(kind, snapshot) runs in a worker thread"""
+        self.writers[kind] = (build, write)
+    
+    def mark_dirty(self, kind: str) -> None:
+        """Record that a file needs writing; the write happens later in the background"""
+        self.stats["save_requests"] += 1
+        if kind in self.dirty:
+            self.stats["coalesced_writes"] += 1
+        
+        self.dirty.add(kind)
+        self.pending_changes += 1
+        self._dirty_event.set()
+        
+        if self.pending_changes >= PERSIST_MAX_CHANGES:
+            self._full_event.set()
+    
+    async def run(self) -> None:
+        """Wait for changes and flush them at most once per interval"""
+        while True:
+            await self._dirty_event.wait()
+            
+            # Give the burst a chance to accumulate, unless too many changes are pending
+            try:
+                await asyncio.wait_for(self._full_event.wait(), timeout=PERSIST_INTERVAL_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error in persistence worker: {e}")
+                traceback.print_exc()
+    
+    async def flush(self) -> None:
+        """Write every dirty file, building the snapshot on the loop and writing it in a thread"""
+        async with self._flush_lock:
+            if not self.dirty:
+                self._dirty_event.clear()
+                return
+            
+            started = time.perf_counter()
+            kinds = self.dirty
+            self.dirty = set()
+            self.pending_changes = 0
+            self._dirty_event.clear()
+            self._full_event.clear()
+            
+            loop = asyncio.get_running_loop()
+            storage = self.bot.data_manager.storage
+            tracer = self.bot.tracer
+            try:
+                with tracer.trace("flush", kinds=sorted(kinds)):
+                    # Build consistent snapshots while nothing else can touch the data
+                    with tracer.span("snapshot"):
+                        writes = [(kind, snapshot, storage.write_snapshot)
+                                  for kind, snapshot in storage.build_snapshots(kinds - self.writers.keys())]
+                        writes += [(kind, build(), write) for kind, (build, write) in self.writers.items() if kind in kinds]
+                    snapshot_ms = (time.perf_counter() - started) * 1000
+                    
+                    metrics = self.bot.metrics
+                    for kind, snapshot, write in writes:
+                        with tracer.span("write", kind=kind) as span:
+                            write_started = time.perf_counter()
+                            written = await loop.run_in_executor(None, write, kind, snapshot)
+                            metrics.snapshot_write_seconds.labels(kind).observe(time.perf_counter() - write_started)
+                            metrics.snapshot_bytes.labels(kind).inc(written or 0)
+                            span.set("bytes", written)
+                        storage.snapshot_written(kind)
+            except Exception:
+                # Keep the data dirty so the next flush retries the write
+                self.stats["failed_flushes"] += 1
+                for kind in kinds:
+                    self.mark_dirty(kind)
+                raise
+            
+            flush_ms = (time.perf_counter() - started) * 1000
+            self.bot.metrics.flush_seconds.observe(flush_ms / 1000)
+            self.stats["flushes"] += 1
+            self.stats["last_snapshot_ms"] = snapshot_ms
+            self.stats["last_flush_ms"] = flush_ms
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], flush_ms)
+            self.stats["total_flush_ms"] += flush_ms
+            
+            if self.bot.debug_mode:
+                print(f"💾 Flushed {', '.join(sorted(kinds))} in {flush_ms:.1f} ms ({snapshot_ms:.1f} ms on loop)")
+    
+    async def close(self) -> None:
+        """Stop the background task and write any pending changes"""
+        if self._task is not None:
+            # Cancel only between flushes so an in-flight write is never abandoned halfway
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.flush()
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+from constants import PROFILE_SAMPLE_INTERVAL, PROFILE_TRACEMALLOC_FRAMES, PROFILE_TOP_ALLOCATIONS
+
+# Frame names are shortened to paths relative to the bot's directory
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def frame_label(code) -> str:
+    """A function in collapsed-stack form: name (file:first line)"""
+    filename = code.co_filename
+    if filename.startswith(PROJECT_DIR):
+        filename = os.path.relpath(filename, PROJECT_DIR)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples one thread's stack at a fixed interval from another thread, counting identical stacks"""
+    
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()  # Collapsed stack, outermost first -> samples
+        self.samples = 0
+        self.stop = threading.Event()
+    
+    def run(self, seconds: float) -> None:
+        """Sample until the time is up or stop is set (runs in a worker thread)"""
+        labels: Dict[object, str] = {}  # code object -> label, so each function is formatted once
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self.stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            del frame
+            
+            if stack:
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+                self.samples += 1
+            self.stop.wait(self.interval)
+    
+    def collapsed(self) -> str:
+        """The samples in the collapsed-stack format read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+class Profiler:
+    """Profiles the running bot for a limited time, one profile at a time"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.running: Optional[str] = None  # Kind of the profile in progress
+    
+    async def cpu(self, seconds: float) -> str:
+        """Sample the event loop thread's stack, return the collapsed stacks"""
+        sampler = StackSampler(threading.get_ident())
+        self.running = "cpu"
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, sampler.run, seconds)
+        finally:
+            sampler.stop.set()
+            self.running = None
+        
+        header = (f"# CPU profile of the event loop thread: {sampler.samples} samples over {seconds:.0f} s, "
+                  f"every {sampler.interval * 1000:.0f} ms\n"
+                  "# Collapsed stacks (outermost frame first) with sample counts; time waiting for events shows up under select\n")
+        return header + sampler.collapsed() + "\n"
+    
+    async def alloc(self, seconds: float) -> str:
+        """Trace memory allocations, return the sites holding the most memory allocated during the window"""
+        # Leave tracing on afterwards if someone else started it (e.g. PYTHONTRACEMALLOC)
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self.running = "alloc"
+        try:
+            before = tracemalloc.take_snapshot() if was_tracing else None
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+            self.running = None
+        
+        # Grouping the traces is the slow part, so it runs off the loop
+        return await asyncio.get_running_loop().run_in_executor(None, self._alloc_report, before, after, seconds, current, peak)
+    
+    @staticmethod
+    def _alloc_report(before, after, seconds: float, current: int, peak: int) -> str:
+        """Top allocation sites by size, with the stack of the largest ones"""
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        after = after.filter_traces(filters)
+        if before is not None:
+            stats = after.compare_to(before.filter_traces(filters), "traceback")
+            stats = [stat for stat in stats if stat.size_diff > 0]
+            stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        else:
+            stats = after.statistics("traceback")
+        
+        lines = [
+            f"# Allocations during {seconds:.0f} s still alive at the end, largest first "
+            f"(traced: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB)",
+            "",
+        ]
+        for i, stat in enumerate(stats[:PROFILE_TOP_ALLOCATIONS], 1):
+            size = stat.size_diff if before is not None else stat.size
+            count = stat.count_diff if before is not None else stat.count
+            lines.append(f"#{i} {size / 1024:.1f} KiB in {count} block(s)")
+            lines.extend(f"    {line}" for line in stat.traceback.format(most_recent_first=True))
+            lines.append("")
+        return "\n".join(lines)
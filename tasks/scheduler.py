@@ -1,114 +1,299 @@
-from discord.ext import tasks
+import os
+import json
+import time
+import asyncio
+import traceback
 from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from constants import SCHEDULER_STATE_FILE, SCHEDULER_MAX_SLEEP, QUEUE_ALERT_INTERVAL
 
-def setup_scheduled_tasks(bot):
-    """Set up all scheduled tasks for the bot"""
-    
-    @tasks.loop(minutes=1)
-    async def reset_daily_activity():
-        """Reset daily activity at midnight"""
-        now = datetime.now(timezone.utc)
-        if now.hour == 0 and now.minute == 0:
-            bot.data_manager.user_activity["daily"] = {}
-            print(f"[{now}] Daily activity counters reset.")
-            bot.data_manager.save_data()
+# Automated weekly reports are sent at 00:00 UTC on these days of the month
+REPORT_DAYS = (7, 14, 21, 28)
 
-    @tasks.loop(minutes=1)
-    async def check_weekly_reset():
-        """Check if weekly activity should be reset"""
-        now = datetime.now(timezone.utc)
-        # Reset weekly counters on the 1st, 8th, 15th, and 22nd of each month
-        if now.hour == 0 and now.minute == 0:
-            if now.day in [1, 8, 15, 22]:
-                bot.data_manager.user_activity["weekly"] = {}
-                print(f"[{now}] Weekly activity counters reset.")
-                bot.data_manager.save_data()
+# Deadline of a job that has nothing to do until it is rescheduled
+NEVER = datetime.max.replace(tzinfo=timezone.utc)
 
-    @tasks.loop(minutes=1)
-    async def check_monthly_reset():
-        """Check if monthly activity should be reset"""
-        now = datetime.now(timezone.utc)
-        # Reset monthly counters on the 1st of each month
-        if now.hour == 0 and now.minute == 0 and now.day == 1:
-            bot.data_manager.user_activity["monthly"] = {}
-            print(f"[{now}] Monthly activity counters reset.")
-            bot.data_manager.save_data()
+def next_midnight_on_days(after: datetime, days: Iterable[int]) -> datetime:
+    """First 00:00 UTC strictly after the given time on one of the given days of the month"""
+    candidate = after.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if candidate <= after:
+        candidate += timedelta(days=1)
+    while candidate.day not in days:
+        candidate += timedelta(days=1)
+    return candidate
+
+def every(interval: timedelta) -> Callable[[datetime], datetime]:
+    """Schedule for a job that runs at a fixed interval after its last run"""
+    return lambda last_run: last_run + interval
+
+class Job:
+    """A coroutine run by the scheduler, with its deadline and timing metrics"""
+    
+    def __init__(self, name: str, func: Callable[[], Awaitable[None]], schedule: Callable[[datetime], datetime],
+                 run_at_start: bool = False, catch_up_window: Optional[timedelta] = None, persist: bool = True):
+        self.name = name
+        self.func = func
+        self.schedule = schedule            # last run -> next deadline
+        self.run_at_start = run_at_start    # Run once whenever the bot starts, whatever the saved state
+        self.catch_up_window = catch_up_window  # Missed runs older than this are skipped (None: always caught up)
+        self.persist = persist              # Save the last run time, for jobs whose schedule depends on it
+        
+        self.last_run: Optional[datetime] = None
+        self.next_run: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        
+        # Counters
+        self.stats = {
+            "runs": 0,
+            "failures": 0,
+            "skipped": 0,
+            "caught_up": 0,
+            "last_ms": 0.0,
+            "max_ms": 0.0,
+            "total_ms": 0.0,
+            "last_lateness": 0.0,  # Seconds between the deadline and the actual start
+        }
 
-    @tasks.loop(hours=12)
+class Scheduler:
+    """Runs jobs at their next deadline, sleeping in between instead of polling"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.jobs: Dict[str, Job] = {}
+        self.wakeups = 0
+        self._task = None
+        self._wakeup = asyncio.Event()
+        
+        # Last run times from the previous session (job name -> datetime)
+        self.saved_runs: Dict[str, datetime] = {}
+        self.load_state()
+    
+    def add_job(self, job: Job) -> None:
+        """Register a job; call before start()"""
+        # Jobs that do not persist start fresh, even if an older state file saved them
+        job.last_run = self.saved_runs.get(job.name) if job.persist else None
+        self.jobs[job.name] = job
+    
+    def start(self) -> None:
+        """Start the scheduler loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+    
+    def reschedule(self, name: str, earlier_only: bool = False) -> None:
+        """Recompute a job's deadline after the state its schedule depends on changed"""
+        job = self.jobs.get(name)
+        if job is None or job.next_run is None:
+            # Not planned yet; the first plan computes the deadline anyway
+            return
+        
+        next_run = job.schedule(datetime.now(timezone.utc))
+        if earlier_only and next_run >= job.next_run:
+            return
+        job.next_run = next_run
+        self._wakeup.set()
+    
+    def _plan(self, now: datetime) -> None:
+        """Set the first deadline of every job, catching up on runs missed while offline"""
+        for job in self.jobs.values():
+            if job.run_at_start:
+                job.next_run = now
+                continue
+            
+            # Jobs that never ran start counting from now
+            job.next_run = job.schedule(job.last_run or now)
+            if job.next_run > now:
+                continue
+            
+            if job.catch_up_window is not None and now - job.next_run > job.catch_up_window:
+                print(f"Skipping missed run of {job.name} due at {job.next_run} (too late to catch up)")
+                job.stats["skipped"] += 1
+                job.next_run = job.schedule(now)
+            else:
+                print(f"Catching up on missed run of {job.name} due at {job.next_run}")
+                job.stats["caught_up"] += 1
+    
+    async def run(self) -> None:
+        """Start due jobs, then sleep until the next deadline"""
+        await self.bot.wait_until_ready()
+        self._plan(datetime.now(timezone.utc))
+        
+        while True:
+            now = datetime.now(timezone.utc)
+            for job in self.jobs.values():
+                if job.next_run > now:
+                    continue
+                
+                lateness = (now - job.next_run).total_seconds()
+                
+                # Several missed deadlines collapse into one run
+                job.next_run = job.schedule(now)
+                
+                if job.task is not None and not job.task.done():
+                    print(f"Skipping run of {job.name}: the previous run is still in progress")
+                    job.stats["skipped"] += 1
+                    continue
+                
+                job.stats["last_lateness"] = lateness
+                job.task = asyncio.get_running_loop().create_task(self._run_job(job, now))
+            
+            # The cap bounds the drift between the monotonic sleep and the wall clock
+            next_deadline = min(job.next_run for job in self.jobs.values())
+            delay = min(max((next_deadline - now).total_seconds(), 0.0), SCHEDULER_MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self.wakeups += 1
+    
+    async def _run_job(self, job: Job, now: datetime) -> None:
+        """Run one job and record its timing"""
+        start = time.perf_counter()
+        try:
+            await job.func()
+        except Exception as e:
+            job.stats["failures"] += 1
+            print(f"Error in scheduled job {job.name}: {e}")
+            traceback.print_exc()
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            job.stats["runs"] += 1
+            job.stats["last_ms"] = elapsed_ms
+            job.stats["max_ms"] = max(job.stats["max_ms"], elapsed_ms)
+            job.stats["total_ms"] += elapsed_ms
+            
+            job.last_run = now
+            if job.persist:
+                self.save_state()
+    
+    def load_state(self) -> None:
+        """Load the last run times"""
+        if not os.path.exists(SCHEDULER_STATE_FILE):
+            return
+        
+        try:
+            with open(SCHEDULER_STATE_FILE, 'r') as f:
+                self.saved_runs = {name: datetime.fromisoformat(last_run) for name, last_run in json.load(f).items()}
+        except Exception as e:
+            print(f"Error loading scheduler state: {e}")
+    
+    def save_state(self) -> None:
+        """Save the last run times"""
+        try:
+            temp_file = SCHEDULER_STATE_FILE + ".tmp"
+            with open(temp_file, 'w') as f:
+                json.dump({job.name: job.last_run.isoformat() for job in self.jobs.values() if job.persist and job.last_run}, f)
+            os.replace(temp_file, SCHEDULER_STATE_FILE)
+        except Exception as e:
+            print(f"Error saving scheduler state: {e}")
+
+def setup_scheduled_tasks(bot) -> Scheduler:
+    """Set up all scheduled tasks for the bot"""
+    
+    # Daily, weekly and monthly figures are range queries over timestamped
+    # activity events, so nothing needs to be reset when a period ends
+    
     async def check_deleted_channels():
-        """Periodically check for deleted channels and remove them from tracking"""
+        """Remove channels deleted while the bot was offline"""
         if not bot.data_manager.ticket_channels:
             return
-            
+        
         print(f"[{datetime.now(timezone.utc)}] Checking for deleted channels...")
         
         deleted_count = await bot.data_manager.check_and_remove_deleted_channels()
         
         if deleted_count > 0:
             print(f"[{datetime.now(timezone.utc)}] Removed {deleted_count} deleted channel(s) from tracking.")
-
-    @tasks.loop(hours=1)
+    
     async def check_sahara_bots():
         """Periodically check Sahara Bots configuration"""
         await bot.config_manager.check_sahara_bots()
-
-    @tasks.loop(minutes=1)
-    async def send_automated_reports():
-        """Send automated reports on specific days at 00:00 UTC"""
+    
+    def next_queue_alert(after: datetime) -> datetime:
+        """When the oldest ticket not yet reported will have waited queue_alert_minutes (NEVER when alerts are off)"""
+        max_wait_minutes = bot.config.get("queue_alert_minutes") or 0
+        if max_wait_minutes <= 0 or not bot.config.get("reports_channel_id"):
+            return NEVER
+        
+        due = bot.data_manager.unanswered.next_alert(max_wait_minutes * 60)
+        if due is None:
+            return NEVER
+        
+        # Tickets becoming overdue close together are reported in one message
+        return max(datetime.fromtimestamp(due, timezone.utc), after + timedelta(seconds=QUEUE_ALERT_INTERVAL))
+    
+    async def alert_unanswered_tickets():
+        """Warn in the reports channel about tickets waiting longer than queue_alert_minutes"""
+        try:
+            await send_queue_alert()
+        finally:
+            # The alerted tickets no longer count, so the next deadline moves on
+            scheduler.reschedule("alert_unanswered_tickets")
+    
+    async def send_queue_alert():
+        max_wait_minutes = bot.config.get("queue_alert_minutes") or 0
+        channel = bot.get_channel(bot.config.get("reports_channel_id"))
+        if max_wait_minutes <= 0 or not channel:
+            return
+        
+        queue = bot.data_manager.unanswered
+        overdue = queue.overdue(max_wait_minutes * 60, time.time())
+        if not overdue:
+            return
+        
+        lines = []
+        for channel_id, created in overdue[:20]:
+            name, guild_id = bot.data_manager.ticket_channels.get(channel_id, ("unknown", 0))
+            lines.append(f"• [{name}](https://discord.com/channels/{guild_id}/{channel_id})")
+        more = f"\n…and {len(overdue) - 20} more" if len(overdue) > 20 else ""
+        await channel.send(f"⏰ **{len(overdue)}** ticket(s) waiting more than {max_wait_minutes} minutes for a response:\n"
+                           + "\n".join(lines) + more)
+        
+        # Each ticket is reported once
+        queue.alerted.update(channel_id for channel_id, _ in overdue)
+    
+    async def send_automated_report():
+        """Send the automated weekly report"""
         now = datetime.now(timezone.utc)
+        print(f"[{now}] Time to send automated weekly report.")
         
-        # Check if it's time to send a report (00:00 on 7th, 14th, 21st, or 28th)
-        if now.hour == 0 and now.minute == 0 and now.day in [7, 14, 21, 28]:
-            print(f"[{now}] Time to send automated weekly report.")
-            
-            # Check if reports channel is set
-            reports_channel_id = bot.config.get("reports_channel_id")
-            if not reports_channel_id:
-                print("No reports channel set. Skipping automated report.")
-                return
-                
-            channel = bot.get_channel(reports_channel_id)
-            if not channel:
-                print(f"Could not find channel with ID {reports_channel_id}. Skipping automated report.")
-                return
-                
-            try:
-                # Generate and send the weekly report
-                from commands.report_commands import report_command
-                
-                await channel.send("📊 **Automated Weekly Report**")
-                await report_command(bot, channel, "weekly")
-                print(f"[{now}] Automated weekly report sent to channel {channel.name} (ID: {channel.id})")
-            except Exception as e:
-                print(f"Error sending automated report: {e}")
-                import traceback
-                traceback.print_exc()
-
-    # Start all the tasks
-    reset_daily_activity.start()
-    check_weekly_reset.start()
-    check_monthly_reset.start()
-    check_deleted_channels.start()
-    check_sahara_bots.start()
-    send_automated_reports.start()
-    
-    # Setup pre-loop hooks for all tasks
-    @reset_daily_activity.before_loop
-    @check_weekly_reset.before_loop
-    @check_monthly_reset.before_loop
-    @check_deleted_channels.before_loop
-    @check_sahara_bots.before_loop
-    @send_automated_reports.before_loop
-    async def before_tasks():
-        """Wait until the bot is ready before starting tasks"""
-        await bot.wait_until_ready()
-    
-    # Return tasks for reference
-    return {
-        "reset_daily_activity": reset_daily_activity,
-        "check_weekly_reset": check_weekly_reset,
-        "check_monthly_reset": check_monthly_reset,
-        "check_deleted_channels": check_deleted_channels,
-        "check_sahara_bots": check_sahara_bots,
-        "send_automated_reports": send_automated_reports
-    }
\ No newline at end of file
+        # Check if reports channel is set
+        reports_channel_id = bot.config.get("reports_channel_id")
+        if not reports_channel_id:
+            print("No reports channel set. Skipping automated report.")
+            return
+        
+        channel = bot.get_channel(reports_channel_id)
+        if not channel:
+            print(f"Could not find channel with ID {reports_channel_id}. Skipping automated report.")
+            return
+        
+        # Generate and send the weekly report
+        from commands.report_commands import report_command
+        
+        await channel.send("📊 **Automated Weekly Report**")
+        await report_command(bot, channel, "weekly")
+        print(f"[{now}] Automated weekly report sent to channel {channel.name} (ID: {channel.id})")
+    
+    scheduler = Scheduler(bot)
+    
+    # The reconciliation also runs at every start, for deletions made while the bot was offline
+    scheduler.add_job(Job("check_deleted_channels", check_deleted_channels, every(timedelta(hours=12)), run_at_start=True))
+    
+    # Sahara bots are checked in on_ready, so the first run can wait for the interval
+    scheduler.add_job(Job("check_sahara_bots", check_sahara_bots, every(timedelta(hours=1))))
+    
+    # Runs only when a waiting ticket reaches queue_alert_minutes; rescheduled as the queue and config change
+    scheduler.add_job(Job("alert_unanswered_tickets", alert_unanswered_tickets, next_queue_alert, persist=False))
+    
+    # Closed periods are archived at every rollover (00:00 UTC) and at every start
+    scheduler.add_job(Job("archive_periods", bot.period_history.run_archive,
+                          lambda last_run: next_midnight_on_days(last_run, range(1, 32)), run_at_start=True))
+    
+    # 00:00 UTC on the 7th, 14th, 21st and 28th; a report missed while offline is sent the same day
+    scheduler.add_job(Job("send_automated_reports", send_automated_report,
+                          lambda last_run: next_midnight_on_days(last_run, REPORT_DAYS),
+                          catch_up_window=timedelta(hours=24)))
+    
+    scheduler.start()
+    return scheduler
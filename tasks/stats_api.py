@@ -0,0 +1,168 @@
+import os
+import gzip
+import json
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from aiohttp import web
+from constants import API_CACHE_SIZE, API_DEFAULT_PAGE_SIZE, API_MAX_PAGE_SIZE
+from period_history import HISTORY_PERIODS
+from utils.periods import period_start, period_end
+
+class StatsApi:
+    """Read-only JSON API over the bot's in-memory state; never calls Discord or reads the data files"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/api/activity", self.activity),
+            web.get("/api/activity/rolling", self.rolling),
+            web.get("/api/tickets", self.tickets),
+            web.get("/api/tickets/{channel_id}/messages", self.ticket_messages),
+            web.get("/metrics", self.metrics),
+        ])
+        self._runner: Optional[web.AppRunner] = None
+        
+        # The version counters restart at 0 with the process, so ETags from an earlier run must not match
+        self.boot_id = os.urandom(8).hex()
+        
+        # ETag -> (JSON body, gzipped body), most recently used last
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        
+        # Counters
+        self.stats = {"requests": 0, "not_modified": 0, "cache_hits": 0, "cache_misses": 0}
+    
+    async def start(self, host: str, port: int) -> None:
+        """Start serving on host:port"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"Stats API listening on http://{host}:{port}/api/")
+    
+    async def close(self) -> None:
+        """Stop serving"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    def _respond(self, request: web.Request, key: tuple, build: Callable[[], object]) -> web.Response:
+        """Answer from the data version alone when possible: 304 if the client has it, else cached bytes"""
+        self.stats["requests"] += 1
+        etag = '"' + hashlib.sha1(repr((self.boot_id,) + key).encode()).hexdigest()[:20] + '"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        
+        if etag in request.headers.get("If-None-Match", ""):
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers=headers)
+        
+        cached = self._cache.get(etag)
+        if cached is None:
+            self.stats["cache_misses"] += 1
+            body = json.dumps(build(), separators=(",", ":")).encode()
+            cached = self._cache[etag] = (body, gzip.compress(body, 6))
+            if len(self._cache) > API_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self.stats["cache_hits"] += 1
+            self._cache.move_to_end(etag)
+        
+        body, gzipped = cached
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = gzipped
+        return web.Response(body=body, content_type="application/json", headers=headers)
+    
+    @staticmethod
+    def _page(request: web.Request):
+        """Read ?page= (from 1) and ?per_page= (at most API_MAX_PAGE_SIZE)"""
+        try:
+            page = max(int(request.query.get("page", 1)), 1)
+            per_page = min(max(int(request.query.get("per_page", API_DEFAULT_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+        except ValueError:
+            raise web.HTTPBadRequest(text="page and per_page must be integers")
+        return page, per_page
+    
+    @staticmethod
+    def _paginate(items: list, page: int, per_page: int) -> dict:
+        """One page of a collection with the paging details"""
+        start = (page - 1) * per_page
+        return {
+            "page": page,
+            "per_page": per_page,
+            "total": len(items),
+            "next_page": page + 1 if start + per_page < len(items) else None,
+            "items": items[start:start + per_page],
+        }
+    
+    async def metrics(self, request: web.Request) -> web.Response:
+        """GET /metrics - bot internals in the Prometheus text format (never cached)"""
+        return web.Response(text=self.bot.metrics.render(), content_type="text/plain", charset="utf-8",
+                            headers={"Cache-Control": "no-store"})
+    
+    async def activity(self, request: web.Request) -> web.Response:
+        """GET /api/activity?period=daily|weekly|biweekly|monthly - counts per user for the current period"""
+        period = request.query.get("period", "daily")
+        if period not in HISTORY_PERIODS:
+            raise web.HTTPBadRequest(text=f"period must be one of {', '.join(HISTORY_PERIODS)}")
+        
+        now = datetime.now(timezone.utc)
+        start = period_start(period, now)
+        data_manager = self.bot.data_manager
+        
+        def build():
+            summary = data_manager.get_activity_summary(period)
+            return {
+                "period": period,
+                "start": start.isoformat(),
+                "end": period_end(period, now).isoformat(),
+                "users": [{"user_id": str(user_id), "name": self.bot.user_directory.get_name(user_id), "counts": counts}
+                          for user_id, counts in summary.items()],
+            }
+        key = ("activity", period, start.timestamp(), data_manager.activity_version, self.bot.user_directory.names_version)
+        return self._respond(request, key, build)
+    
+    async def rolling(self, request: web.Request) -> web.Response:
+        """GET /api/activity/rolling - counts per user over the last 24 hours, 7 days and 30 days"""
+        data_manager = self.bot.data_manager
+        hour = int(datetime.now(timezone.utc).timestamp()) // 3600
+        
+        def build():
+            summary = data_manager.get_rolling_summary()
+            return {
+                "users": [{"user_id": str(user_id), "name": self.bot.user_directory.get_name(user_id), "counts": counts}
+                          for user_id, counts in summary.items()],
+            }
+        # The hourly buckets move on even without new activity
+        return self._respond(request, ("rolling", hour, data_manager.activity_version, self.bot.user_directory.names_version), build)
+    
+    async def tickets(self, request: web.Request) -> web.Response:
+        """GET /api/tickets?page=&per_page= - tracked ticket channels, sorted by name"""
+        page, per_page = self._page(request)
+        data_manager = self.bot.data_manager
+        
+        def build():
+            channels = [{"channel_id": str(channel_id), "name": name, "guild_id": str(guild_id)}
+                        for channel_id, name, guild_id in data_manager.list_ticket_channels()]
+            return self._paginate(channels, page, per_page)
+        return self._respond(request, ("tickets", page, per_page, data_manager.channels_version), build)
+    
+    async def ticket_messages(self, request: web.Request) -> web.Response:
+        """GET /api/tickets/{channel_id}/messages?page=&per_page= - recorded moderator messages, newest first"""
+        try:
+            channel_id = int(request.match_info["channel_id"])
+        except ValueError:
+            raise web.HTTPBadRequest(text="channel_id must be an integer")
+        
+        data_manager = self.bot.data_manager
+        if channel_id not in data_manager.ticket_channels:
+            raise web.HTTPNotFound(text="not a tracked ticket channel")
+        page, per_page = self._page(request)
+        
+        def build():
+            messages = [dict(message, user_id=str(message["user_id"]),
+                             message_id=str(message["message_id"]) if message.get("message_id") else None)
+                        for message in reversed(data_manager.get_ticket_messages(channel_id))]
+            return self._paginate(messages, page, per_page)
+        return self._respond(request, ("messages", channel_id, page, per_page, data_manager.messages_version), build)
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from storage.activity_log import ActivityLog, SECONDS_PER_DAY, legacy_bucket_events
+
+def ts(day: int, hour: int = 12) -> int:
+    """Timestamp in October 2026 (weeks start on the 1st, 8th, 15th and 22nd)"""
+    return int(datetime(2026, 10, day, hour, tzinfo=timezone.utc).timestamp())
+
+def at(day: int, hour: int = 12) -> datetime:
+    """The same time as a datetime"""
+    return datetime(2026, 10, day, hour, tzinfo=timezone.utc)
+
+def test_channel_is_counted_once_per_day_and_period():
+    """A repeat on the same day is ignored; on a later day it is new only in the shorter periods"""
+    log = ActivityLog()
+    assert log.add(7, 100, "closed", ts(16)) == ["daily", "weekly", "monthly", "biweekly"]
+    assert log.add(7, 100, "closed", ts(16, 18)) is None
+    assert log.add(7, 100, "closed", ts(17)) == ["daily"]
+    assert log.add(7, 100, "closed", ts(22)) == ["daily", "weekly"]
+    assert log.add(7, 100, "addressed", ts(22)) == ["daily", "weekly", "monthly", "biweekly"]
+
+def test_summaries_count_distinct_channels_in_the_window():
+    """Each period counts the distinct channels of the window containing the given time"""
+    log = ActivityLog()
+    log.add(7, 100, "closed", ts(14))
+    log.add(7, 200, "closed", ts(15))
+    log.add(7, 100, "closed", ts(16))
+    log.add(8, 300, "deleted", ts(31, 23))
+    
+    assert log.summary("daily", at(16)) == {7: {"closed": 1}}
+    assert log.summary("weekly", at(16)) == {7: {"closed": 2}}
+    assert log.summary("weekly", at(9)) == {7: {"closed": 1}}
+    assert log.summary("weekly", at(5)) == {}
+    assert log.summary("biweekly", at(14)) == {7: {"closed": 1}}
+    assert log.summary("monthly", at(16)) == {7: {"closed": 2}, 8: {"deleted": 1}}
+    
+    # The last week of the month runs to its end
+    assert log.summary("weekly", at(31)) == {8: {"deleted": 1}}
+
+def test_replayed_history_does_not_disturb_the_current_window():
+    """An event replayed from earlier in the month counts in the month, but not in the current week"""
+    log = ActivityLog()
+    log.add(7, 100, "closed", ts(16))
+    assert log.add(7, 200, "closed", ts(2)) == ["monthly"]
+    assert log.summary("weekly", at(16)) == {7: {"closed": 1}}
+    assert log.summary("monthly", at(16)) == {7: {"closed": 2}}
+
+def test_range_summary_covers_whole_days():
+    """Ranges are day-aligned and exclusive at the end"""
+    log = ActivityLog()
+    log.add(7, 100, "closed", ts(10))
+    log.add(7, 200, "closed", ts(11))
+    log.add(7, 300, "closed", ts(12))
+    assert log.range_summary(ts(10, 0), ts(12, 0)) == {7: {"closed": 2}}
+
+def test_prune_drops_old_days():
+    """Pruning removes whole day partitions before the cutoff"""
+    log = ActivityLog()
+    log.add(7, 100, "closed", ts(10))
+    log.add(7, 200, "closed", ts(11))
+    assert log.prune(ts(11) // SECONDS_PER_DAY) == 1
+    assert log.range_summary(ts(1, 0), ts(31, 0)) == {7: {"closed": 1}}
+
+def test_json_round_trip():
+    """Serialized partitions load back into the same events"""
+    log = ActivityLog()
+    log.add(7, 200, "closed", ts(16, 9))
+    log.add(7, 100, "closed", ts(16, 10))
+    log.add(8, 100, "addressed", ts(17))
+    
+    restored = ActivityLog()
+    restored.load_json(log.to_json())
+    assert restored.to_json() == log.to_json()
+    assert restored.summary("weekly", at(17)) == {7: {"closed": 2}, 8: {"addressed": 1}}
+
+def test_legacy_buckets_start_at_their_period():
+    """Old bucket entries carry no time, so they are placed at the start of their period"""
+    now = at(16)
+    events = list(legacy_bucket_events({
+        "daily": {"7": {"closed": ["100"]}},
+        "weekly": {"7": {"closed": ["100"]}},
+        "monthly": {"8": {"deleted": ["200"]}},
+    }, now))
+    assert events == [(7, 100, "closed", ts(16, 0)), (7, 100, "closed", ts(15, 0)), (8, 200, "deleted", ts(1, 0))]
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+from utils.classifier import DEFAULT_MESSAGE_RULES, MessageClassifier, RuleSet, mentioned_user_ids, parse_rules, shared_anchors
+
+BOT_ID = 1275351977286570056
+OTHER_BOT_ID = 1234
+
+def embed(description: str, title: str = None):
+    """Minimal stand-in for a discord.Embed"""
+    return SimpleNamespace(title=title, description=description, fields=[], footer=None)
+
+def test_default_rules_classify_lifecycle_messages():
+    """Each default rule matches Sahara's wording, case-insensitively"""
+    classifier = MessageClassifier(DEFAULT_MESSAGE_RULES)
+    assert classifier.classify(BOT_ID, "<@1> Closed the ticket.") == ("closed", "<@1> Closed the ticket.")
+    assert classifier.classify(BOT_ID, "<@1> deleted the ticket.")[0] == "deleted"
+    assert classifier.classify(BOT_ID, "<@1> re-opened the ticket.")[0] == "reopened"
+    assert classifier.classify(BOT_ID, "<@1> reopened the ticket.")[0] == "reopened"
+    assert classifier.classify(BOT_ID, "Ticket claimed by <@1> - <@1> claimed the ticket")[0] == "claimed"
+    assert classifier.classify(BOT_ID, "Transcript saved to #ticket-logs")[0] == "transcript"
+
+def test_chatter_is_not_classified():
+    """Messages without lifecycle wording, including near misses, match no rule"""
+    classifier = MessageClassifier(DEFAULT_MESSAGE_RULES)
+    assert classifier.classify(BOT_ID, "Thanks, the ticket is being looked at") is None
+    assert classifier.classify(BOT_ID, "Here is the transcript you asked for") is None
+    assert classifier.classify(BOT_ID, "") is None
+
+def test_earliest_match_wins():
+    """When several rules match, the one matching earliest in the text wins, then table order"""
+    classifier = MessageClassifier(DEFAULT_MESSAGE_RULES)
+    assert classifier.classify(BOT_ID, "<@1> deleted the ticket after <@1> closed the ticket")[0] == "deleted"
+    
+    tied = MessageClassifier([{"action": "first", "pattern": "ticket"}, {"action": "second", "pattern": r"ticket\b"}])
+    assert tied.classify(BOT_ID, "ticket")[0] == "first"
+
+def test_embeds_are_searched_when_content_does_not_match():
+    """Embed text is classified for messages whose content has no lifecycle wording"""
+    classifier = MessageClassifier(DEFAULT_MESSAGE_RULES)
+    action, text = classifier.classify(BOT_ID, "", [embed("<@42> closed the ticket", title="Ticket Closed")])
+    assert action == "closed"
+    assert mentioned_user_ids(text) == [42]
+
+def test_rules_restricted_by_source_and_bot():
+    """Rules only apply to the sources and ticket bots they name"""
+    classifier = MessageClassifier([
+        {"action": "closed", "pattern": "closed the ticket", "sources": ["embeds"]},
+        {"action": "claimed", "pattern": "claimed the ticket", "bot_ids": [OTHER_BOT_ID]},
+    ])
+    assert classifier.classify(BOT_ID, "closed the ticket") is None
+    assert classifier.classify(BOT_ID, "", [embed("closed the ticket")])[0] == "closed"
+    assert classifier.classify(BOT_ID, "claimed the ticket") is None
+    assert classifier.classify(OTHER_BOT_ID, "claimed the ticket")[0] == "claimed"
+
+def test_invalid_rules_are_skipped(capsys):
+    """Rules with a missing field, a bad pattern or an unknown source are reported and ignored"""
+    rules = parse_rules([
+        {"pattern": "closed the ticket"},
+        {"action": "broken", "pattern": "(unclosed"},
+        {"action": "closed", "pattern": "closed the ticket", "sources": ["reactions"]},
+        {"action": "deleted", "pattern": "deleted the ticket"},
+    ])
+    assert [rule.action for rule in rules] == ["deleted"]
+    assert capsys.readouterr().out.count("Ignoring invalid message rule") == 3
+
+def test_plain_text_patterns_skip_the_regex_engine():
+    """Patterns without regex syntax are matched as lowercase substrings"""
+    rules = parse_rules(DEFAULT_MESSAGE_RULES)
+    closed, reopened = rules[0], rules[2]
+    assert (closed.literal, closed.regex) == ("closed the ticket", None)
+    assert reopened.literal is None and reopened.keywords == ("opened the ticket",)
+
+def test_gate_covers_every_keyword():
+    """Every keyword contains one of the prefilter's anchors"""
+    keywords = ["closed the ticket", "deleted the ticket", "opened the ticket", "claimed the ticket", "transcript"]
+    anchors = shared_anchors(keywords)
+    assert len(anchors) == 2
+    assert all(any(anchor in keyword for anchor in anchors) for keyword in keywords)
+
+def test_rule_without_keywords_disables_the_gate():
+    """A regex rule without keywords must see every message, so there is no prefilter"""
+    rule_set = RuleSet(parse_rules([{"action": "closed", "pattern": r"clos(ed|ing) ticket"}]))
+    assert rule_set.gate is None
+    assert rule_set.match("Closing ticket now").action == "closed"
@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timezone
+import pytest
+from constants import JOURNAL_FILE, ROTATED_JOURNAL_FILE
+from storage.json_store import JsonStorage
+
+NOW = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    """The JSON backend keeps its files in the working directory"""
+    monkeypatch.chdir(tmp_path)
+
+def reopen(bot) -> JsonStorage:
+    """Load the stored state into a fresh backend, as on a restart"""
+    storage = JsonStorage(bot)
+    storage.load_data()
+    return storage
+
+def test_replay_restores_activity_and_channels(bot):
+    """Channel adds, removals and activity written only to the journal survive a restart"""
+    storage = reopen(bot)
+    storage.add_ticket_channel(100, "ticket-1", 1)
+    storage.add_ticket_channel(200, "ticket-2", 1)
+    storage.record_activity(7, 100, "closed", NOW)
+    storage.remove_ticket_channels([200])
+    storage.close()
+    
+    restored = reopen(bot)
+    assert restored.ticket_channels == {100: ("ticket-1", 1)}
+    assert restored.get_activity_summary("daily", NOW) == {7: {"closed": 1}}
+    assert restored.journal_seq == storage.journal_seq == 4
+
+def test_channel_changes_do_not_rewrite_the_snapshot(bot):
+    """Channel adds and removals are journaled; only compaction writes the full snapshot"""
+    storage = reopen(bot)
+    bot.persistence.dirty.clear()
+    storage.add_ticket_channel(100, "ticket-1", 1)
+    storage.remove_ticket_channels([100])
+    assert "data" not in bot.persistence.dirty
+    
+    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records == [{"s": 1, "op": "add", "c": 100, "n": "ticket-1", "g": 1}, {"s": 2, "op": "del", "c": [100]}]
+
+def test_replay_skips_records_covered_by_the_snapshot(bot):
+    """Records up to the snapshot's sequence number are already in it and are not applied again"""
+    storage = reopen(bot)
+    storage.add_ticket_channel(100, "ticket-1", 1)
+    storage.write_now("data")
+    storage.remove_ticket_channels([100])
+    storage.close()
+    
+    # The rotated journal still holds the add; replaying it after the removal would bring the channel back
+    with open(ROTATED_JOURNAL_FILE, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"s": 1, "op": "add", "c": 100, "n": "ticket-1", "g": 1}) + "\n")
+    
+    restored = reopen(bot)
+    assert restored.ticket_channels == {}
+    assert restored.journal_seq == 2
+
+def test_rotated_journal_is_replayed_before_the_current_one(bot):
+    """A journal rotated for a snapshot that was never written is still applied, in order"""
+    storage = reopen(bot)
+    storage.add_ticket_channel(100, "ticket-1", 1)
+    storage.build_snapshots({"data"})  # Rotates the journal; the snapshot is never written
+    storage.remove_ticket_channels([100])
+    storage.add_ticket_channel(300, "ticket-3", 1)
+    storage.close()
+    
+    restored = reopen(bot)
+    assert restored.ticket_channels == {300: ("ticket-3", 1)}
+
+def test_partially_written_record_ends_the_replay(bot):
+    """A record cut off by a crash, and anything after it, is ignored"""
+    storage = reopen(bot)
+    storage.add_ticket_channel(100, "ticket-1", 1)
+    storage.close()
+    with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write('{"s":2,"op":"add","c":200,"n":"tick')
+    
+    restored = reopen(bot)
+    assert restored.ticket_channels == {100: ("ticket-1", 1)}
+    assert restored.journal_seq == 1
+
+def test_legacy_snapshot_is_converted(bot):
+    """Old daily/weekly/monthly buckets and channel lists load as activity events"""
+    with open("activity_data.json", 'w') as f:
+        json.dump({
+            "ticket_channels": [100, 200],
+            "user_activity": {
+                "daily": {"7": {"closed": [100]}},
+                "weekly": {"7": {"closed": [100, 200]}},
+                "monthly": {"7": {"closed": [100, 200], "addressed": [300]}},
+            },
+        }, f)
+    
+    storage = reopen(bot)
+    now = datetime.now(timezone.utc)
+    assert storage.ticket_channels == {100: ("unknown", 1), 200: ("unknown", 1)}
+    assert storage.get_activity_summary("daily", now) == {7: {"closed": 1}}
+    assert storage.get_activity_summary("weekly", now) == {7: {"closed": 2}}
+    assert storage.get_activity_summary("monthly", now) == {7: {"closed": 2, "addressed": 1}}
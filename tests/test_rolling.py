@@ -0,0 +1,53 @@
+from utils.rolling import RingCounter, RollingActivity
+
+HOUR = 3600
+DAY = 86400
+NOW = 1_792_000_000 // DAY * DAY + 12 * HOUR  # Noon UTC
+
+def test_counts_within_the_window():
+    """Totals sum the last buckets up to and including the current one"""
+    counter = RingCounter(HOUR, 24)
+    counter.add(NOW, NOW)
+    counter.add(NOW - HOUR, NOW)
+    counter.add(NOW - 5 * HOUR, NOW)
+    assert counter.total(NOW, 1) == 1
+    assert counter.total(NOW, 2) == 2
+    assert counter.total(NOW, 24) == 3
+
+def test_events_older_than_the_buffer_are_ignored():
+    """Events that would land in a bucket that has already left the buffer are not counted"""
+    counter = RingCounter(HOUR, 24)
+    counter.add(NOW - 24 * HOUR, NOW)
+    assert counter.total(NOW, 24) == 0
+    assert list(counter.stamps) == [-1] * 24
+
+def test_slots_are_reused_as_time_moves_on():
+    """A slot whose bucket has left the window is reset before counting the new bucket"""
+    counter = RingCounter(HOUR, 24)
+    counter.add(NOW, NOW)
+    counter.add(NOW, NOW)
+    later = NOW + 24 * HOUR
+    counter.add(later, later)
+    assert counter.total(later, 24) == 1
+    assert counter.total(later, 1) == 1
+    
+    # A late event for the bucket that slot used to hold is dropped, not counted in the new one
+    counter.add(NOW, later)
+    assert counter.total(later, 24) == 1
+
+def test_stale_buckets_drop_out_of_totals():
+    """Buckets older than the requested window are skipped even before their slot is reused"""
+    counter = RingCounter(DAY, 30)
+    counter.add(NOW, NOW)
+    assert counter.total(NOW + 6 * DAY, 7) == 1
+    assert counter.total(NOW + 7 * DAY, 7) == 0
+
+def test_rolling_summary_per_window():
+    """Each window reports the actions it covers; users without any are left out"""
+    rolling = RollingActivity()
+    rolling.load([(7, "closed", NOW - HOUR), (7, "closed", NOW - 3 * DAY), (7, "closed", NOW - 20 * DAY),
+                  (8, "addressed", NOW - 40 * DAY)], NOW)
+    assert rolling.summary(NOW) == {7: {"closed": {"24h": 1, "7d": 2, "30d": 3}}}
+    
+    rolling.clear()
+    assert rolling.summary(NOW) == {}
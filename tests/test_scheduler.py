@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from constants import SCHEDULER_STATE_FILE
+from tasks.scheduler import Job, Scheduler, REPORT_DAYS, every, next_midnight_on_days
+
+def utc(month: int, day: int, hour: int = 0, minute: int = 0) -> datetime:
+    """A time in 2026"""
+    return datetime(2026, month, day, hour, minute, tzinfo=timezone.utc)
+
+async def noop():
+    """Job that does nothing"""
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    """The scheduler keeps its state file in the working directory"""
+    monkeypatch.chdir(tmp_path)
+
+def test_next_midnight_is_strictly_after():
+    """A time exactly at midnight on a matching day moves on to the next matching day"""
+    assert next_midnight_on_days(utc(10, 16, 13), range(1, 32)) == utc(10, 17)
+    assert next_midnight_on_days(utc(10, 17), range(1, 32)) == utc(10, 18)
+
+def test_next_midnight_skips_to_report_days():
+    """Weekly reports fall on the 7th, 14th, 21st and 28th, crossing into the next month"""
+    assert next_midnight_on_days(utc(10, 7), REPORT_DAYS) == utc(10, 14)
+    assert next_midnight_on_days(utc(10, 16, 13), REPORT_DAYS) == utc(10, 21)
+    assert next_midnight_on_days(utc(10, 28), REPORT_DAYS) == utc(11, 7)
+    assert next_midnight_on_days(utc(12, 30), REPORT_DAYS) == datetime(2027, 1, 7, tzinfo=timezone.utc)
+
+def test_every_counts_from_the_last_run():
+    """Fixed-interval schedules add the interval to the last run"""
+    assert every(timedelta(minutes=10))(utc(10, 16, 12)) == utc(10, 16, 12, 10)
+
+def test_plan_catches_up_on_missed_runs(bot):
+    """A run missed while offline is due immediately, unless it is older than the catch-up window"""
+    now = utc(10, 16, 12)
+    scheduler = Scheduler(bot)
+    scheduler.saved_runs = {"report": utc(10, 13), "cleanup": utc(10, 1), "poll": now - timedelta(minutes=5)}
+    report = Job("report", noop, lambda last_run: next_midnight_on_days(last_run, REPORT_DAYS))
+    cleanup = Job("cleanup", noop, every(timedelta(days=1)), catch_up_window=timedelta(hours=1))
+    poll = Job("poll", noop, every(timedelta(minutes=10)))
+    fresh = Job("fresh", noop, every(timedelta(hours=1)))
+    startup = Job("startup", noop, every(timedelta(days=1)), run_at_start=True)
+    for job in (report, cleanup, poll, fresh, startup):
+        scheduler.add_job(job)
+    
+    scheduler._plan(now)
+    assert report.next_run == utc(10, 14)
+    assert report.stats["caught_up"] == 1
+    assert cleanup.next_run == now + timedelta(days=1)
+    assert cleanup.stats["skipped"] == 1
+    assert poll.next_run == now + timedelta(minutes=5)
+    assert fresh.next_run == now + timedelta(hours=1)
+    assert startup.next_run == now
+
+def test_only_persistent_jobs_keep_their_last_run(bot):
+    """Jobs with persist=False neither save nor restore a last run"""
+    with open(SCHEDULER_STATE_FILE, 'w') as f:
+        json.dump({"alerts": utc(10, 1).isoformat()}, f)
+    
+    scheduler = Scheduler(bot)
+    report = Job("report", noop, every(timedelta(days=7)))
+    alerts = Job("alerts", noop, every(timedelta(minutes=5)), persist=False)
+    scheduler.add_job(report)
+    scheduler.add_job(alerts)
+    assert alerts.last_run is None
+    
+    report.last_run = alerts.last_run = utc(10, 16)
+    scheduler.save_state()
+    with open(SCHEDULER_STATE_FILE, 'r') as f:
+        assert json.load(f) == {"report": utc(10, 16).isoformat()}
@@ -0,0 +1,63 @@
+import time
+from constants import LIFECYCLE_RETENTION_DAYS
+from ticket_lifecycle import DISCORD_EPOCH_MS, TicketLifecycles, latency_stats, percentile, snowflake_time
+
+def snowflake(ts: float) -> int:
+    """Discord ID created at a Unix timestamp"""
+    return int(ts * 1000 - DISCORD_EPOCH_MS) << 22
+
+def test_snowflake_time_round_trip():
+    """Channel and message IDs carry their creation time"""
+    assert snowflake_time(snowflake(1_792_000_000)) == 1_792_000_000
+
+def test_seed_only_recent_tickets_with_a_message():
+    """Seeding needs a recorded first message and a channel within the retention"""
+    now = int(time.time())
+    recent = snowflake(now - 86400)
+    old = snowflake(now - (LIFECYCLE_RETENTION_DAYS + 1) * 86400)
+    first_message = {"user_id": 7, "timestamp": "2026-10-16T12:00:00+00:00", "message_id": snowflake(now - 3600)}
+    
+    lifecycles = TicketLifecycles()
+    lifecycles.seed(old, first_message)
+    lifecycles.seed(recent, None)
+    assert lifecycles.tickets == {}
+    
+    lifecycles.seed(recent, first_message)
+    ticket = lifecycles.tickets[recent]
+    assert (ticket.first_response, ticket.first_responder) == (snowflake_time(first_message["message_id"]), 7)
+
+def test_note_keeps_the_earliest_event():
+    """Events replayed out of order keep the earliest time, and old channels get no record"""
+    now = int(time.time())
+    channel_id = snowflake(now - 86400)
+    lifecycles = TicketLifecycles()
+    lifecycles.note(channel_id, "addressed", 7, now - 100)
+    lifecycles.note(channel_id, "addressed", 8, now - 200)
+    lifecycles.note(channel_id, "addressed", 9, now - 50)
+    ticket = lifecycles.tickets[channel_id]
+    assert (ticket.first_response, ticket.first_responder) == (now - 200, 8)
+    
+    lifecycles.note(snowflake(now - (LIFECYCLE_RETENTION_DAYS + 1) * 86400), "closed", 7, now)
+    assert list(lifecycles.tickets) == [channel_id]
+
+def test_latency_stats_match_percentile():
+    """Median and 90th percentile interpolate between ranks"""
+    latencies = [10.0, 20.0, 30.0, 40.0, 100.0]
+    assert latency_stats({7: latencies, 8: [5.0]}) == {
+        7: (5, percentile(latencies, 50), percentile(latencies, 90)),
+        8: (1, 5.0, 5.0),
+    }
+    assert percentile(latencies, 90) == 76.0
+
+def test_sla_groups_tickets_created_in_the_window():
+    """Response and close latencies are grouped by moderator for tickets created in the window"""
+    now = int(time.time())
+    lifecycles = TicketLifecycles()
+    inside, outside = snowflake(now - 3600), snowflake(now - 3 * 86400)
+    for channel_id in (inside, outside):
+        created = snowflake_time(channel_id)
+        lifecycles.note(channel_id, "addressed", 7, created + 60)
+        lifecycles.note(channel_id, "closed", 8, created + 600)
+    
+    sla = lifecycles.sla(now - 86400, now)
+    assert sla == {"response": {7: (1, 60.0, 60.0)}, "close": {8: (1, 600.0, 600.0)}}
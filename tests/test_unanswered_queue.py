@@ -0,0 +1,65 @@
+import random
+from ticket_lifecycle import TicketLifecycle, TicketLifecycles, UnansweredQueue
+
+def filled_queue(created_times) -> UnansweredQueue:
+    """Queue with one ticket per creation time, channel IDs in insertion order"""
+    queue = UnansweredQueue()
+    for channel_id, created in enumerate(created_times, start=1):
+        queue.push(channel_id, created)
+    return queue
+
+def test_oldest_walks_the_heap_in_creation_order():
+    """The longest-waiting tickets come out oldest first, however the heap is laid out"""
+    created_times = list(range(100))
+    random.Random(42).shuffle(created_times)
+    queue = filled_queue(created_times)
+    assert [created for _, created in queue.oldest(10)] == list(range(10))
+    assert [created for _, created in queue.oldest(1000)] == list(range(100))
+
+def test_answered_tickets_are_skipped():
+    """Discarded tickets stay in the heap until rebuilt, but never come out of it"""
+    queue = filled_queue([30, 10, 20, 40])
+    queue.discard(2)
+    queue.discard(3)
+    queue.discard(99)
+    assert len(queue) == 2
+    assert queue.oldest(5) == [(1, 30), (4, 40)]
+
+def test_pushing_a_waiting_ticket_again_is_ignored():
+    """A ticket already in the queue keeps its original creation time"""
+    queue = filled_queue([10])
+    queue.push(1, 5)
+    assert queue.oldest(5) == [(1, 10)]
+
+def test_heap_is_rebuilt_once_mostly_stale():
+    """Discarding most tickets shrinks the heap back to the queue's size"""
+    queue = filled_queue(range(200))
+    for channel_id in range(1, 191):
+        queue.discard(channel_id)
+    assert len(queue.heap) <= 2 * len(queue) + 64
+    assert [created for _, created in queue.oldest(20)] == list(range(190, 200))
+
+def test_overdue_and_next_alert_skip_reported_tickets():
+    """Each overdue ticket is reported once; the next alert is due when the oldest unreported ticket is"""
+    queue = filled_queue([100, 200, 300])
+    assert queue.overdue(max_wait=150, now=400) == [(1, 100), (2, 200)]
+    
+    queue.alerted.update({1, 2})
+    assert queue.overdue(max_wait=150, now=400) == []
+    assert queue.next_alert(max_wait=150) == 450
+    
+    queue.alerted.add(3)
+    assert queue.next_alert(max_wait=150) is None
+
+def test_load_keeps_only_tickets_still_waiting():
+    """Tickets with a response, close or delete on record are not queued"""
+    lifecycles = TicketLifecycles()
+    lifecycles.tickets = {
+        1: TicketLifecycle(1, 100),
+        2: TicketLifecycle(2, 50, first_response=60, first_responder=7),
+        3: TicketLifecycle(3, 70, closed=80, closed_by=7),
+        4: TicketLifecycle(4, 90),
+    }
+    queue = UnansweredQueue()
+    queue.load(lifecycles, [1, 2, 3, 4, 5])
+    assert queue.oldest(10) == [(4, 90), (1, 100)]
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import heapq
+import statistics
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from constants import LIFECYCLE_FILE, LIFECYCLE_RETENTION_DAYS
+
+# Milliseconds between the Unix epoch and the Discord epoch; snowflakes carry their creation time
+DISCORD_EPOCH_MS = 1420070400000
+
+def snowflake_time(snowflake: int) -> float:
+    """Creation time of a Discord ID, as a Unix timestamp"""
+    return ((snowflake >> 22) + DISCORD_EPOCH_MS) / 1000
+
+class TicketLifecycle:
+    """Milestones of one ticket, as Unix timestamps (None until they happen)"""
+    
+    __slots__ = ("channel_id", "created", "first_response", "first_responder", "closed", "closed_by", "deleted", "deleted_by")
+    
+    def __init__(self, channel_id: int, created: float, first_response: Optional[float] = None,
+                 first_responder: Optional[int] = None, closed: Optional[float] = None, closed_by: Optional[int] = None,
+                 deleted: Optional[float] = None, deleted_by: Optional[int] = None):
+        self.channel_id = channel_id
+        self.created = created
+        self.first_response = first_response
+        self.first_responder = first_responder
+        self.closed = closed
+        self.closed_by = closed_by
+        self.deleted = deleted
+        self.deleted_by = deleted_by
+    
+    def to_row(self) -> list:
+        """Fields in __slots__ order, as stored in the lifecycle file"""
+        return [getattr(self, name) for name in self.__slots__]
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentile with linear interpolation between ranks (the NumPy default)"""
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+def latency_stats(groups: Dict[int, List[float]]) -> Dict[int, Tuple[int, float, float]]:
+    """Summarize latencies grouped by user: user_id -> (count, median, 90th percentile)"""
+    stats = {}
+    for user_id, latencies in groups.items():
+        if len(latencies) < 2:
+            stats[user_id] = (len(latencies), latencies[0], latencies[0])
+        else:
+            # Inclusive deciles interpolate between ranks like percentile()
+            deciles = statistics.quantiles(latencies, n=10, method="inclusive")
+            stats[user_id] = (len(latencies), deciles[4], deciles[8])
+    return stats
+
+class TicketLifecycles:
+    """Lifecycle record of every recent ticket, updated in O(1) as events arrive"""
+    
+    def __init__(self):
+        self.tickets: Dict[int, TicketLifecycle] = {}  # channel_id -> lifecycle
+        self.dirty = False
+    
+    def load(self) -> None:
+        """Load the lifecycle table from file"""
+        if not os.path.exists(LIFECYCLE_FILE):
+            return
+        
+        try:
+            with open(LIFECYCLE_FILE, 'r') as f:
+                self.tickets = {row[0]: TicketLifecycle(*row) for row in json.load(f)}
+        except Exception as e:
+            print(f"Error loading ticket lifecycles: {e}")
+            self.tickets = {}
+    
+    def build_snapshot(self) -> list:
+        """Drop tickets past the retention and copy the rest into a JSON-ready structure"""
+        cutoff = time.time() - LIFECYCLE_RETENTION_DAYS * 86400
+        self.tickets = {channel_id: ticket for channel_id, ticket in self.tickets.items() if ticket.created >= cutoff}
+        self.dirty = False
+        return [ticket.to_row() for ticket in self.tickets.values()]
+    
+    @staticmethod
+    def write_snapshot(rows: list) -> None:
+        """Write a lifecycle snapshot to file (safe to call from a worker thread)"""
+        temp_file = LIFECYCLE_FILE + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(rows, f, separators=(",", ":"))
+        os.replace(temp_file, LIFECYCLE_FILE)
+    
+    @staticmethod
+    def retained(channel_id: int) -> bool:
+        """Whether a ticket is recent enough to keep a record of (its channel ID gives the creation time)"""
+        return snowflake_time(channel_id) >= time.time() - LIFECYCLE_RETENTION_DAYS * 86400
+    
+    def seed(self, channel_id: int, first_message: Optional[dict]) -> None:
+        """Create the record of a ticket tracked before lifecycles were recorded, from its first recorded moderator message"""
+        # Without a recorded message the ticket's state is unknown; it must not join the unanswered queue
+        if channel_id in self.tickets or first_message is None or not self.retained(channel_id):
+            return
+        ticket = self._ticket(channel_id)
+        message_id = first_message.get("message_id")
+        if message_id:
+            ts = snowflake_time(message_id)
+        else:
+            ts = datetime.fromisoformat(first_message["timestamp"]).timestamp()
+        ticket.first_response = ts
+        ticket.first_responder = first_message["user_id"]
+    
+    def clear(self) -> None:
+        """Forget every ticket"""
+        self.tickets = {}
+        self.dirty = True
+    
+    def _ticket(self, channel_id: int) -> TicketLifecycle:
+        """Get a ticket's record, creating it if needed (the channel ID gives the creation time)"""
+        ticket = self.tickets.get(channel_id)
+        if ticket is None:
+            ticket = self.tickets[channel_id] = TicketLifecycle(channel_id, snowflake_time(channel_id))
+            self.dirty = True
+        return ticket
+    
+    def note_created(self, channel_id: int) -> TicketLifecycle:
+        """Start a ticket's record when its channel is discovered"""
+        return self._ticket(channel_id)
+    
+    def note(self, channel_id: int, action_type: str, user_id: Optional[int], ts: float) -> None:
+        """Record a ticket event; events replayed out of order keep the earliest time"""
+        ticket = self.tickets.get(channel_id)
+        if ticket is None:
+            if not self.retained(channel_id):
+                # Activity on an old ticket; its record would be pruned on the next save anyway
+                return
+            ticket = self._ticket(channel_id)
+        if action_type == "addressed":
+            if ticket.first_response is None or ts < ticket.first_response:
+                ticket.first_response = ts
+                ticket.first_responder = user_id
+                self.dirty = True
+        elif action_type == "closed":
+            if ticket.closed is None or ts < ticket.closed:
+                ticket.closed = ts
+                ticket.closed_by = user_id
+                self.dirty = True
+        elif action_type == "deleted":
+            if ticket.deleted is None or ts < ticket.deleted:
+                ticket.deleted = ts
+                ticket.deleted_by = user_id
+                self.dirty = True
+    
+    def note_channel_deleted(self, channel_id: int, ts: float) -> None:
+        """Record that a known ticket's channel is gone (deletion by Sahara is recorded with its moderator)"""
+        ticket = self.tickets.get(channel_id)
+        if ticket is not None and ticket.deleted is None:
+            ticket.deleted = ts
+            self.dirty = True
+    
+    def sla(self, start_ts: float, end_ts: float) -> Dict[str, Dict[int, Tuple[int, float, float]]]:
+        """Time to first response and time to close, per moderator, for tickets created in the window"""
+        # One pass over the tickets, grouping both latencies by moderator
+        responses: Dict[int, List[float]] = {}
+        closes: Dict[int, List[float]] = {}
+        for ticket in self.tickets.values():
+            if not start_ts <= ticket.created < end_ts:
+                continue
+            if ticket.first_responder and ticket.first_response >= ticket.created:
+                responses.setdefault(ticket.first_responder, []).append(ticket.first_response - ticket.created)
+            if ticket.closed_by and ticket.closed >= ticket.created:
+                closes.setdefault(ticket.closed_by, []).append(ticket.closed - ticket.created)
+        return {"response": latency_stats(responses), "close": latency_stats(closes)}
+
+class UnansweredQueue:
+    """Tracked tickets still waiting for a first moderator response, oldest first"""
+    
+    def __init__(self):
+        self.heap: List[Tuple[float, int]] = []  # (created, channel_id); answered tickets are removed lazily
+        self.waiting: Dict[int, float] = {}      # channel_id -> created, for tickets still waiting
+        self.alerted: set = set()                # Tickets already reported as waiting too long
+    
+    def load(self, lifecycles: TicketLifecycles, channel_ids) -> None:
+        """Fill the queue with tracked tickets whose record shows no response, close or delete yet"""
+        self.waiting = {}
+        for channel_id in channel_ids:
+            ticket = lifecycles.tickets.get(channel_id)
+            if ticket and ticket.first_response is None and ticket.closed is None and ticket.deleted is None:
+                self.waiting[channel_id] = ticket.created
+        self.heap = [(created, channel_id) for channel_id, created in self.waiting.items()]
+        heapq.heapify(self.heap)
+        self.alerted = set()
+    
+    def push(self, channel_id: int, created: float) -> None:
+        """Add a newly discovered ticket"""
+        if channel_id in self.waiting:
+            return
+        self.waiting[channel_id] = created
+        heapq.heappush(self.heap, (created, channel_id))
+    
+    def discard(self, channel_id: int) -> None:
+        """Remove a ticket once it is answered, closed or deleted"""
+        if self.waiting.pop(channel_id, None) is None:
+            return
+        self.alerted.discard(channel_id)
+        
+        # Rebuild once most heap entries are stale, so the heap stays proportional to the queue
+        if len(self.heap) > 2 * len(self.waiting) + 64:
+            self.heap = [(created, channel_id) for channel_id, created in self.waiting.items()]
+            heapq.heapify(self.heap)
+    
+    def __len__(self) -> int:
+        return len(self.waiting)
+    
+    def _walk(self) -> Iterator[Tuple[int, float]]:
+        """Yield waiting tickets as (channel_id, created), oldest first, by walking the heap best-first"""
+        heap = self.heap
+        candidates = [(heap[0], 0)] if heap else []
+        while candidates:
+            (created, channel_id), i = heapq.heappop(candidates)
+            if self.waiting.get(channel_id) == created:
+                yield channel_id, created
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(candidates, (heap[child], child))
+    
+    def oldest(self, count: int) -> List[Tuple[int, float]]:
+        """The count longest-waiting tickets as (channel_id, created), in O(count log count)"""
+        return list(islice(self._walk(), count))
+    
+    def next_alert(self, max_wait: float) -> Optional[float]:
+        """When the oldest ticket not reported yet will have waited max_wait seconds, or None if there is none"""
+        for channel_id, created in self._walk():
+            if channel_id not in self.alerted:
+                return created + max_wait
+        return None
+    
+    def overdue(self, max_wait: float, now: float) -> List[Tuple[int, float]]:
+        """Tickets waiting longer than max_wait seconds that have not been reported yet"""
+        overdue = []
+        for channel_id, created in self._walk():
+            if now - created <= max_wait:
+                break
+            if channel_id not in self.alerted:
+                overdue.append((channel_id, created))
+        return overdue
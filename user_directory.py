@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import asyncio
+import traceback
+import discord
+from typing import Dict, List, Optional, Iterable
+from constants import (USER_DIRECTORY_FILE, USER_DIRECTORY_MAX_AGE, USER_DIRECTORY_REFRESH_INTERVAL,
+                       USER_DIRECTORY_SAVE_INTERVAL, USER_FETCH_CONCURRENCY)
+
+# Guild member queries accept at most this many user IDs
+MEMBER_QUERY_BATCH = 100
+
+class UserDirectory:
+    """Persistent user ID -> name cache, fed from gateway data so reports need no REST calls"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.users: Dict[int, tuple] = {}  # user_id -> (name or None if the user does not exist, updated_at)
+        self.dirty = False
+        self.names_version = 0  # Incremented whenever a name changes (for HTTP API ETags)
+        self._fetch_semaphore = asyncio.Semaphore(USER_FETCH_CONCURRENCY)
+        
+        # Counters
+        self.stats = {"hits": 0, "misses": 0, "member_queries": 0, "rest_fetches": 0}
+    
+    def load(self) -> None:
+        """Load the directory from file"""
+        if not os.path.exists(USER_DIRECTORY_FILE):
+            return
+        
+        try:
+            with open(USER_DIRECTORY_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                self.users = {int(user_id): (entry[0], float(entry[1])) for user_id, entry in data.items()}
+        except Exception as e:
+            print(f"Error loading user directory: {e}")
+            self.users = {}
+    
+    def save(self) -> None:
+        """Save the directory to file"""
+        self.write_snapshot(self.build_snapshot())
+    
+    def build_snapshot(self) -> dict:
+        """Copy the directory into a JSON-ready structure"""
+        self.dirty = False
+        return {str(user_id): [name, updated_at] for user_id, (name, updated_at) in self.users.items()}
+    
+    @staticmethod
+    def write_snapshot(data: dict) -> None:
+        """Write a directory snapshot to file (safe to call from a worker thread)"""
+        temp_file = USER_DIRECTORY_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, USER_DIRECTORY_FILE)
+    
+    def observe(self, user) -> None:
+        """Record a user seen in gateway data (message authors, members, mentions)"""
+        now = time.time()
+        entry = self.users.get(user.id)
+        
+        # Refresh the timestamp only occasionally so busy users do not keep the directory dirty
+        if entry is None or entry[0] != user.name or now - entry[1] > USER_DIRECTORY_MAX_AGE / 2:
+            if entry is None or entry[0] != user.name:
+                self.names_version += 1
+            self.users[user.id] = (user.name, now)
+            self.dirty = True
+    
+    def observe_members(self, guild, user_ids: Iterable[int]) -> None:
+        """Record names of the given users from the guild's member cache"""
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member:
+                self.observe(member)
+    
+    def get_name(self, user_id: int) -> Optional[str]:
+        """Get a cached name, or None if the user is unknown"""
+        entry = self.users.get(user_id)
+        return entry[0] if entry else None
+    
+    def stale_ids(self, user_ids: Iterable[int]) -> List[int]:
+        """Users that are missing or have not been seen for USER_DIRECTORY_MAX_AGE"""
+        now = time.time()
+        return [user_id for user_id in user_ids
+                if user_id not in self.users or now - self.users[user_id][1] > USER_DIRECTORY_MAX_AGE]
+    
+    async def resolve(self, user_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        """Get names for the users, fetching only those never seen before"""
+        user_ids = list(user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in self.users]
+        self.stats["hits"] += len(user_ids) - len(missing)
+        self.stats["misses"] += len(missing)
+        
+        if missing:
+            await self.refresh(missing)
+        
+        return {user_id: self.get_name(user_id) for user_id in user_ids}
+    
+    async def refresh(self, user_ids: List[int]) -> None:
+        """Look users up: client cache first, then batched member queries, then bounded REST fetches"""
+        remaining = []
+        for user_id in user_ids:
+            user = self.bot.get_user(user_id)
+            if user:
+                self.observe(user)
+            else:
+                remaining.append(user_id)
+        
+        # Member queries go over the gateway and cost no REST requests
+        guild = self.bot.get_guild(self.bot.config.get("guild_id"))
+        found = set()
+        if guild and remaining:
+            for i in range(0, len(remaining), MEMBER_QUERY_BATCH):
+                batch = remaining[i:i + MEMBER_QUERY_BATCH]
+                try:
+                    self.stats["member_queries"] += 1
+                    for member in await guild.query_members(user_ids=batch, cache=True):
+                        self.observe(member)
+                        found.add(member.id)
+                except Exception as e:
+                    print(f"Error querying guild members: {e}")
+            remaining = [user_id for user_id in remaining if user_id not in found]
+        
+        # Users outside the guild need a REST fetch each
+        if remaining:
+            await asyncio.gather(*(self._fetch(user_id) for user_id in remaining))
+    
+    async def _fetch(self, user_id: int) -> None:
+        """Fetch one user over REST, with at most USER_FETCH_CONCURRENCY requests in flight"""
+        async with self._fetch_semaphore:
+            try:
+                self.stats["rest_fetches"] += 1
+                self.observe(await self.bot.fetch_user(user_id))
+            except discord.NotFound:
+                # Remember that the ID is invalid so it is not fetched again until it goes stale
+                self.users[user_id] = (None, time.time())
+                self.names_version += 1
+                self.dirty = True
+            except discord.HTTPException as e:
+                print(f"Error fetching user {user_id}: {e}")
+    
+    async def run(self) -> None:
+        """Save changes periodically and refresh stale tracked users and bots in the background"""
+        await self.bot.wait_until_ready()
+        last_refresh = 0.0
+        
+        while True:
+            try:
+                if time.monotonic() - last_refresh >= USER_DIRECTORY_REFRESH_INTERVAL:
+                    last_refresh = time.monotonic()
+                    user_ids = self.bot.config.get("tracked_users", []) + self.bot.config.get("sahara_bot_ids", [])
+                    stale = self.stale_ids(user_ids)
+                    if stale:
+                        await self.refresh(stale)
+                
+                if self.dirty:
+                    await asyncio.get_running_loop().run_in_executor(None, self.write_snapshot, self.build_snapshot())
+            except Exception as e:
+                print(f"Error in user directory refresh: {e}")
+                traceback.print_exc()
+            
+            await asyncio.sleep(USER_DIRECTORY_SAVE_INTERVAL)
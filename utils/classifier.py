@@ -0,0 +1,191 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Ticket bot messages reporting lifecycle events. The earliest match in the text wins; of rules
+# matching at the same position, the first in the table wins.
+# Override with a "message_rules" list in config.json. Each rule has:
+#   "action":   activity type to record
+#   "pattern":  regular expression, matched case-insensitively
+#   "keywords": lowercase strings of which at least one occurs in every match, used to skip the
+#               regular expression for most messages (optional; plain-text patterns are matched
+#               with substring searches and need none)
+#   "sources":  where to look, "content" and/or "embeds" (default: both)
+#   "bot_ids":  only apply to messages from these ticket bots (default: all of them)
+DEFAULT_MESSAGE_RULES = [
+    {"action": "closed", "pattern": r"closed the ticket"},
+    {"action": "deleted", "pattern": r"deleted the ticket"},
+    {"action": "reopened", "pattern": r"re-?opened the ticket", "keywords": ["opened the ticket"]},
+    {"action": "claimed", "pattern": r"claimed the ticket"},
+    {"action": "transcript", "pattern": r"transcript (?:saved|generated|created)", "keywords": ["transcript"]},
+]
+
+SOURCES = ("content", "embeds")
+
+# Characters with a special meaning in regular expressions; patterns without them are plain text
+REGEX_SYNTAX = re.compile(r"[\\.^$*+?{}\[\]|()]")
+
+# Shortest substring the chatter prefilter checks for in place of several keywords that share it
+MIN_ANCHOR_LENGTH = 6
+
+# User mentions in message text, for bots that put them in embeds or old mention formats
+MENTION_PATTERN = re.compile(r"<@!?(\d+)>")
+
+class Rule:
+    """One compiled classification rule"""
+    
+    __slots__ = ("action", "pattern", "literal", "keywords", "regex", "sources", "bot_ids")
+    
+    def __init__(self, action: str, pattern: str, keywords: Optional[Iterable[str]],
+                 sources: Sequence[str], bot_ids: Optional[Iterable[int]]):
+        self.action = action
+        self.pattern = pattern
+        self.sources = frozenset(sources)
+        self.bot_ids = frozenset(bot_ids) if bot_ids else None
+        
+        # A plain-text pattern is matched with a substring search, never with the regular expression engine;
+        # other patterns only run when one of their keywords occurs in the text (always without keywords)
+        if not REGEX_SYNTAX.search(pattern):
+            self.literal = pattern.lower()
+            self.keywords = None
+            self.regex = None
+        else:
+            self.literal = None
+            self.keywords = tuple(keyword.lower() for keyword in keywords) if keywords else None
+            self.regex = re.compile(pattern, re.IGNORECASE)
+    
+    def find(self, text: str, lowered: str) -> int:
+        """Position of the first match in the text, or -1"""
+        if self.literal is not None:
+            return lowered.find(self.literal)
+        
+        if self.keywords is not None:
+            for keyword in self.keywords:
+                if keyword in lowered:
+                    break
+            else:
+                return -1
+        match = self.regex.search(text)
+        return match.start() if match else -1
+
+def parse_rules(rule_table: List[dict]) -> List[Rule]:
+    """Validate a rule table from the configuration, skipping (and reporting) invalid rules"""
+    rules = []
+    for entry in rule_table:
+        try:
+            rule = Rule(entry["action"], entry["pattern"], entry.get("keywords"),
+                        entry.get("sources", SOURCES), entry.get("bot_ids"))
+            if not rule.sources <= set(SOURCES):
+                raise ValueError(f"unknown source in {sorted(rule.sources)}")
+        except (KeyError, TypeError, ValueError, re.error) as e:
+            print(f"Warning: Ignoring invalid message rule {entry}: {e}")
+            continue
+        rules.append(rule)
+    return rules
+
+def embed_text(embeds: Sequence) -> str:
+    """Join the searchable text of a message's embeds"""
+    parts = []
+    for embed in embeds:
+        parts.append(embed.title or "")
+        parts.append(embed.description or "")
+        for field in embed.fields:
+            parts.append(field.name or "")
+            parts.append(field.value or "")
+        if embed.footer:
+            parts.append(embed.footer.text or "")
+    return "\n".join(parts)
+
+def shared_anchors(keywords: Iterable[str]) -> Tuple[str, ...]:
+    """Fewest substrings such that every keyword contains one of them (e.g. " the ticket" for "closed the ticket"
+    and "deleted the ticket"), so the prefilter scans each message as few times as possible"""
+    remaining = set(keywords)
+    anchors = []
+    while remaining:
+        candidates = {keyword[i:j] for keyword in remaining for i in range(len(keyword))
+                      for j in range(i + MIN_ANCHOR_LENGTH, len(keyword) + 1)}
+        candidates.update(keyword for keyword in remaining if len(keyword) < MIN_ANCHOR_LENGTH)
+        # Cover the most keywords, then prefer the longest (rarest) substring
+        anchor = max(candidates, key=lambda candidate: (sum(candidate in keyword for keyword in remaining), len(candidate), candidate))
+        anchors.append(anchor)
+        remaining = {keyword for keyword in remaining if anchor not in keyword}
+    return tuple(anchors)
+
+class RuleSet:
+    """The rules that apply to one bot and source, with one list of substrings that every match contains"""
+    
+    __slots__ = ("rules", "gate")
+    
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        
+        # Messages containing none of these cannot match; None if a rule without keywords needs the regex anyway
+        keywords = set()
+        for rule in rules:
+            if rule.literal is not None:
+                keywords.add(rule.literal)
+            elif rule.keywords is not None:
+                keywords.update(rule.keywords)
+            else:
+                keywords = None
+                break
+        self.gate = shared_anchors(keywords) if keywords is not None else None
+    
+    def match(self, text: str) -> Optional[Rule]:
+        """The rule matching earliest in the text (the first in table order on a tie), if any"""
+        lowered = text.lower()
+        
+        # Most messages are chatter: reject them with substring checks alone
+        if self.gate is not None:
+            for keyword in self.gate:
+                if keyword in lowered:
+                    break
+            else:
+                return None
+        
+        best = None
+        best_position = len(lowered)
+        for rule in self.rules:
+            # Inlined for plain-text rules, the common case
+            position = lowered.find(rule.literal) if rule.literal is not None else rule.find(text, lowered)
+            if position >= 0 and (best is None or position < best_position):
+                best = rule
+                best_position = position
+        return best
+
+class MessageClassifier:
+    """Matches ticket bot messages against the rule table, with substring checks before any regular expression"""
+    
+    def __init__(self, rule_table: List[dict]):
+        self.rules = parse_rules(rule_table)
+        self.actions = frozenset(rule.action for rule in self.rules)
+        
+        # source -> bot ID -> rules that apply, built on first use
+        self._rule_sets: Dict[str, Dict[Optional[int], RuleSet]] = {source: {} for source in SOURCES}
+    
+    def _rule_set(self, bot_id: Optional[int], source: str) -> RuleSet:
+        """The rules that apply to a bot and source"""
+        rule_set = self._rule_sets[source].get(bot_id)
+        if rule_set is None:
+            rule_set = self._rule_sets[source][bot_id] = RuleSet([
+                rule for rule in self.rules if source in rule.sources and (rule.bot_ids is None or bot_id in rule.bot_ids)])
+        return rule_set
+    
+    def classify(self, bot_id: int, content: str, embeds: Sequence = ()) -> Optional[Tuple[str, str]]:
+        """Return (action, text that matched) for a ticket bot message, or None"""
+        if content:
+            rule_set = self._rule_sets["content"].get(bot_id) or self._rule_set(bot_id, "content")
+            rule = rule_set.match(content)
+            if rule is not None:
+                return rule.action, content
+        
+        # Embed text is only assembled when the plain content did not match
+        if embeds:
+            text = embed_text(embeds)
+            rule = self._rule_set(bot_id, "embeds").match(text)
+            if rule is not None:
+                return rule.action, text
+        return None
+
+def mentioned_user_ids(text: str) -> List[int]:
+    """User IDs mentioned in message text"""
+    return [int(user_id) for user_id in MENTION_PATTERN.findall(text)]
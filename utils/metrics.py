@@ -0,0 +1,236 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+# Histogram bucket upper bounds in seconds, from fast handlers up to slow network calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def format_value(value: float) -> str:
+    """A sample value in the Prometheus text format"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """A label set such as {kind="data"}, or an empty string without labels"""
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+class Metric:
+    """A named metric with optional labels; one child per combination of label values"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.children: Dict[Tuple[str, ...], object] = {}
+    
+    def labels(self, *values) -> object:
+        """The child for one combination of label values, created on first use"""
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self._new_child()
+        return child
+    
+    def _new_child(self) -> object:
+        raise NotImplementedError
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(name suffix, label string, value) for every sample of the metric"""
+        raise NotImplementedError
+
+class CounterValue:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0
+    
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+class Counter(Metric):
+    """A value that only goes up, e.g. bytes written"""
+    
+    kind = "counter"
+    
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+    
+    def inc(self, amount: float = 1) -> None:
+        """Increase the unlabelled counter"""
+        self.labels().inc(amount)
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [("_total", format_labels(self.label_names, key), child.value) for key, child in self.children.items()]
+
+class HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # Per bucket, not cumulative; made cumulative when rendered
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        """Record one observation: a bisect and three additions"""
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram(Metric):
+    """Distribution of observed values (usually durations in seconds) over fixed buckets"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+    
+    def observe(self, value: float) -> None:
+        """Record an observation on the unlabelled histogram"""
+        self.labels().observe(value)
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        for key, child in self.children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                samples.append(("_bucket", format_labels(self.label_names + ("le",), key + (format_value(bound),)), cumulative))
+            samples.append(("_bucket", format_labels(self.label_names + ("le",), key + ("+Inf",)), child.count))
+            labels = format_labels(self.label_names, key)
+            samples.append(("_sum", labels, child.sum))
+            samples.append(("_count", labels, child.count))
+        return samples
+
+class Gauge(Metric):
+    """A value read from the bot's state when metrics are collected, so updates cost nothing"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, help_text: str, func: Callable[[], Union[float, Dict[Tuple, float]]], labels: Sequence[str] = (),
+                 kind: str = "gauge"):
+        super().__init__(name, help_text, labels)
+        self.func = func  # Returns the value, or {label values: value} for labelled gauges
+        self.kind = kind  # "counter" for running totals kept elsewhere (e.g. job stats)
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        value = self.func()
+        if value is None:
+            return []
+        suffix = "_total" if self.kind == "counter" else ""
+        if not self.label_names:
+            return [(suffix, "", value)]
+        return [(suffix, format_labels(self.label_names, key), item) for key, item in value.items()]
+
+class MetricsRegistry:
+    """Metrics exported in the Prometheus text format"""
+    
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.metrics: Dict[str, Metric] = {}
+    
+    def _register(self, metric: Metric) -> Metric:
+        metric.name = self.prefix + metric.name
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+    
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+    
+    def gauge(self, name: str, help_text: str, func: Callable, labels: Sequence[str] = (), kind: str = "gauge") -> Gauge:
+        return self._register(Gauge(name, help_text, func, labels, kind))
+    
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                # A broken collector must not take the other metrics down with it
+                print(f"Error collecting metric {metric.name}: {e}")
+                continue
+            name = metric.name[:-len("_total")] if metric.kind == "counter" and metric.name.endswith("_total") else metric.name
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+class BotMetrics(MetricsRegistry):
+    """The bot's metrics: timings observed where they happen, everything else read at scrape time"""
+    
+    def __init__(self, bot):
+        super().__init__(prefix="ticketbot_")
+        self.bot = bot
+        self.started = time.time()
+        
+        # Observed as events happen
+        self.message_seconds = self.histogram(
+            "message_handling_seconds", "Time spent tracking one message in on_message, excluding commands", ["tracked"])
+        self.message_append_seconds = self.histogram(
+            "message_append_seconds", "Time spent storing one moderator message (save_messages)")
+        self.flush_seconds = self.histogram(
+            "flush_seconds", "Duration of one background save of the data files (save_data), including the threaded write")
+        self.snapshot_write_seconds = self.histogram(
+            "snapshot_write_seconds", "Duration of writing one snapshot file", ["kind"])
+        self.snapshot_bytes = self.counter(
+            "snapshot_bytes_written", "Bytes written to snapshot files", ["kind"])
+        self.audit_poll_seconds = self.histogram(
+            "audit_poll_seconds", "Duration of one audit log catch-up pass")
+        self.loop_lag_seconds = self.histogram(
+            "event_loop_lag_seconds", "How late the event loop watchdog's heartbeat woke up")
+        
+        # Read from the bot's state at scrape time
+        self.gauge("uptime_seconds", "Seconds since the bot started", lambda: time.time() - self.started)
+        self.gauge("gateway_latency_seconds", "Discord gateway heartbeat latency", self._gateway_latency)
+        self.gauge("ticket_channels", "Tracked ticket channels", lambda: len(bot.data_manager.ticket_channels))
+        self.gauge("ticket_messages_bytes", "Size of the stored moderator messages", lambda: bot.data_manager.storage.messages_size())
+        self.gauge("unanswered_tickets", "Tracked tickets waiting for a first response", lambda: len(bot.data_manager.unanswered))
+        self.gauge("audit_lag_seconds", "Seconds since the audit log watcher was last caught up", lambda: bot.audit_watcher.lag())
+        self.gauge("event_loop_stalls", "Event loop stalls longer than the watchdog threshold",
+                   lambda: bot.watchdog.stats["stalls"], kind="counter")
+        self.gauge("audit_entries", "Audit log entries processed", lambda: bot.audit_watcher.stats["entries_total"], kind="counter")
+        self.gauge("persistence_save_requests", "Save requests made to the persistence worker",
+                   lambda: bot.persistence.stats["save_requests"], kind="counter")
+        self.gauge("persistence_coalesced_writes", "Save requests absorbed into another write",
+                   lambda: bot.persistence.stats["coalesced_writes"], kind="counter")
+        self.gauge("job_runs", "Completed scheduler job runs", lambda: self._job_stat("runs"), ["job"], kind="counter")
+        self.gauge("job_failures", "Failed scheduler job runs", lambda: self._job_stat("failures"), ["job"], kind="counter")
+        self.gauge("job_skipped", "Scheduler job runs skipped because the previous run was still going",
+                   lambda: self._job_stat("skipped"), ["job"], kind="counter")
+        self.gauge("job_duration_seconds", "Total time spent in scheduler jobs",
+                   lambda: self._job_stat("total_ms", 1000), ["job"], kind="counter")
+        self.gauge("job_last_duration_seconds", "Duration of the last run of each scheduler job",
+                   lambda: self._job_stat("last_ms", 1000), ["job"])
+    
+    def _gateway_latency(self) -> float:
+        latency = self.bot.latency
+        # NaN until the first heartbeat is acknowledged
+        return None if math.isnan(latency) or math.isinf(latency) else latency
+    
+    def _job_stat(self, stat: str, divisor: float = 1) -> Dict[Tuple[str], float]:
+        scheduler = getattr(self.bot, "scheduler", None)
+        if scheduler is None:
+            return {}
+        return {(job.name,): job.stats[stat] / divisor for job in scheduler.jobs.values()}
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+# Reporting periods tracked for every user
+PERIODS = ["daily", "weekly", "monthly"]
+
+def last_day_of_month(year: int, month: int) -> int:
+    """Get the last day of the month"""
+    if month == 12:
+        next_month = datetime(year + 1, 1, 1)
+    else:
+        next_month = datetime(year, month + 1, 1)
+    return (next_month - timedelta(days=1)).day
+
+def period_start(period: str, now: datetime) -> datetime:
+    """Get the start of the period containing now (weeks start on the 1st, 8th, 15th and 22nd)"""
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    if period == "daily":
+        return day_start
+    elif period == "weekly":
+        return day_start.replace(day=min((now.day - 1) // 7, 3) * 7 + 1)
+    elif period == "biweekly":
+        return day_start.replace(day=1 if now.day <= 14 else 15)
+    elif period == "monthly":
+        return day_start.replace(day=1)
+    
+    raise ValueError(f"Unknown period: {period}")
+
+def period_end(period: str, now: datetime) -> datetime:
+    """Get the (exclusive) end of the period containing now"""
+    start = period_start(period, now)
+    month_end = start.replace(day=last_day_of_month(start.year, start.month)) + timedelta(days=1)
+    
+    if period == "daily":
+        return start + timedelta(days=1)
+    elif period == "weekly":
+        return month_end if start.day == 22 else start + timedelta(days=7)
+    elif period == "biweekly":
+        return month_end if start.day == 15 else start + timedelta(days=14)
+    elif period == "monthly":
+        return month_end
+    
+    raise ValueError(f"Unknown period: {period}")
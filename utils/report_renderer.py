@@ -0,0 +1,250 @@
+import discord
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from utils.helpers import get_current_datetime_utc
+from utils.periods import PERIODS, period_start, last_day_of_month
+from utils.rolling import ROLLING_WINDOWS
+
+def report_title(period: str, now: datetime) -> str:
+    """Get the embed title for a daily, weekly, biweekly or monthly report"""
+    if period == "daily":
+        return f"Daily Report ({now.strftime('%Y-%m-%d')})"
+    elif period == "weekly":
+        # Determine the current week period
+        day = now.day
+        if 1 <= day <= 7:
+            period_str = "1-7"
+        elif 8 <= day <= 14:
+            period_str = "8-14"
+        elif 15 <= day <= 21:
+            period_str = "15-21"
+        else:
+            period_str = f"22-{last_day_of_month(now.year, now.month)}"
+        return f"Weekly Report ({period_str} {now.strftime('%B')})"
+    elif period == "biweekly":
+        if now.day <= 14:
+            period_str = "1-14"
+        else:
+            period_str = f"15-{last_day_of_month(now.year, now.month)}"
+        return f"Bi-Weekly Report ({period_str} {now.strftime('%B')})"
+    elif period == "monthly":
+        return f"Monthly Report ({now.strftime('%B %Y')})"
+    
+    raise ValueError(f"Unknown period: {period}")
+
+def render_period_report(title: str, summary: Dict[int, Dict[str, int]], names: Dict[int, Optional[str]]) -> discord.Embed:
+    """Build the embed for one period's per-user counts"""
+    embed = discord.Embed(
+        title=title,
+        color=discord.Color.blue()
+    )
+    
+    # Collect statistics for each user
+    description = ""
+    
+    for user_id, activities in summary.items():
+        # Count number of channels for each action type
+        addressed_count = activities.get("addressed", 0)
+        closed_count = activities.get("closed", 0)
+        deleted_count = activities.get("deleted", 0)
+        
+        # Format string for each user
+        if addressed_count > 0 or closed_count > 0 or deleted_count > 0:
+            user_name = names.get(user_id) or "Unknown User"
+            description += f"**{user_name}** (ID: {user_id})\n"
+            description += f"• Tickets Addressed: **{addressed_count}**\n"
+            description += f"• Tickets Closed: **{closed_count}**\n"
+            description += f"• Tickets Deleted: **{deleted_count}**\n\n"
+    
+    if description:
+        embed.description = description
+    else:
+        embed.description = "No activity recorded for this period."
+    return embed
+
+def render_urgent_report(summaries: Dict[str, Dict[int, Dict[str, int]]], tracked_users: List[int],
+                         names: Dict[int, Optional[str]]) -> discord.Embed:
+    """Build the embed with every period's counts for every tracked user"""
+    embed = discord.Embed(
+        title="🚨 Urgent Statistics Report",
+        description="Statistics for all tracked users across all time periods",
+        color=discord.Color.red()
+    )
+    
+    # Add statistics for each user
+    for user_id in tracked_users:
+        user_name = names.get(user_id) or f"Unknown User (ID: {user_id})"
+        
+        # Collect statistics for all periods
+        stats_text = ""
+        
+        for period in PERIODS:
+            activities = summaries[period].get(user_id, {})
+            if not activities:
+                continue
+            
+            addressed_count = activities.get("addressed", 0)
+            closed_count = activities.get("closed", 0)
+            deleted_count = activities.get("deleted", 0)
+            
+            if addressed_count > 0 or closed_count > 0 or deleted_count > 0:
+                stats_text += f"**{period.capitalize()}**: "
+                stats_text += f"Addressed: {addressed_count}, "
+                stats_text += f"Closed: {closed_count}, "
+                stats_text += f"Deleted: {deleted_count}\n"
+        
+        if stats_text:
+            embed.add_field(
+                name=f"{user_name} (ID: {user_id})",
+                value=stats_text,
+                inline=False
+            )
+    
+    if len(embed.fields) == 0:
+        embed.description = "No activity recorded for any user in any period."
+    return embed
+
+def render_rolling_report(summary: Dict[int, Dict[str, Dict[str, int]]], names: Dict[int, Optional[str]]) -> discord.Embed:
+    """Build the embed with every user's counts over the last 24 hours, 7 days and 30 days"""
+    embed = discord.Embed(
+        title="Rolling Report (last 24h / 7d / 30d)",
+        color=discord.Color.blue()
+    )
+    
+    description = ""
+    for user_id, activities in summary.items():
+        user_name = names.get(user_id) or "Unknown User"
+        description += f"**{user_name}** (ID: {user_id})\n"
+        for action_type, label in [("addressed", "Addressed"), ("closed", "Closed"), ("deleted", "Deleted")]:
+            counts = activities.get(action_type, {})
+            description += f"• {label} actions: " + " / ".join(f"**{counts.get(window, 0)}**" for window in ROLLING_WINDOWS) + "\n"
+        description += "\n"
+    
+    if description:
+        embed.description = description
+    else:
+        embed.description = "No activity recorded in the last 30 days."
+    
+    # Windows add up daily counts, so they are not distinct tickets like the period reports
+    embed.set_footer(text="Actions: each ticket counts once per day it was handled, so a ticket handled on "
+                          "several days counts several times (!report weekly/monthly count distinct tickets)")
+    return embed
+
+def format_duration(seconds: float) -> str:
+    """Format a duration as e.g. 45s, 12m, 3h 05m or 2d 4h"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    if seconds < 86400:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 86400}d {seconds % 86400 // 3600}h"
+
+def render_sla_report(title: str, sla: Dict[str, Dict[int, tuple]], names: Dict[int, Optional[str]]) -> discord.Embed:
+    """Build the embed with every moderator's time to first response and time to close"""
+    embed = discord.Embed(
+        title=title,
+        description="Median / 90th percentile, for tickets opened in this period",
+        color=discord.Color.blue()
+    )
+    
+    user_ids = sorted(set(sla["response"]) | set(sla["close"]))
+    for user_id in user_ids:
+        user_name = names.get(user_id) or "Unknown User"
+        
+        stats_text = ""
+        for key, label in [("response", "First Response"), ("close", "Time to Close")]:
+            stats = sla[key].get(user_id)
+            if stats:
+                count, median, p90 = stats
+                stats_text += f"• {label}: **{format_duration(median)}** / {format_duration(p90)} ({count} tickets)\n"
+        
+        embed.add_field(
+            name=f"{user_name} (ID: {user_id})",
+            value=stats_text,
+            inline=False
+        )
+    
+    if len(embed.fields) == 0:
+        embed.description = "No responses or closures recorded for tickets opened in this period."
+    
+    # Add current date and time in UTC in YYYY-MM-DD HH:MM:SS format
+    embed.set_footer(text=f"Current UTC Time: {get_current_datetime_utc()}")
+    return embed
+
+class ReportRenderer:
+    """Renders report embeds, reusing them until the activity data or the period changes"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        
+        # (report, period start, ...) -> rendered embed without the footer, for the current data version
+        self._cache: Dict[tuple, discord.Embed] = {}
+        self._version = None
+        
+        # Counters
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def _cached(self, key: tuple) -> Optional[discord.Embed]:
+        """Look up a rendered embed, dropping everything once the activity data has changed"""
+        version = self.bot.data_manager.activity_version
+        if version != self._version:
+            self._cache.clear()
+            self._version = version
+        
+        embed = self._cache.get(key)
+        if embed is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return embed
+    
+    @staticmethod
+    def _stamp(embed: discord.Embed) -> discord.Embed:
+        """Copy a cached embed and add the current time"""
+        embed = embed.copy()
+        
+        # Add current date and time in UTC in YYYY-MM-DD HH:MM:SS format
+        embed.set_footer(text=f"Current UTC Time: {get_current_datetime_utc()}")
+        return embed
+    
+    async def period_reports(self, periods: List[str]) -> List[discord.Embed]:
+        """Get report embeds for several periods, counting all uncached periods in one pass"""
+        now = datetime.now(timezone.utc)
+        keys = {period: ("period", period, int(period_start(period, now).timestamp())) for period in periods if period != "rolling"}
+        embeds = {period: self._cached(key) for period, key in keys.items()}
+        
+        if "rolling" in periods:
+            # The hourly buckets move on even without new activity
+            key = ("rolling", int(now.timestamp()) // 3600)
+            embed = embeds["rolling"] = self._cached(key)
+            if embed is None:
+                summary = self.bot.data_manager.get_rolling_summary()
+                names = await self.bot.user_directory.resolve(summary.keys())
+                embeds["rolling"] = self._cache[key] = render_rolling_report(summary, names)
+        
+        missing = [period for period, embed in embeds.items() if embed is None]
+        if missing:
+            summaries = self.bot.data_manager.get_activity_summaries(missing)
+            names = await self.bot.user_directory.resolve({user_id for summary in summaries.values() for user_id in summary})
+            
+            for period in missing:
+                embeds[period] = render_period_report(report_title(period, now), summaries[period], names)
+                self._cache[keys[period]] = embeds[period]
+        
+        return [self._stamp(embeds[period]) for period in periods]
+    
+    async def urgent_report(self) -> discord.Embed:
+        """Get the all-periods report for every tracked user"""
+        now = datetime.now(timezone.utc)
+        tracked_users = self.bot.config.get("tracked_users", [])
+        key = ("urgent", int(period_start("daily", now).timestamp()), tuple(tracked_users))
+        
+        embed = self._cached(key)
+        if embed is None:
+            summaries = self.bot.data_manager.get_activity_summaries(PERIODS)
+            names = await self.bot.user_directory.resolve(tracked_users)
+            embed = self._cache[key] = render_urgent_report(summaries, tracked_users, names)
+        
+        return self._stamp(embed)
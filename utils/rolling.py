@@ -0,0 +1,87 @@
+from array import array
+from typing import Dict, Iterable, Tuple
+
+# Rolling windows reported by !report rolling: name -> (resolution, number of buckets summed)
+ROLLING_WINDOWS = {
+    "24h": ("hourly", 24),
+    "7d": ("daily", 7),
+    "30d": ("daily", 30),
+}
+
+# Ring buffer resolutions: name -> (bucket length in seconds, number of buckets)
+ROLLING_RESOLUTIONS = {
+    "hourly": (3600, 24),
+    "daily": (86400, 30),
+}
+
+class RingCounter:
+    """Event counts in a fixed number of time buckets; old buckets are reused as time moves on"""
+    
+    __slots__ = ("bucket_seconds", "counts", "stamps")
+    
+    def __init__(self, bucket_seconds: int, size: int):
+        self.bucket_seconds = bucket_seconds
+        self.counts = array('I', [0] * size)
+        self.stamps = array('q', [-1] * size)  # Bucket number each slot currently holds
+    
+    def add(self, ts: int, now: int) -> None:
+        """Count one event at ts, unless it is older than the buffer covers"""
+        bucket = ts // self.bucket_seconds
+        size = len(self.counts)
+        if bucket <= now // self.bucket_seconds - size:
+            return
+        
+        slot = bucket % size
+        if self.stamps[slot] != bucket:
+            # The slot still holds a bucket that has left the window
+            if self.stamps[slot] > bucket:
+                return
+            self.stamps[slot] = bucket
+            self.counts[slot] = 0
+        self.counts[slot] += 1
+    
+    def total(self, now: int, buckets: int) -> int:
+        """Sum of the last `buckets` buckets up to and including the current one"""
+        current = now // self.bucket_seconds
+        return sum(count for count, stamp in zip(self.counts, self.stamps) if current - buckets < stamp <= current)
+
+class RollingActivity:
+    """Sliding-window activity counts per user and action, in constant memory per user"""
+    
+    # Events are recorded once per channel per UTC day and the windows sum them, so a ticket handled
+    # on several days counts once per day: these are actions, not the distinct tickets of the period reports
+    
+    def __init__(self):
+        # (user_id, action_type) -> resolution -> ring buffer
+        self.counters: Dict[Tuple[int, str], Dict[str, RingCounter]] = {}
+    
+    def add(self, user_id: int, action_type: str, ts: int, now: int) -> None:
+        """Count one activity event"""
+        counters = self.counters.get((user_id, action_type))
+        if counters is None:
+            counters = self.counters[(user_id, action_type)] = {
+                resolution: RingCounter(bucket_seconds, size)
+                for resolution, (bucket_seconds, size) in ROLLING_RESOLUTIONS.items()
+            }
+        for counter in counters.values():
+            counter.add(ts, now)
+    
+    def load(self, events: Iterable[Tuple[int, str, int]], now: int) -> None:
+        """Fill the counters from stored (user_id, action_type, ts) events"""
+        self.clear()
+        for user_id, action_type, ts in events:
+            self.add(user_id, action_type, ts, now)
+    
+    def summary(self, now: int) -> Dict[int, Dict[str, Dict[str, int]]]:
+        """Counts per user, action type and window: user_id -> action_type -> window -> count"""
+        summary = {}
+        for (user_id, action_type), counters in self.counters.items():
+            totals = {window: counters[resolution].total(now, buckets)
+                      for window, (resolution, buckets) in ROLLING_WINDOWS.items()}
+            if any(totals.values()):
+                summary.setdefault(user_id, {})[action_type] = totals
+        return summary
+    
+    def clear(self) -> None:
+        """Forget all counts"""
+        self.counters = {}
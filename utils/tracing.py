@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from constants import TRACE_FILE, TRACE_SAMPLE_RATE, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT
+
+class NoSpan:
+    """Stands in for a span when the current work is not sampled; every call is a no-op"""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> "NoSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+    
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+NO_SPAN = NoSpan()
+
+# Innermost open span of the running task (tasks inherit it when created)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """One timed stage; the outermost span of a trace collects all the others"""
+    
+    __slots__ = ("tracer", "name", "root", "parent", "attributes", "start", "end", "spans", "_token")
+    
+    def __init__(self, tracer: "Tracer", name: str, root: Optional["Span"], parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.root = root or self
+        self.parent = parent
+        self.attributes = attributes
+        self.start = 0.0
+        self.end: Optional[float] = None
+        self.spans: List["Span"] = []  # Only used on the root: every span of the trace, in start order
+        self._token = None
+    
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        if self.root is not self:
+            self.root.spans.append(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        if self.root is self:
+            self.tracer.finish(self)
+    
+    def set(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+def current_span():
+    """The innermost open span, or NO_SPAN outside sampled work"""
+    return _current_span.get() or NO_SPAN
+
+class Tracer:
+    """Samples units of work (e.g. one Discord message) and writes their completed traces to a rotating JSONL file"""
+    
+    def __init__(self, bot, path: str = TRACE_FILE):
+        self.bot = bot
+        self.path = path
+        self._queue: Optional[queue.SimpleQueue] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._logger = logging.getLogger("ticketbot.traces")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        
+        # Counters
+        self.stats = {"started": 0, "written": 0}
+    
+    @property
+    def sample_rate(self) -> float:
+        """Share of work traced ("trace_sample_rate" in config.json, 1 traces everything)"""
+        rate = self.bot.config.get("trace_sample_rate")
+        return TRACE_SAMPLE_RATE if rate is None else rate
+    
+    def trace(self, name: str, force: bool = False, **attributes):
+        """Start a trace if this unit of work is sampled; use as a context manager"""
+        parent = _current_span.get()
+        if parent is not None and parent.root.end is None:
+            # Already inside a trace: nest instead of starting another
+            return Span(self, name, parent.root, parent, attributes)
+        
+        if not force and random.random() >= self.sample_rate:
+            return NO_SPAN
+        self.stats["started"] += 1
+        return Span(self, name, None, None, attributes)
+    
+    def span(self, name: str, **attributes):
+        """Time a stage of the current trace; a no-op outside sampled work"""
+        parent = _current_span.get()
+        if parent is None or parent.root.end is not None:
+            # Not sampled, or a task that outlived the trace it was started from
+            return NO_SPAN
+        return Span(self, name, parent.root, parent, attributes)
+    
+    def finish(self, root: Span) -> None:
+        """Queue a completed trace for writing; the file is written by a background thread"""
+        record = {
+            "ts": round(time.time() - (root.end - root.start), 3),
+            "trace": root.name,
+            "ms": round((root.end - root.start) * 1000, 3),
+            "attrs": root.attributes,
+            "spans": [
+                {
+                    "name": span.name,
+                    "parent": span.parent.name,
+                    "start_ms": round((span.start - root.start) * 1000, 3),
+                    "ms": round(((span.end if span.end is not None else root.end) - span.start) * 1000, 3),
+                    **({"attrs": span.attributes} if span.attributes else {}),
+                }
+                for span in root.spans
+            ],
+        }
+        self._start_writer()
+        self._logger.info(json.dumps(record, default=str, separators=(",", ":")))
+        self.stats["written"] += 1
+    
+    def _start_writer(self) -> None:
+        """Start the thread that appends traces to the file and rotates it"""
+        if self._listener is not None:
+            return
+        file_handler = logging.handlers.RotatingFileHandler(self.path, maxBytes=TRACE_MAX_BYTES,
+                                                            backupCount=TRACE_BACKUP_COUNT, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue = queue.SimpleQueue()
+        self._logger.addHandler(logging.handlers.QueueHandler(self._queue))
+        self._listener = logging.handlers.QueueListener(self._queue, file_handler)
+        self._listener.start()
+    
+    def close(self) -> None:
+        """Write the queued traces and stop the writer thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._logger.handlers.clear()
+            self._listener = None
+
+def summarize(paths: List[str]) -> str:
+    """Duration percentiles per trace and stage, from trace files"""
+    # Import here: the summary runs offline and does not need the bot's modules otherwise
+    from ticket_lifecycle import percentile
+    
+    durations: Dict[tuple, List[float]] = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                durations.setdefault((record["trace"], "(total)"), []).append(record["ms"])
+                for span in record["spans"]:
+                    durations.setdefault((record["trace"], span["name"]), []).append(span["ms"])
+    
+    lines = [f"{'trace':<12} {'stage':<20} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    for (trace, stage), values in sorted(durations.items()):
+        lines.append(f"{trace:<12} {stage:<20} {len(values):>8} {percentile(values, 50):>10.3f} "
+                     f"{percentile(values, 95):>10.3f} {percentile(values, 99):>10.3f}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # Stage latency summary: python -m utils.tracing [trace files...] (default: the trace file and its backups)
+    paths = sys.argv[1:] or [path for path in [TRACE_FILE] + [f"{TRACE_FILE}.{i}" for i in range(1, TRACE_BACKUP_COUNT + 1)]
+                             if os.path.exists(path)]
+    if not paths:
+        print(f"Error: No trace files found ({TRACE_FILE}). Set \"trace_sample_rate\" in config.json.")
+        exit(1)
+    print(summarize(paths))